@@ -0,0 +1,30 @@
+"""add users filter indexes
+
+Revision ID: 5c1d7e9a2b34
+Revises: bab5cf2dfaf4
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c1d7e9a2b34'
+down_revision: Union[str, Sequence[str], None] = 'bab5cf2dfaf4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_users_is_active_id', 'users', ['is_active', 'id'], unique=False)
+    op.create_index('ix_users_is_admin_id', 'users', ['is_admin', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_users_is_admin_id', table_name='users')
+    op.drop_index('ix_users_is_active_id', table_name='users')
@@ -0,0 +1,41 @@
+"""create object digests table
+
+Revision ID: 8f3a6c2d41e7
+Revises: 5c1d7e9a2b34
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8f3a6c2d41e7'
+down_revision: Union[str, Sequence[str], None] = '5c1d7e9a2b34'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('object_digests',
+    sa.Column('bucket', sa.String(length=63), nullable=False),
+    sa.Column('digest', sa.String(length=64), nullable=False),
+    sa.Column('key', sa.String(length=1024), nullable=False),
+    sa.Column('size', sa.BigInteger(), nullable=False),
+    sa.Column('etag', sa.String(length=255), nullable=False),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('bucket', 'digest')
+    )
+    op.create_index(op.f('ix_object_digests_id'), 'object_digests', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_object_digests_id'), table_name='object_digests')
+    op.drop_table('object_digests')
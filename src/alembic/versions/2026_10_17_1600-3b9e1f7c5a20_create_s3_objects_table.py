@@ -0,0 +1,47 @@
+"""create s3 objects table
+
+Revision ID: 3b9e1f7c5a20
+Revises: 8f3a6c2d41e7
+Create Date: 2026-10-17 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b9e1f7c5a20'
+down_revision: Union[str, Sequence[str], None] = '8f3a6c2d41e7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('s3_objects',
+    sa.Column('bucket', sa.String(length=63), nullable=False),
+    sa.Column('key', sa.String(length=1024), nullable=False),
+    sa.Column('size', sa.BigInteger(), nullable=False),
+    sa.Column('etag', sa.String(length=255), nullable=False),
+    sa.Column('content_type', sa.String(length=255), nullable=True),
+    sa.Column('uploader_id', sa.Integer(), nullable=True),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+    sa.ForeignKeyConstraint(['uploader_id'], ['users.id'], ondelete='SET NULL'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('bucket', 'key')
+    )
+    op.create_index('ix_s3_objects_bucket_size', 's3_objects', ['bucket', 'size'], unique=False)
+    op.create_index(op.f('ix_s3_objects_id'), 's3_objects', ['id'], unique=False)
+    op.create_index('ix_s3_objects_uploader_id_id', 's3_objects', ['uploader_id', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_s3_objects_uploader_id_id', table_name='s3_objects')
+    op.drop_index(op.f('ix_s3_objects_id'), table_name='s3_objects')
+    op.drop_index('ix_s3_objects_bucket_size', table_name='s3_objects')
+    op.drop_table('s3_objects')
@@ -0,0 +1,36 @@
+"""add s3 objects key indexes
+
+Revision ID: c7ab4afc8e24
+Revises: 3b9e1f7c5a20
+Create Date: 2026-10-17 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7ab4afc8e24'
+down_revision: Union[str, Sequence[str], None] = '3b9e1f7c5a20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Ключи сравниваются в порядке байтов (как листинг S3): в sqlite это
+    # BINARY по умолчанию, в postgresql - отдельные индексы с COLLATE "C"
+    if op.get_bind().dialect.name == 'postgresql':
+        op.create_index('ix_s3_objects_bucket_key_c', 's3_objects', ['bucket', sa.text('key COLLATE "C"')], unique=False)
+        op.create_index('ix_s3_objects_key_c', 's3_objects', [sa.text('key COLLATE "C"')], unique=False)
+    else:
+        op.create_index('ix_s3_objects_key_c', 's3_objects', ['key'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_s3_objects_key_c', table_name='s3_objects')
+    if op.get_bind().dialect.name == 'postgresql':
+        op.drop_index('ix_s3_objects_bucket_key_c', table_name='s3_objects')
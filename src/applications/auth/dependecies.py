@@ -12,14 +12,19 @@ from pydantic import EmailStr
 from starlette.requests import Request
 
 from .utils import _ACCESS_TYPE, _TOKEN_TYPE_FIELD, _REFRESH_TYPE
+from applications.auth.user_cache import get_user_cache
 from applications.auth.user_service import user_auth_service
-from applications.auth.utils import decode_jwt, verify_password
+from applications.auth.utils import decode_jwt, needs_rehash, verify_password_async
 from core.database import get_session
+from core.database.routing import use_primary
 
 # _refresh_bearer = HTTPBearer(auto_error=False, description="Wait refresh token")
 _oauth2_scheme = OAuth2PasswordBearer(
     tokenUrl="/auth/sign-in", description="Root point login"
 )
+_optional_oauth2_scheme = OAuth2PasswordBearer(
+    tokenUrl="/auth/sign-in", description="Root point login", auto_error=False
+)
 
 
 async def validate_auth_user(
@@ -30,8 +35,15 @@ async def validate_auth_user(
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    if not verify_password(plain_password=password, hashed_password=user.password):
+    if not await verify_password_async(
+        plain_password=password, hashed_password=user.password
+    ):
         raise HTTPException(status_code=401, detail="Incorrect password or email")
+    if needs_rehash(user.password):
+        # Сменился cost factor - перехешируем, пока знаем открытый пароль
+        await user_auth_service.set_password(
+            user=user, password=password, session=session
+        )
     return user
 
 
@@ -58,7 +70,16 @@ async def _get_current_user_from_payload(payload: dict, session):
     email = payload.get("sub")
     if not email:
         raise HTTPException(status_code=400, detail="Invalid credentials")
-    user = await user_auth_service.get_user(email=email, session=session)
+    cache = get_user_cache()
+    user = cache.get(user_id=payload.get("id"), email=email)
+    if user is None:
+        generation = cache.generation()
+        # В кеш - только строка с primary: с отстающей реплики закешировали бы
+        # уже заблокированного пользователя на весь TTL
+        use_primary(session)
+        user = await user_auth_service.get_user(email=email, session=session)
+        if user:
+            cache.set(user, generation=generation)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     if not user.is_active:
@@ -72,6 +93,17 @@ async def get_current_user(payload=Depends(get_payload), session=Depends(get_ses
     return await _get_current_user_from_payload(payload=payload, session=session)
 
 
+async def get_optional_user(
+    token: str | None = Depends(_optional_oauth2_scheme), session=Depends(get_session)
+):
+    """Текущий пользователь, если передан токен; без токена - None"""
+    if token is None:
+        return None
+    payload = get_payload(token)
+    check_token_type(payload, token_type=_ACCESS_TYPE)
+    return await _get_current_user_from_payload(payload=payload, session=session)
+
+
 async def get_current_user_for_refresh(
     payload=Depends(get_payload), session=Depends(get_session)
 ):
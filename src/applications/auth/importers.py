@@ -0,0 +1,74 @@
+"""
+Разбор тела запроса массового импорта пользователей
+- application/json: список объектов UserCreate
+- application/x-ndjson: объект UserCreate на строку
+- text/csv: заголовок fullname,phone,email,password1,password2
+  (или просто password - тогда он же считается подтверждением)
+Формат проверяется до чтения тела, тело читается с лимитом размера
+"""
+
+import csv
+import io
+import json
+
+from fastapi import HTTPException, Request, status
+
+_FORMATS = {
+    "application/json": "json",
+    "application/x-ndjson": "ndjson",
+    "application/ndjson": "ndjson",
+    "text/csv": "csv",
+}
+
+
+def import_format(content_type: str) -> str:
+    """json / ndjson / csv по Content-Type, иначе 415"""
+    fmt = _FORMATS.get(content_type.split(";")[0].strip().lower())
+    if fmt is None:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Use application/json, application/x-ndjson or text/csv",
+        )
+    return fmt
+
+
+def _too_large(max_size: int) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"Import body is larger than {max_size} bytes",
+    )
+
+
+async def read_import_body(request: Request, max_size: int) -> bytes:
+    """Тело потоком: больше max_size не буферизуем (Content-Length не обязателен)"""
+    length = request.headers.get("content-length")
+    if length and length.isdigit() and int(length) > max_size:
+        raise _too_large(max_size)
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > max_size:
+            raise _too_large(max_size)
+    return bytes(body)
+
+
+def parse_import_body(content_type: str, body: bytes) -> list[dict]:
+    fmt = import_format(content_type)
+    try:
+        text = body.decode("utf-8-sig")
+        if fmt == "json":
+            rows = json.loads(text)
+            if not isinstance(rows, list):
+                raise ValueError("expected a JSON array")
+        elif fmt == "ndjson":
+            rows = [json.loads(line) for line in text.splitlines() if line.strip()]
+        else:
+            rows = list(csv.DictReader(io.StringIO(text)))
+    except (UnicodeDecodeError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid import body: {e}")
+    for row in rows:
+        if isinstance(row, dict) and "password" in row:
+            password = row.pop("password")
+            row.setdefault("password1", password)
+            row.setdefault("password2", password)
+    return rows
@@ -1,4 +1,5 @@
 from datetime import datetime
+from typing import Literal
 
 from pydantic import BaseModel, ConfigDict, EmailStr
 
@@ -26,6 +27,19 @@ class User(UserBase):
     updated_at: datetime | None
 
 
+class UserPage(BaseModel):
+    items: list[User]
+    next_cursor: int | None = None
+
+
+class ImportResult(BaseModel):
+    row: int
+    email: str | None = None
+    status: Literal["created", "duplicate", "error"]
+    id: int | None = None
+    error: str | None = None
+
+
 class UserLogin(BaseModel):
     email: EmailStr
     password: str
@@ -0,0 +1,103 @@
+"""
+Кеш аутентифицированных пользователей (в памяти процесса)
+- Ключи: id и email, запись живет ttl секунд, размер ограничен (LRU)
+- Хранятся значения колонок, на каждое попадание - новый объект User,
+  поэтому запросы не делят между собой один ORM объект
+- UserService сбрасывает запись после commit изменения пользователя.
+  Чтение, начатое до сброса, в кеш не попадает (поколение кеша)
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from core.conf import settings
+from core.database.models import User
+from core.lazy import Lazy
+
+_COLUMNS = [column.key for column in User.__table__.columns]
+
+
+class UserCache:
+
+    def __init__(self, ttl: float, max_size: int):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._by_id: OrderedDict[int, tuple[float, dict]] = OrderedDict()
+        self._ids_by_email: dict[str, int] = {}
+        self._lock = threading.Lock()
+        # Растет при каждом сбросе: set() с более старым поколением пропускается
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id: int | None = None, email: str | None = None) -> User | None:
+        with self._lock:
+            if user_id is None and email is not None:
+                user_id = self._ids_by_email.get(email)
+            item = self._by_id.get(user_id) if user_id is not None else None
+            # email токена (sub) должен совпадать: иначе без кеша был бы 404
+            stale = item is not None and (
+                item[0] < time.monotonic()
+                or (email is not None and item[1]["email"] != email)
+            )
+            if item is None or stale:
+                if stale:
+                    self._drop(user_id)
+                self.misses += 1
+                return None
+            self._by_id.move_to_end(user_id)
+            self.hits += 1
+            return User(**item[1])
+
+    def generation(self) -> int:
+        """Снимается до чтения из БД и передается в set()"""
+        with self._lock:
+            return self._generation
+
+    def set(self, user: User, generation: int | None = None):
+        values = {key: getattr(user, key) for key in _COLUMNS}
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                # Пока читали, пользователя изменили - строка могла устареть
+                return
+            self._drop(user.id)
+            self._by_id[user.id] = (time.monotonic() + self.ttl, values)
+            self._ids_by_email[user.email] = user.id
+            while len(self._by_id) > self.max_size:
+                self._drop(next(iter(self._by_id)))
+
+    def _drop(self, user_id: int):
+        item = self._by_id.pop(user_id, None)
+        if item is not None:
+            self._ids_by_email.pop(item[1]["email"], None)
+
+    def invalidate(self, user_id: int | None = None, email: str | None = None):
+        with self._lock:
+            self._generation += 1
+            if user_id is None and email is not None:
+                user_id = self._ids_by_email.get(email)
+            if user_id is not None:
+                self._drop(user_id)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._by_id.clear()
+            self._ids_by_email.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._by_id),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+def _create_user_cache() -> UserCache:
+    return UserCache(ttl=settings.user_cache_ttl, max_size=settings.user_cache_max_size)
+
+
+get_user_cache = Lazy(_create_user_cache)
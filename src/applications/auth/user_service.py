@@ -3,13 +3,23 @@
 Реализация сервиса по работе с таблицей пользователей
 """
 
+import asyncio
+import csv
+import io
+from collections.abc import AsyncIterator
+
 from fastapi import HTTPException, status
+from pydantic import ValidationError
 from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
 
-from applications.auth.schemas import UserCreate, UserUpdate
-from applications.auth.utils import hash_password
+from applications.auth.schemas import User as UserSchema, UserCreate, UserUpdate
+from applications.auth.user_cache import get_user_cache
+from applications.auth.utils import get_password_executor, hash_password_async
+from core.conf import settings
 from core.database import BaseRepository
-from typing import Annotated, TYPE_CHECKING
+from core.database.conf import new_session
+from typing import Annotated, Literal, TYPE_CHECKING
 
 from core.database.models import User
 
@@ -18,6 +28,7 @@ if TYPE_CHECKING:
 
 
 class UserService(BaseRepository):
+    model = User
 
     async def create(
         self,
@@ -26,33 +37,184 @@ class UserService(BaseRepository):
     ) -> "User":
         if data.password1 != data.password2:
             raise HTTPException(status_code=400, detail="Passwords don't match")
-        password = hash_password(data.password1)
+        password = await hash_password_async(data.password1)
         data = data.model_dump(exclude_none=True, exclude_unset=True)
-        user = User(
-            password=password,
-            fullname=data["fullname"],
-            phone=data["phone"],
-            email=data["email"],
-        )
-        session.add(user)
-        await session.commit()
-        await session.refresh(user)
-        return user
-
-    async def find_all(self, user: User, session: "AsyncSession"):
-        if user.is_admin:
-            res = await session.execute(select(User))
-            return res.scalars().all()
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="доступно только администраторам",
-        )
+        try:
+            return await self.insert_one(
+                session,
+                password=password,
+                fullname=data.get("fullname"),
+                phone=data.get("phone"),
+                email=data["email"],
+            )
+        except IntegrityError:
+            await session.rollback()
+            raise HTTPException(status_code=400, detail="User already exists")
+
+    @staticmethod
+    def _check_admin(user: User):
+        if not user.is_admin:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="доступно только администраторам",
+            )
+
+    @staticmethod
+    def _filtered(is_active: bool | None = None, is_admin: bool | None = None):
+        stmt = select(User).order_by(User.id)
+        if is_active is not None:
+            stmt = stmt.where(User.is_active == is_active)
+        if is_admin is not None:
+            stmt = stmt.where(User.is_admin == is_admin)
+        return stmt
+
+    async def find_all(
+        self,
+        user: User,
+        session: "AsyncSession",
+        after_id: int | None = None,
+        limit: int = 100,
+        is_active: bool | None = None,
+        is_admin: bool | None = None,
+    ) -> tuple[list[User], int | None]:
+        """
+        Страница пользователей по курсору (keyset по id): WHERE id > after_id.
+        Возвращаем страницу и курсор следующей (None - страниц больше нет)
+        """
+        self._check_admin(user)
+        limit = max(1, min(limit, settings.users_page_max_size))
+        stmt = self._filtered(is_active, is_admin).limit(limit + 1)
+        if after_id is not None:
+            stmt = stmt.where(User.id > after_id)
+        res = await session.execute(stmt)
+        users = list(res.scalars().all())
+        if len(users) > limit:
+            return users[:limit], users[limit - 1].id
+        return users, None
+
+    def export_all(
+        self,
+        user: User,
+        fmt: Literal["ndjson", "csv"] = "ndjson",
+        is_active: bool | None = None,
+        is_admin: bool | None = None,
+    ) -> AsyncIterator[str]:
+        """
+        Выгрузка всех пользователей построчно (stream_scalars), без загрузки
+        таблицы в память. Права проверяются сразу, до начала отдачи ответа
+        """
+        self._check_admin(user)
+        return self._export(fmt, self._filtered(is_active, is_admin))
+
+    @staticmethod
+    async def _export(fmt: str, stmt) -> AsyncIterator[str]:
+        # Своя сессия: сессия из зависимости закрывается до отдачи ответа
+        async with new_session() as session:
+            rows = await session.stream_scalars(
+                stmt.execution_options(yield_per=settings.users_export_batch_size)
+            )
+            if fmt == "csv":
+                buffer = io.StringIO()
+                writer = csv.DictWriter(
+                    buffer, fieldnames=list(UserSchema.model_fields)
+                )
+                writer.writeheader()
+                async for row in rows:
+                    writer.writerow(UserSchema.model_validate(row).model_dump())
+                    yield buffer.getvalue()
+                    buffer.seek(0)
+                    buffer.truncate()
+                if header_only := buffer.getvalue():
+                    yield header_only
+                return
+            async for row in rows:
+                yield UserSchema.model_validate(row).model_dump_json() + "\n"
+
+    async def import_users(
+        self, user: User, rows: list, session: "AsyncSession"
+    ) -> list[dict]:
+        """
+        Массовый импорт: пароли хешируются параллельно в пуле bcrypt
+        (не больше доли users_import_hash_share воркеров - входы не ждут импорт),
+        вставка пачками по users_import_batch_size многострочным INSERT,
+        существующие email пропускаются (ON CONFLICT DO NOTHING).
+        Результат по каждой строке: created / duplicate / error
+        """
+        self._check_admin(user)
+        results = []
+        valid: list[tuple[dict, UserCreate]] = []
+        seen = set()
+        for number, row in enumerate(rows, start=1):
+            result = {"row": number, "email": None, "status": "error", "id": None}
+            results.append(result)
+            try:
+                data = UserCreate.model_validate(row)
+            except ValidationError as e:
+                result["error"] = "; ".join(
+                    f"{'.'.join(map(str, err['loc']))}: {err['msg']}"
+                    for err in e.errors()
+                )
+                continue
+            result["email"] = data.email
+            if data.password1 != data.password2:
+                result["error"] = "Passwords don't match"
+            elif data.email in seen:
+                result["status"] = "duplicate"
+            else:
+                seen.add(data.email)
+                valid.append((result, data))
+
+        workers = get_password_executor().max_workers
+        share = int(workers * settings.users_import_hash_share)
+        slots = asyncio.Semaphore(max(1, min(share, workers - 1)))
+
+        async def hash_one(password: str) -> str:
+            async with slots:
+                return await hash_password_async(password)
+
+        batch_size = settings.users_import_batch_size
+        for start in range(0, len(valid), batch_size):
+            batch = valid[start : start + batch_size]
+            passwords = await asyncio.gather(
+                *(hash_one(data.password1) for _, data in batch),
+                return_exceptions=True,
+            )
+            values, pending = [], []
+            for (result, data), password in zip(batch, passwords):
+                if isinstance(password, Exception):
+                    result["error"] = f"Password hashing failed: {password}"
+                    continue
+                values.append(
+                    {
+                        "email": data.email,
+                        "fullname": data.fullname,
+                        "phone": data.phone,
+                        "password": password,
+                    }
+                )
+                pending.append(result)
+            inserted = await self.insert_many(
+                session, values, User.id, User.email, conflict_columns=["email"]
+            )
+            ids = {email: user_id for user_id, email in inserted}
+            for result in pending:
+                if result["email"] in ids:
+                    result.update(status="created", id=ids[result["email"]])
+                else:
+                    result["status"] = "duplicate"
+        return results
 
     async def delete(self, user: User, session: "AsyncSession"):
-        user.is_active = False
+        # Сброс кеша - после commit: иначе параллельный запрос успеет
+        # закешировать старую строку
+        deleted = await self.update_one(
+            session, User.id == user.id, commit=False, is_active=False
+        )
         await session.commit()
-        await session.refresh(user)
-        return user
+        get_user_cache().invalidate(user_id=user.id)
+        if deleted is None:
+            raise HTTPException(status_code=404, detail="User not found")
+        return deleted
 
     async def update(
         self,
@@ -60,11 +222,26 @@ class UserService(BaseRepository):
         data: UserUpdate,
         session: "AsyncSession",
     ):
-        for k, v in data.model_dump(exclude_none=True, exclude_unset=True):
-            setattr(user_in, k, v)
+        values = data.model_dump(exclude_none=True, exclude_unset=True)
+        if not values:
+            return user_in
+        updated = await self.update_one(
+            session, User.id == user_in.id, commit=False, **values
+        )
+        await session.commit()
+        get_user_cache().invalidate(user_id=user_in.id)
+        if updated is None:
+            raise HTTPException(status_code=404, detail="User not found")
+        return updated
+
+    async def set_password(self, user: User, password: str, session: "AsyncSession"):
+        password = await hash_password_async(password)
+        updated = await self.update_one(
+            session, User.id == user.id, commit=False, password=password
+        )
         await session.commit()
-        await session.refresh(user_in)
-        return user_in
+        get_user_cache().invalidate(user_id=user.id)
+        return updated
 
     async def get_user(
         self,
@@ -1,18 +1,20 @@
 """
 Модуль утилит по работе с паролями и токенов
 - Хеширование пароля
-- Валидация пароля
+- Валидация пароля (bcrypt - в отдельном пуле, не блокируя event loop)
 - Выпуск токена
 - Декодирование токена
 """
 
 from datetime import UTC, datetime, timedelta
-import bcrypt
 import jwt
+from fastapi import HTTPException
 
 from applications.auth.schemas import UserCreate
+from core import metrics
 from core.conf import settings
-
+from core.executor import BlockingExecutor, ExecutorBusy
+from core.lazy import Lazy
 
 _ACCESS_LIFETIME = timedelta(minutes=1)
 _REFRESH_LIFETIME = timedelta(days=7)
@@ -22,24 +24,77 @@ _TOKEN_TYPE_FIELD = "token_type"
 
 
 # ----------------------------- Пароли ----------------------------- #
-def hash_password(password: str) -> str:
+def _create_password_executor() -> BlockingExecutor:
+    return BlockingExecutor(
+        max_workers=settings.password_hash_workers,
+        max_queue=settings.password_hash_max_queue,
+        processes=settings.password_hash_pool == "process",
+        name="bcrypt",
+    )
+
+
+get_password_executor = Lazy(_create_password_executor)
+
+
+def hash_password(password: str, rounds: int | None = None) -> str:
     """Принимаем пароль в виде строки и возвращаешь хеш в виде строки"""
-    return bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode("utf-8")
+    import bcrypt  # только в воркере пула, не при импорте приложения
+
+    if rounds is None:
+        rounds = settings.bcrypt_rounds
+    return bcrypt.hashpw(password.encode(), bcrypt.gensalt(rounds)).decode("utf-8")
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Проверяешь пароль"""
+    import bcrypt
+
     return bcrypt.checkpw(plain_password.encode(), hashed_password.encode())
 
 
+def needs_rehash(hashed_password: str, rounds: int | None = None) -> bool:
+    """Хеш сделан с другим cost factor ($2b$<rounds>$...)"""
+    if rounds is None:
+        rounds = settings.bcrypt_rounds
+    try:
+        return int(hashed_password.split("$")[2]) != rounds
+    except (IndexError, ValueError):
+        return True
+
+
+async def _run_password_task(fn, *args):
+    try:
+        with metrics.tracked("bcrypt"):
+            return await get_password_executor().run(fn, *args)
+    except ExecutorBusy:
+        raise HTTPException(
+            status_code=503,
+            detail="Service is busy, try again later",
+            headers={"Retry-After": "1"},
+        )
+
+
+async def hash_password_async(password: str) -> str:
+    """hash_password в пуле bcrypt, 503 при переполнении очереди"""
+    # rounds - из настроек приложения, а не воркера процессного пула
+    return await _run_password_task(hash_password, password, settings.bcrypt_rounds)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """verify_password в пуле bcrypt, 503 при переполнении очереди"""
+    return await _run_password_task(verify_password, plain_password, hashed_password)
+
+
 # ----------------------------- Токены ------------------------------ #
 def encode_jwt(
     payload: dict,
-    secret_key: str = settings.secret_key,
-    algorithm: str = settings.algorithm,
+    secret_key: str | None = None,
+    algorithm: str | None = None,
     refresh: bool = False,
 ):
     """Сгенерировать токен"""
+    secret_key = secret_key or settings.secret_key
+    algorithm = algorithm or settings.algorithm
     to_encode = payload.copy()
     now = datetime.now(UTC)
     exp = now + _ACCESS_LIFETIME if not refresh else now + _REFRESH_LIFETIME
@@ -49,10 +104,12 @@ def encode_jwt(
 
 def decode_jwt(
     token: str,
-    secret_key: str = settings.secret_key,
-    algorithm: str = settings.algorithm,
+    secret_key: str | None = None,
+    algorithm: str | None = None,
 ):
     """Получить словарь из токена"""
+    secret_key = secret_key or settings.secret_key
+    algorithm = algorithm or settings.algorithm
     return jwt.decode(jwt=token, key=secret_key, algorithms=[algorithm])
 
 
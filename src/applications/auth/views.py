@@ -1,7 +1,7 @@
-from typing import Annotated
+from typing import Annotated, Literal
 
-from fastapi import APIRouter, Depends
-from fastapi.responses import Response
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import Response, StreamingResponse
 
 from applications.auth.dependecies import (
     # _refresh_bearer,
@@ -10,12 +10,24 @@ from applications.auth.dependecies import (
     validate_auth_user,
     get_current_user,
 )
-from applications.auth.schemas import Token, UserCreate, User
+from applications.auth.importers import (
+    import_format,
+    parse_import_body,
+    read_import_body,
+)
+from applications.auth.schemas import (
+    ImportResult,
+    Token,
+    UserCreate,
+    User,
+    UserPage,
+)
 from applications.auth.user_service import user_auth_service
 from applications.auth.utils import (
     create_access_token,
     create_refresh_token,
 )
+from core.conf import settings
 from core.database import get_session
 
 router = APIRouter(prefix="/auth")
@@ -58,3 +70,63 @@ async def logout_view(response: Response):
 @router.get("/auth/me", response_model_exclude={"created_at"})
 async def profile(user: annotated_current_user) -> User:
     return user
+
+
+@router.get("/users")
+async def users_list(
+    user: annotated_current_user,
+    after_id: int | None = None,
+    limit: int = 100,
+    is_active: bool | None = None,
+    is_admin: bool | None = None,
+    session=Depends(get_session),
+) -> UserPage:
+    """Список пользователей постранично, next_cursor передается в after_id"""
+    users, next_cursor = await user_auth_service.find_all(
+        user=user,
+        session=session,
+        after_id=after_id,
+        limit=limit,
+        is_active=is_active,
+        is_admin=is_admin,
+    )
+    return UserPage(items=users, next_cursor=next_cursor)
+
+
+@router.get("/users/export")
+async def users_export(
+    user: annotated_current_user,
+    fmt: Literal["ndjson", "csv"] = "ndjson",
+    is_active: bool | None = None,
+    is_admin: bool | None = None,
+):
+    """Потоковая выгрузка всех пользователей в NDJSON или CSV"""
+    rows = user_auth_service.export_all(
+        user=user, fmt=fmt, is_active=is_active, is_admin=is_admin
+    )
+    media_type = "text/csv" if fmt == "csv" else "application/x-ndjson"
+    return StreamingResponse(content=rows, media_type=media_type)
+
+
+@router.post("/users/import")
+async def users_import(
+    request: Request,
+    user: annotated_current_user,
+    session=Depends(get_session),
+) -> list[ImportResult]:
+    """
+    Массовый импорт пользователей (только администраторы).
+    Тело: JSON список UserCreate, NDJSON или CSV - по Content-Type,
+    не больше users_import_max_body_size байт
+    """
+    # Права и формат - до чтения тела
+    if not user.is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="доступно только администраторам",
+        )
+    content_type = request.headers.get("content-type", "")
+    import_format(content_type)
+    body = await read_import_body(request, settings.users_import_max_body_size)
+    rows = parse_import_body(content_type=content_type, body=body)
+    return await user_auth_service.import_users(user=user, rows=rows, session=session)
@@ -0,0 +1,125 @@
+"""
+Распаковка архива (zip / tar, в т.ч. tar.gz) в поток UploadFile
+для пакетной загрузки в S3
+- Файл распаковывается кусками во временный файл (в памяти до 1 МБ,
+  дальше на диске), целиком в память не читается
+- Размер файла, суммарный распакованный размер и число файлов
+  ограничены настройками s3_archive_* (zip-бомбы): проверяется и размер
+  из заголовка архива, и фактически распакованные байты
+"""
+
+import shutil
+import tarfile
+import zipfile
+from collections.abc import AsyncIterator, Iterator
+from tempfile import SpooledTemporaryFile
+from typing import IO
+
+from fastapi import HTTPException, UploadFile, status
+from starlette.concurrency import iterate_in_threadpool
+
+from core.conf import settings
+
+CHUNK_SIZE = 64 * 1024
+SPOOL_MAX_SIZE = 1024 * 1024
+
+
+def _too_large(detail: str) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=detail
+    )
+
+
+class _Limits:
+    def __init__(self):
+        self.members = 0
+        self.total = 0
+
+    def check(self, name: str, size: int):
+        """Размер из заголовка архива - до распаковки"""
+        self.members += 1
+        if self.members > settings.s3_archive_max_members:
+            raise _too_large(
+                f"Archive has more than {settings.s3_archive_max_members} files"
+            )
+        if size > settings.s3_archive_max_member_size:
+            raise _too_large(
+                f"{name} is larger than {settings.s3_archive_max_member_size} bytes"
+            )
+        if self.total + size > settings.s3_archive_max_total_size:
+            raise _too_large(
+                f"Archive is larger than {settings.s3_archive_max_total_size} bytes"
+                " uncompressed"
+            )
+
+    def copy(self, name: str, source: IO[bytes], size: int) -> SpooledTemporaryFile:
+        """
+        Распаковка кусками: больше заявленного размера не читаем,
+        заголовку архива не доверяем
+        """
+        spool = SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+        try:
+            shutil.copyfileobj(source, spool, CHUNK_SIZE)
+            written = spool.tell()
+            if written != size:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"{name}: size does not match archive header",
+                )
+        except BaseException:
+            spool.close()
+            raise
+        self.total += written
+        spool.seek(0)
+        return spool
+
+
+class _BoundedReader:
+    """Чтение не больше limit + 1 байт - лишний байт выдает неверный заголовок"""
+
+    def __init__(self, source: IO[bytes], limit: int):
+        self.source = source
+        self.left = limit + 1
+
+    def read(self, size: int = -1) -> bytes:
+        if self.left <= 0:
+            return b""
+        size = self.left if size < 0 else min(size, self.left)
+        data = self.source.read(size)
+        self.left -= len(data)
+        return data
+
+
+def _members(fileobj) -> Iterator[tuple[str, SpooledTemporaryFile, int]]:
+    limits = _Limits()
+    fileobj.seek(0)
+    if zipfile.is_zipfile(fileobj):
+        fileobj.seek(0)
+        with zipfile.ZipFile(fileobj) as archive:
+            for info in archive.infolist():
+                if info.is_dir():
+                    continue
+                limits.check(info.filename, info.file_size)
+                with archive.open(info) as source:
+                    reader = _BoundedReader(source, info.file_size)
+                    spool = limits.copy(info.filename, reader, info.file_size)
+                yield info.filename, spool, info.file_size
+        return
+    fileobj.seek(0)
+    with tarfile.open(fileobj=fileobj, mode="r:*") as archive:
+        for member in archive:
+            if not member.isfile():
+                continue
+            limits.check(member.name, member.size)
+            with archive.extractfile(member) as source:
+                spool = limits.copy(member.name, source, member.size)
+            yield member.name, spool, member.size
+
+
+async def iter_archive(file: UploadFile) -> AsyncIterator[UploadFile]:
+    """Файлы архива по одному, чтение и распаковка - в пуле потоков"""
+    try:
+        async for name, spool, size in iterate_in_threadpool(_members(file.file)):
+            yield UploadFile(file=spool, filename=name.lstrip("/"), size=size)
+    except (tarfile.TarError, zipfile.BadZipFile):
+        raise HTTPException(status_code=400, detail="Unsupported or broken archive")
@@ -0,0 +1,176 @@
+"""
+Прозрачное сжатие объектов S3 (gzip, zstd - если установлен zstandard)
+- Политика: бакеты и Content-Type, которые сжимаются при загрузке
+- Сжатие потоком при загрузке, объект помечается ContentEncoding и метаданными
+- Отдача: сжатые байты как есть (клиент принимает кодировку)
+  или распаковка потоком
+"""
+
+import asyncio
+import mimetypes
+import zlib
+from collections.abc import AsyncIterable, Awaitable, Callable
+from contextlib import aclosing
+from fnmatch import fnmatch
+
+from core.conf import settings
+from core.lazy import Lazy
+
+# Ключ метаданных объекта (x-amz-meta-compression): сжат этим сервисом
+METADATA_KEY = "compression"
+_CHUNK = 1024 * 1024
+
+
+def _zstandard():
+    try:
+        import zstandard
+    except ImportError as e:
+        raise RuntimeError("zstd compression requires: pip install zstandard") from e
+    return zstandard
+
+
+def compressor(encoding: str, level: int):
+    """Объект с compress(data) / flush()"""
+    if encoding == "gzip":
+        return zlib.compressobj(level, zlib.DEFLATED, 31)
+    if encoding == "zstd":
+        return _zstandard().ZstdCompressor(level=level).compressobj()
+    raise ValueError(f"Unsupported encoding: {encoding}")
+
+
+def decompressor(encoding: str):
+    """Объект с decompress(data) / flush()"""
+    if encoding == "gzip":
+        return zlib.decompressobj(31)
+    if encoding == "zstd":
+        return _zstandard().ZstdDecompressor().decompressobj()
+    raise ValueError(f"Unsupported encoding: {encoding}")
+
+
+def stored_encoding(obj: dict) -> str | None:
+    """Кодировка объекта, сжатого при загрузке (ответ GetObject / HeadObject)"""
+    return obj.get("Metadata", {}).get(METADATA_KEY)
+
+
+def accepts_encoding(accept_encoding: str | None, encoding: str) -> bool:
+    """Принимает ли клиент кодировку (Accept-Encoding, q=0 - отказ)"""
+    for item in (accept_encoding or "").lower().split(","):
+        name, _, params = item.strip().partition(";")
+        if name.strip() in (encoding, "*"):
+            return params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00")
+    return False
+
+
+class CompressionPolicy:
+
+    def __init__(
+        self,
+        encoding: str,
+        level: int,
+        buckets: list[str],
+        content_types: list[str],
+        min_size: int = 0,
+    ):
+        self.encoding = encoding
+        self.level = level
+        self.buckets = set(buckets)
+        self.content_types = content_types
+        self.min_size = min_size
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.buckets or self.content_types)
+
+    def encoding_for(
+        self,
+        bucket_name: str,
+        key: str,
+        content_type: str | None,
+        size: int | None = None,
+    ) -> str | None:
+        """Кодировка для нового объекта или None (хранить как есть)"""
+        if size is not None and size < self.min_size:
+            return None
+        if bucket_name in self.buckets:
+            return self.encoding
+        content_type = content_type or mimetypes.guess_type(key)[0] or ""
+        content_type = content_type.split(";")[0].strip()
+        if any(fnmatch(content_type, pattern) for pattern in self.content_types):
+            return self.encoding
+        return None
+
+    def object_params(self, encoding: str) -> dict:
+        """Параметры PutObject / CreateMultipartUpload для сжатого объекта"""
+        return {"ContentEncoding": encoding, "Metadata": {METADATA_KEY: encoding}}
+
+    def compressing_read(
+        self, read: Callable[[int], Awaitable[bytes]], encoding: str
+    ) -> Callable[[int], Awaitable[bytes]]:
+        """read(size) сжатого потока поверх read(size) исходного"""
+        packer = compressor(encoding, self.level)
+        buffer = bytearray()
+        done = False
+
+        async def read_compressed(size: int) -> bytes:
+            nonlocal done
+            while not done and len(buffer) < size:
+                data = await read(_CHUNK)
+                if data:
+                    # zlib / zstd отпускают GIL - сжимаем в потоке
+                    buffer.extend(await asyncio.to_thread(packer.compress, data))
+                else:
+                    buffer.extend(packer.flush())
+                    done = True
+            data = bytes(buffer[:size])
+            del buffer[:size]
+            return data
+
+        return read_compressed
+
+
+class CompressingReader:
+    """Файлоподобный read(size) сжатого потока для boto3 (в потоке пула)"""
+
+    def __init__(self, fileobj, encoding: str, level: int):
+        self.fileobj = fileobj
+        self._packer = compressor(encoding, level)
+        self._buffer = bytearray()
+        self._done = False
+
+    def read(self, size: int = -1) -> bytes:
+        while not self._done and (size < 0 or len(self._buffer) < size):
+            data = self.fileobj.read(_CHUNK)
+            if data:
+                self._buffer.extend(self._packer.compress(data))
+            else:
+                self._buffer.extend(self._packer.flush())
+                self._done = True
+        if size < 0:
+            size = len(self._buffer)
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+
+
+async def decompress_stream(chunks: AsyncIterable[bytes], encoding: str):
+    """Распаковываем поток кусков, исходный поток закрывается в любом случае"""
+    unpacker = decompressor(encoding)
+    async with aclosing(aiter(chunks)) as source:
+        async for chunk in source:
+            if data := unpacker.decompress(chunk):
+                yield data
+    if tail := unpacker.flush():
+        yield tail
+
+
+def _create_policy() -> CompressionPolicy:
+    return CompressionPolicy(
+        encoding=settings.s3_compress_encoding,
+        level=settings.s3_compress_level,
+        buckets=settings.s3_compress_buckets,
+        content_types=settings.s3_compress_content_types,
+        min_size=settings.s3_compress_min_size,
+    )
+
+
+get_compression_policy = Lazy(_create_policy)
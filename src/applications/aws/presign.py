@@ -0,0 +1,44 @@
+"""
+Ограничения presigned URL: размер, Content-Type и срок жизни
+Размер и Content-Type входят в подпись (SigV4), S3 отклонит другой запрос
+"""
+
+from fnmatch import fnmatch
+
+from fastapi import HTTPException, status
+
+from core.conf import settings
+
+# Ограничения S3 на multipart upload
+MAX_PARTS = 10_000
+MIN_PART_SIZE = 5 * 1024 * 1024
+
+
+def check_upload(size: int, content_type: str):
+    if size > settings.s3_presign_max_size:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"File is larger than {settings.s3_presign_max_size} bytes",
+        )
+    allowed = settings.s3_presign_content_types
+    if allowed and not any(fnmatch(content_type, pattern) for pattern in allowed):
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=f"Content-Type {content_type} is not allowed",
+        )
+
+
+def expires_in(expires: int | None) -> int:
+    if expires is None:
+        return settings.s3_presign_expires
+    if not 0 < expires <= settings.s3_presign_max_expires:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"expires must be in 1..{settings.s3_presign_max_expires}",
+        )
+    return expires
+
+
+def part_size_for(size: int, part_size: int) -> int:
+    """Размер части: не меньше 5 MiB и не больше 10000 частей на файл"""
+    return max(part_size, MIN_PART_SIZE, -(-size // MAX_PARTS))
@@ -0,0 +1,42 @@
+"""
+Сверка индекса объектов (s3_objects) с S3 вне HTTP, например по cron:
+    python -m applications.aws.reconcile [bucket ...]
+Без бакетов - все бакеты
+"""
+
+import argparse
+import asyncio
+
+from loguru import logger
+
+from applications.aws.services import get_async_aws_service
+from applications.aws.services.object_index import object_index
+from core.database.conf import dispose_engines, new_session
+
+
+async def reconcile(buckets: list[str]) -> list[dict]:
+    aws_service = get_async_aws_service()
+    await aws_service.start()
+    summaries = []
+    try:
+        async with new_session() as session:
+            for bucket in buckets or [None]:
+                summaries += await object_index.reconcile(
+                    aws_service, session, bucket=bucket
+                )
+    finally:
+        await aws_service.close()
+        await dispose_engines()
+    for summary in summaries:
+        logger.info(
+            "Reconciled {bucket}: scanned {scanned}, upserted {upserted}, "
+            "deleted {deleted}",
+            **summary,
+        )
+    return summaries
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild s3_objects index from S3")
+    parser.add_argument("buckets", nargs="*", help="buckets to reconcile")
+    asyncio.run(reconcile(parser.parse_args().buckets))
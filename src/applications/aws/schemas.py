@@ -0,0 +1,100 @@
+from datetime import datetime
+
+from pydantic import BaseModel, ConfigDict, Field
+
+
+class UploadResult(BaseModel):
+    key: str
+    etag: str | None = None
+    size: int | None = None
+    error: str | None = None
+    sha256: str | None = None
+    # Такое содержимое уже было: объект не загружался заново
+    deduplicated: bool = False
+
+
+class PresignUploadRequest(BaseModel):
+    key: str
+    content_type: str = "application/octet-stream"
+    size: int = Field(ge=0)
+    expires: int | None = None
+
+
+class PresignedUrl(BaseModel):
+    url: str
+    method: str
+    expires_in: int
+    # Заголовки, которые клиент обязан отправить (они подписаны)
+    headers: dict[str, str] = {}
+
+
+class PresignedPart(BaseModel):
+    part_number: int
+    size: int
+    url: str
+
+
+class PresignedMultipart(BaseModel):
+    key: str
+    upload_id: str
+    part_size: int
+    expires_in: int
+    parts: list[PresignedPart]
+
+
+class CompletedPart(BaseModel):
+    part_number: int
+    etag: str
+
+
+class MultipartUpload(BaseModel):
+    key: str
+    upload_id: str
+
+
+class MultipartCompleteRequest(MultipartUpload):
+    parts: list[CompletedPart]
+
+
+class UploadComplete(BaseModel):
+    key: str
+
+
+class ObjectInfo(BaseModel):
+    key: str
+    size: int
+    etag: str
+    content_type: str | None = None
+
+
+class IndexedObject(ObjectInfo):
+    model_config = ConfigDict(from_attributes=True)
+    id: int
+    bucket: str
+    uploader_id: int | None = None
+    created_at: datetime | None
+    updated_at: datetime | None
+
+
+class IndexedObjectPage(BaseModel):
+    items: list[IndexedObject]
+    next_cursor: int | None = None
+
+
+class IndexedKeyPage(BaseModel):
+    items: list[IndexedObject]
+    # Передается в after_key для следующей страницы
+    next_key: str | None = None
+
+
+class IndexedBucket(BaseModel):
+    bucket: str
+    objects: int
+    size: int
+
+
+class ReconcileResult(BaseModel):
+    bucket: str
+    scanned: int
+    upserted: int
+    deleted: int
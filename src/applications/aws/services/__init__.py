@@ -1,7 +1,7 @@
-from .async_aws import aws_service as async_aws_service
-from .sync_aws import sync_aws_service
+from .async_aws import get_aws_service as get_async_aws_service
+from .sync_aws import get_sync_aws_service
 
 __all__ = [
-    async_aws_service,
-    sync_aws_service,
+    get_async_aws_service,
+    get_sync_aws_service,
 ]
\ No newline at end of file
@@ -1,45 +1,583 @@
-from contextlib import asynccontextmanager
+import asyncio
+import os
+from collections.abc import (
+    AsyncIterable,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Iterable,
+)
+from contextlib import AsyncExitStack, asynccontextmanager, suppress
 
-from aiobotocore.session import get_session
+from botocore.exceptions import BotoCoreError, ClientError
 from fastapi import UploadFile
+from loguru import logger
 
+from applications.aws.compression import (
+    CompressionPolicy,
+    get_compression_policy,
+    stored_encoding,
+)
+from applications.aws.services.bucket_cache import BucketCache
+from applications.aws.services.disk_cache import (
+    CachedFile,
+    CacheEntry,
+    DiskCache,
+    get_object_cache,
+)
+from applications.aws.services.instrumentation import instrument_client
+from applications.aws.services.listing import list_params, page_records
 from core.conf import settings
+from core.lazy import Lazy
+
+
+def _error_code(error: ClientError) -> str:
+    return error.response.get("Error", {}).get("Code", "")
+
+
+async def _aiter(items: Iterable):
+    for item in items:
+        yield item
+
+
+def _file_size(file: UploadFile) -> int:
+    if file.size is not None:
+        return file.size
+    position = file.file.tell()
+    file.file.seek(0, 2)
+    size = file.file.tell()
+    file.file.seek(position)
+    return size
 
 
 class S3Service:
 
-    def __init__(self, access_key, secret_key, endpoint):
+    def __init__(
+        self,
+        access_key,
+        secret_key,
+        endpoint,
+        max_pool_connections: int = 10,
+        keepalive_timeout: float = 12,
+        tcp_keepalive: bool = True,
+        bucket_cache_ttl: float = 300,
+        multipart_threshold: int = 64 * 1024 * 1024,
+        multipart_part_size: int = 8 * 1024 * 1024,
+        multipart_concurrency: int = 4,
+        multipart_retries: int = 3,
+        batch_concurrency: int = 16,
+        purge_batch_concurrency: int = 4,
+        purge_bucket_concurrency: int = 4,
+        cache: DiskCache | None = None,
+        compression: CompressionPolicy | None = None,
+    ):
+        # aiobotocore (и aiohttp) грузятся при создании сервиса, не при импорте
+        from aiobotocore.config import AioConfig
+        from aiobotocore.session import get_session
+
         self.config = {
             "aws_access_key_id": access_key,
             "aws_secret_access_key": secret_key,
             "endpoint_url": endpoint,
+            "config": AioConfig(
+                # SigV4: в presigned URL подписываются Content-Length / Content-Type
+                signature_version="s3v4",
+                max_pool_connections=max_pool_connections,
+                tcp_keepalive=tcp_keepalive,
+                connector_args={"keepalive_timeout": keepalive_timeout},
+            ),
         }
         self.session = get_session()
+        self._exit_stack: AsyncExitStack | None = None
+        self._shared_client = None
+        self.buckets = BucketCache(ttl=bucket_cache_ttl)
+        self.multipart_threshold = multipart_threshold
+        self.multipart_part_size = multipart_part_size
+        self.multipart_concurrency = multipart_concurrency
+        self.multipart_retries = multipart_retries
+        self.batch_concurrency = batch_concurrency
+        self.purge_batch_concurrency = purge_batch_concurrency
+        self.purge_bucket_concurrency = purge_bucket_concurrency
+        self.cache = cache
+        self.compression = compression
+
+    async def start(self):
+        """Открываем общий клиент (и пул соединений) на весь процесс"""
+        if self._shared_client is not None:
+            return
+        self._exit_stack = AsyncExitStack()
+        self._shared_client = instrument_client(
+            await self._exit_stack.enter_async_context(
+                self.session.create_client("s3", **self.config)
+            )
+        )
+
+    async def close(self):
+        """Закрываем общий клиент"""
+        if self._exit_stack is None:
+            return
+        try:
+            await self._exit_stack.aclose()
+        finally:
+            self._exit_stack = None
+            self._shared_client = None
 
     @asynccontextmanager
     async def _client(self):
+        if self._shared_client is not None:
+            yield self._shared_client
+            return
+        # Сервис не запущен через lifespan (скрипты, тесты) - временный клиент
         async with self.session.create_client("s3", **self.config) as c:
-            yield c
+            yield instrument_client(c)
+
+    async def _ensure_bucket(self, s3, bucket_name: str):
+        """Создаем бакет, если его нет (гонка с другим воркером не ошибка)"""
+        try:
+            await s3.create_bucket(Bucket=bucket_name)
+        except ClientError as e:
+            if _error_code(e) not in ("BucketAlreadyOwnedByYou", "BucketAlreadyExists"):
+                raise
+        self.buckets.add(bucket_name)
+
+    async def _ensure_bucket_cached(self, s3, bucket_name: str):
+        if bucket_name not in self.buckets:
+            await self._ensure_bucket(s3, bucket_name)
+
+    async def _upload_part(
+        self, s3, bucket_name: str, key: str, upload_id: str, number: int, data
+    ) -> str:
+        """Загружаем одну часть, при сбое повторяем только ее"""
+        for attempt in range(self.multipart_retries + 1):
+            try:
+                res = await s3.upload_part(
+                    Bucket=bucket_name,
+                    Key=key,
+                    UploadId=upload_id,
+                    PartNumber=number,
+                    Body=data,
+                )
+                return res["ETag"]
+            except (BotoCoreError, ClientError):
+                if attempt == self.multipart_retries:
+                    raise
+                await asyncio.sleep(0.2 * 2**attempt)
+
+    async def _multipart_upload(
+        self,
+        s3,
+        bucket_name: str,
+        key: str,
+        read: Callable[[int], Awaitable[bytes]],
+        **params,
+    ):
+        """
+        Загрузка частями: части читаются по очереди из read(size),
+        отправляются параллельно (не больше multipart_concurrency в памяти).
+        params - дополнительные параметры объекта (ContentType)
+        """
+        upload = await s3.create_multipart_upload(Bucket=bucket_name, Key=key, **params)
+        upload_id = upload["UploadId"]
+        parts = []
+        slots = asyncio.Semaphore(self.multipart_concurrency)
+
+        async def send(number: int, data: bytes):
+            try:
+                etag = await self._upload_part(
+                    s3, bucket_name, key, upload_id, number, data
+                )
+                parts.append({"PartNumber": number, "ETag": etag})
+            finally:
+                slots.release()
+
+        try:
+            async with asyncio.TaskGroup() as tg:
+                number = 1
+                while True:
+                    await slots.acquire()
+                    data = await read(self.multipart_part_size)
+                    if not data:
+                        slots.release()
+                        break
+                    tg.create_task(send(number, data))
+                    number += 1
+            if not parts:
+                # Пустой файл: S3 не принимает multipart без частей
+                await s3.abort_multipart_upload(
+                    Bucket=bucket_name, Key=key, UploadId=upload_id
+                )
+                return await s3.put_object(
+                    Bucket=bucket_name, Key=key, Body=b"", **params
+                )
+            parts.sort(key=lambda part: part["PartNumber"])
+            return await s3.complete_multipart_upload(
+                Bucket=bucket_name,
+                Key=key,
+                UploadId=upload_id,
+                MultipartUpload={"Parts": parts},
+            )
+        except BaseException as e:
+            with suppress(BotoCoreError, ClientError):
+                await s3.abort_multipart_upload(
+                    Bucket=bucket_name, Key=key, UploadId=upload_id
+                )
+            if isinstance(e, ExceptionGroup):
+                raise e.exceptions[0]
+            raise
+
+    def _invalidate(self, bucket_name: str, key: str | None = None):
+        if self.cache is None:
+            return
+        if key is None:
+            self.cache.invalidate_bucket(bucket_name)
+        else:
+            self.cache.invalidate(bucket_name, key)
+
+    def _encoding_for(
+        self,
+        bucket_name: str,
+        key: str,
+        content_type: str | None,
+        size: int | None = None,
+    ) -> str | None:
+        if self.compression is None:
+            return None
+        return self.compression.encoding_for(bucket_name, key, content_type, size)
+
+    async def _put_stream(
+        self,
+        s3,
+        bucket_name: str,
+        key: str,
+        read: Callable[[int], Awaitable[bytes]],
+        **params,
+    ):
+        """Поток короче одной части - одним PutObject, иначе multipart"""
+        first = await read(self.multipart_part_size)
+        if len(first) < self.multipart_part_size:
+            return await s3.put_object(
+                Bucket=bucket_name, Key=key, Body=first, **params
+            )
+        pending = [first]
+
+        async def read_part(size: int) -> bytes:
+            return pending.pop() if pending else await read(size)
+
+        return await self._multipart_upload(s3, bucket_name, key, read_part, **params)
+
+    async def _put_file(self, s3, bucket_name: str, file: UploadFile):
+        size = _file_size(file)
+        encoding = self._encoding_for(
+            bucket_name, file.filename, file.content_type, size
+        )
+        if encoding is not None:
+            # Сжатый размер заранее неизвестен - загружаем как поток
+            result = await self._put_stream(
+                s3,
+                bucket_name,
+                file.filename,
+                self.compression.compressing_read(file.read, encoding),
+                ContentType=file.content_type or "application/octet-stream",
+                **self.compression.object_params(encoding),
+            )
+        elif size >= self.multipart_threshold:
+            result = await self._multipart_upload(
+                s3, bucket_name, file.filename, file.read
+            )
+        else:
+            result = await s3.put_object(
+                Bucket=bucket_name, Key=file.filename, Body=file.file
+            )
+        self._invalidate(bucket_name, file.filename)
+        return result
 
     async def upload_file(self, bucket_name: str, file: UploadFile):
         """Сохраняем файл в S3, если бакета (папки) нету, то создаем ее"""
         async with self._client() as s3:
-            result = await self.get_buckets()
-            if bucket_name in [bucket["Name"] for bucket in result["Buckets"]]:
-                await s3.put_object(
-                    Bucket=bucket_name, Key=file.filename, Body=file.file
+            try:
+                result = await self._put_file(s3, bucket_name, file)
+            except ClientError as e:
+                if _error_code(e) != "NoSuchBucket":
+                    raise
+                self.buckets.discard(bucket_name)
+                await self._ensure_bucket(s3, bucket_name)
+                await file.seek(0)
+                result = await self._put_file(s3, bucket_name, file)
+            self.buckets.add(bucket_name)
+        return result
+
+    async def upload_stream(
+        self,
+        bucket_name: str,
+        key: str,
+        read: Callable[[int], Awaitable[bytes]],
+        content_type: str | None = None,
+    ):
+        """
+        Загрузка из потока (тело запроса) без временных файлов: в памяти
+        не больше multipart_concurrency частей при любом размере.
+        Поток короче одной части уходит одним PutObject.
+        Сжимаемый по политике поток сжимается по ходу загрузки
+        """
+        params = {"ContentType": content_type} if content_type else {}
+        encoding = self._encoding_for(bucket_name, key, content_type)
+        if encoding is not None:
+            read = self.compression.compressing_read(read, encoding)
+            params.update(self.compression.object_params(encoding))
+        async with self._client() as s3:
+            # Поток нельзя перечитать, поэтому бакет проверяем до загрузки
+            await self._ensure_bucket_cached(s3, bucket_name)
+            result = await self._put_stream(s3, bucket_name, key, read, **params)
+        self._invalidate(bucket_name, key)
+        return result
+
+    async def upload_files(
+        self,
+        bucket_name: str,
+        files: Iterable[UploadFile] | AsyncIterable[UploadFile],
+    ) -> list[dict]:
+        """
+        Загружаем много файлов параллельно (не больше batch_concurrency сразу).
+        Ошибка одного файла не прерывает остальные, результат по каждому файлу
+        """
+        if not isinstance(files, AsyncIterable):
+            files = _aiter(files)
+        results: list[dict] = []
+        slots = asyncio.Semaphore(self.batch_concurrency)
+
+        async def put(s3, result: dict, file: UploadFile):
+            try:
+                res = await self._put_file(s3, bucket_name, file)
+                result["etag"] = res.get("ETag", "").strip('"')
+            except (BotoCoreError, ClientError) as e:
+                result["error"] = str(e)
+            finally:
+                await file.close()
+                slots.release()
+
+        async with self._client() as s3:
+            if bucket_name not in self.buckets:
+                await self._ensure_bucket(s3, bucket_name)
+            try:
+                async with asyncio.TaskGroup() as tg:
+                    # Слот берем до чтения следующего файла - ограничиваем и память
+                    await slots.acquire()
+                    async for file in files:
+                        result = {
+                            "key": file.filename,
+                            "etag": None,
+                            "size": _file_size(file),
+                            "error": None,
+                        }
+                        results.append(result)
+                        tg.create_task(put(s3, result, file))
+                        await slots.acquire()
+                    slots.release()
+            except ExceptionGroup as e:
+                # Ошибки S3 put() собирает сам, здесь - ошибки источника файлов
+                raise e.exceptions[0]
+        return results
+
+    async def download_file(
+        self,
+        bucket_name: str,
+        filename: str,
+        range: str | None = None,
+        conditions: dict | None = None,
+    ):
+        """
+        Получаем обьект из S3 (целиком или диапазон байт Range).
+        conditions - IfNoneMatch / IfModifiedSince, неизмененный объект - ClientError 304
+        """
+        params = {"Range": range} if range else {}
+        async with self._client() as s3:
+            return await s3.get_object(
+                Bucket=bucket_name, Key=filename, **params, **(conditions or {})
+            )
+
+    async def download_file_cached(
+        self, bucket_name: str, filename: str
+    ) -> CachedFile | dict:
+        """
+        Чтение через дисковый кеш. Закешированный объект сверяем с S3
+        по ETag (If-None-Match): 304 - отдаем файл с диска без передачи тела.
+        Объекты больше лимита кеша не сохраняются - возвращаем ответ GetObject.
+        Файл кеша возвращается уже открытым
+        """
+        entry = await self._cached_entry(bucket_name, filename)
+        if not isinstance(entry, CacheEntry):
+            return entry
+        cached = self.cache.open(bucket_name, filename, entry)
+        if cached is None:
+            # Вытеснен другим запросом до открытия - отдаем напрямую из S3
+            return await self.download_file(bucket_name, filename)
+        return cached
+
+    async def _cached_entry(self, bucket_name: str, filename: str) -> CacheEntry | dict:
+        entry = self.cache.get(bucket_name, filename)
+        if entry is not None and self.cache.is_fresh(entry):
+            return entry
+        params = {"IfNoneMatch": f'"{entry.etag}"'} if entry else {}
+        async with self._client() as s3:
+            try:
+                obj = await s3.get_object(Bucket=bucket_name, Key=filename, **params)
+            except ClientError as e:
+                if entry is not None and _error_code(e) == "304":
+                    self.cache.touch(entry)
+                    return entry
+                self.cache.invalidate(bucket_name, filename)
+                raise
+        if not self.cache.can_store(obj.get("ContentLength")):
+            self.cache.invalidate(bucket_name, filename)
+            return obj
+        return await self._store_in_cache(bucket_name, filename, obj)
+
+    async def _store_in_cache(
+        self, bucket_name: str, filename: str, obj: dict
+    ) -> CacheEntry:
+        temp = self.cache.open_temp()
+        try:
+            async for chunk in obj["Body"].iter_chunks(1024 * 1024):
+                await asyncio.to_thread(temp.write, chunk)
+            temp.close()
+        except BaseException:
+            temp.close()
+            os.unlink(temp.name)
+            raise
+        finally:
+            obj["Body"].close()
+        return self.cache.commit(
+            bucket_name,
+            filename,
+            temp.name,
+            etag=obj["ETag"].strip('"'),
+            content_type=obj.get("ContentType"),
+            content_encoding=stored_encoding(obj),
+            last_modified=obj.get("LastModified"),
+        )
+
+    async def head_object(self, bucket_name: str, key: str) -> dict | None:
+        """HeadObject, None - если объекта (или бакета) нет"""
+        async with self._client() as s3:
+            try:
+                return await s3.head_object(Bucket=bucket_name, Key=key)
+            except ClientError as e:
+                if _error_code(e) in ("404", "NoSuchKey", "NoSuchBucket"):
+                    return None
+                raise
+
+    async def copy_object(self, bucket_name: str, source_key: str, key: str):
+        """Копия внутри S3: данные не проходят через сервис"""
+        async with self._client() as s3:
+            result = await s3.copy_object(
+                Bucket=bucket_name,
+                Key=key,
+                CopySource={"Bucket": bucket_name, "Key": source_key},
+            )
+        self._invalidate(bucket_name, key)
+        return result
+
+    # --------------------------- Presigned URL --------------------------- #
+    async def presign_put(
+        self,
+        bucket_name: str,
+        key: str,
+        content_type: str,
+        size: int,
+        expires: int,
+    ) -> str:
+        """
+        URL для загрузки клиентом напрямую в S3. Content-Type и Content-Length
+        подписаны: запрос с другим размером или типом S3 отклонит
+        """
+        async with self._client() as s3:
+            await self._ensure_bucket_cached(s3, bucket_name)
+            return await s3.generate_presigned_url(
+                "put_object",
+                Params={
+                    "Bucket": bucket_name,
+                    "Key": key,
+                    "ContentType": content_type,
+                    "ContentLength": size,
+                },
+                ExpiresIn=expires,
+            )
+
+    async def presign_get(
+        self, bucket_name: str, key: str, expires: int, filename: str | None = None
+    ) -> str:
+        """URL для скачивания напрямую из S3"""
+        params = {"Bucket": bucket_name, "Key": key}
+        if filename:
+            params["ResponseContentDisposition"] = f'attachment; filename="{filename}"'
+        async with self._client() as s3:
+            return await s3.generate_presigned_url(
+                "get_object", Params=params, ExpiresIn=expires
+            )
+
+    async def presign_multipart(
+        self,
+        bucket_name: str,
+        key: str,
+        content_type: str,
+        size: int,
+        part_size: int,
+        expires: int,
+    ) -> dict:
+        """Начинаем multipart upload и подписываем URL на каждую часть"""
+        async with self._client() as s3:
+            await self._ensure_bucket_cached(s3, bucket_name)
+            upload = await s3.create_multipart_upload(
+                Bucket=bucket_name, Key=key, ContentType=content_type
+            )
+            upload_id = upload["UploadId"]
+            parts = []
+            for number, offset in enumerate(range(0, size, part_size), 1):
+                length = min(part_size, size - offset)
+                url = await s3.generate_presigned_url(
+                    "upload_part",
+                    Params={
+                        "Bucket": bucket_name,
+                        "Key": key,
+                        "UploadId": upload_id,
+                        "PartNumber": number,
+                        "ContentLength": length,
+                    },
+                    ExpiresIn=expires,
                 )
-                return
-            await s3.create_bucket(Bucket=bucket_name)
-            await s3.put_object(Bucket=bucket_name, Key=file.filename, Body=file.file)
+                parts.append({"part_number": number, "size": length, "url": url})
+        return {"key": key, "upload_id": upload_id, "parts": parts}
+
+    async def complete_multipart(
+        self, bucket_name: str, key: str, upload_id: str, parts: list[dict]
+    ):
+        """parts: [{"PartNumber": n, "ETag": etag}] в любом порядке"""
+        parts = sorted(parts, key=lambda part: part["PartNumber"])
+        async with self._client() as s3:
+            result = await s3.complete_multipart_upload(
+                Bucket=bucket_name,
+                Key=key,
+                UploadId=upload_id,
+                MultipartUpload={"Parts": parts},
+            )
+        self._invalidate(bucket_name, key)
+        return result
 
-    async def download_file(self, bucket_name: str, filename: str):
-        """Получаем обьект из S3"""
+    async def abort_multipart(self, bucket_name: str, key: str, upload_id: str):
         async with self._client() as s3:
-            return await s3.get_object(Bucket=bucket_name, Key=filename)
+            await s3.abort_multipart_upload(
+                Bucket=bucket_name, Key=key, UploadId=upload_id
+            )
+
+    async def confirm_upload(self, bucket_name: str, key: str) -> dict:
+        """Объект загружен клиентом в обход сервиса: HeadObject и сброс кеша"""
+        self._invalidate(bucket_name, key)
+        async with self._client() as s3:
+            return await s3.head_object(Bucket=bucket_name, Key=key)
 
     async def delete_file(self, bucket_name: str, filename: str):
         """Удаляем обьект из S3"""
+        self._invalidate(bucket_name, filename)
         async with self._client() as s3:
             return await s3.delete_object(Bucket=bucket_name, Key=filename)
 
@@ -47,28 +585,138 @@ class S3Service:
         """Создаем бакет в S3"""
         async with self._client() as s3:
             await s3.create_bucket(Bucket=bucket_name)
+        self.buckets.add(bucket_name)
+
+    async def bucket_exists(self, bucket_name: str) -> bool:
+        """Проверяем бакет сначала по кешу, затем через HeadBucket"""
+        if bucket_name in self.buckets:
+            return True
+        async with self._client() as s3:
+            try:
+                await s3.head_bucket(Bucket=bucket_name)
+            except ClientError as e:
+                if _error_code(e) in ("404", "NoSuchBucket"):
+                    return False
+                raise
+        self.buckets.add(bucket_name)
+        return True
 
     async def get_buckets(self):
         """Получаем все бакеты из S3"""
         async with self._client() as s3:
-            return await s3.list_buckets()
+            result = await s3.list_buckets()
+        self.buckets.replace(bucket["Name"] for bucket in result["Buckets"])
+        return result
 
     async def delete_bucket(self, bucket_name: str):
         """Удаляем бакет по имени из S3"""
+        self.buckets.discard(bucket_name)
+        self._invalidate(bucket_name)
         async with self._client() as s3:
             return await s3.delete_bucket(Bucket=bucket_name)
 
-    async def delete_all_buckets(self):
-        """удаляем все бакеты из S3"""
+    async def list_objects(
+        self,
+        bucket_name: str,
+        prefix: str = "",
+        delimiter: str | None = None,
+        continuation_token: str | None = None,
+    ) -> AsyncIterator[dict]:
+        """Листинг объектов бакета постранично (paginator), без загрузки в память"""
+        params = list_params(bucket_name, prefix, delimiter, continuation_token)
+        async with self._client() as s3:
+            paginator = s3.get_paginator("list_objects_v2")
+            async for page in paginator.paginate(**params):
+                for record in page_records(page):
+                    yield record
+
+    async def iter_object_pages(
+        self, bucket_name: str, page_size: int = 1000
+    ) -> AsyncIterator[list[dict]]:
+        """Страницы ListObjectsV2 как есть (Contents) - для сверки индекса"""
+        params = list_params(bucket_name, page_size=page_size)
+        async with self._client() as s3:
+            paginator = s3.get_paginator("list_objects_v2")
+            async for page in paginator.paginate(**params):
+                yield page.get("Contents", [])
+
+    async def empty_bucket(self, bucket_name: str) -> dict:
+        """
+        Удаляем все объекты бакета: список через paginator,
+        удаление пачками по 1000 ключей (delete_objects), пачки параллельно
+        """
+        stats = {"bucket": bucket_name, "deleted": 0, "errors": 0}
+        slots = asyncio.Semaphore(self.purge_batch_concurrency)
+        self._invalidate(bucket_name)
+
+        async def delete_batch(s3, keys: list[dict]):
+            try:
+                res = await s3.delete_objects(
+                    Bucket=bucket_name, Delete={"Objects": keys, "Quiet": True}
+                )
+                errors = len(res.get("Errors", []))
+                stats["deleted"] += len(keys) - errors
+                stats["errors"] += errors
+                logger.info(
+                    "Purge {}: deleted {} objects", bucket_name, stats["deleted"]
+                )
+            finally:
+                slots.release()
+
+        async with self._client() as s3:
+            paginator = s3.get_paginator("list_objects_v2")
+            try:
+                async with asyncio.TaskGroup() as tg:
+                    async for page in paginator.paginate(
+                        Bucket=bucket_name, PaginationConfig={"PageSize": 1000}
+                    ):
+                        if keys := [
+                            {"Key": obj["Key"]} for obj in page.get("Contents", [])
+                        ]:
+                            await slots.acquire()
+                            tg.create_task(delete_batch(s3, keys))
+            except ExceptionGroup as e:
+                raise e.exceptions[0]
+        return stats
+
+    async def delete_all_buckets(self) -> list[dict]:
+        """удаляем все бакеты из S3 вместе с объектами, несколько бакетов сразу"""
         result = await self.get_buckets()
-        if list_buckets := [bucket["Name"] for bucket in result["Buckets"]]:
-            for item in list_buckets:
-                await self.delete_bucket(item)
-        return
+        slots = asyncio.Semaphore(self.purge_bucket_concurrency)
 
+        async def purge(bucket_name: str) -> dict:
+            async with slots:
+                stats = await self.empty_bucket(bucket_name)
+                await self.delete_bucket(bucket_name)
+                return stats
 
-aws_service = S3Service(
-    access_key=settings.MINIO_ROOT_USER,
-    secret_key=settings.MINIO_ROOT_PASSWORD,
-    endpoint=settings.s3_endpoint,
-)
+        summary = await asyncio.gather(
+            *(purge(bucket["Name"]) for bucket in result["Buckets"])
+        )
+        self.buckets.clear()
+        return list(summary)
+
+
+def _create_service() -> S3Service:
+    policy = get_compression_policy()
+    return S3Service(
+        access_key=settings.MINIO_ROOT_USER,
+        secret_key=settings.MINIO_ROOT_PASSWORD,
+        endpoint=settings.s3_endpoint,
+        max_pool_connections=settings.s3_max_pool_connections,
+        keepalive_timeout=settings.s3_keepalive_timeout,
+        tcp_keepalive=settings.s3_tcp_keepalive,
+        bucket_cache_ttl=settings.s3_bucket_cache_ttl,
+        multipart_threshold=settings.s3_multipart_threshold,
+        multipart_part_size=settings.s3_multipart_part_size,
+        multipart_concurrency=settings.s3_multipart_concurrency,
+        multipart_retries=settings.s3_multipart_retries,
+        batch_concurrency=settings.s3_batch_concurrency,
+        purge_batch_concurrency=settings.s3_purge_batch_concurrency,
+        purge_bucket_concurrency=settings.s3_purge_bucket_concurrency,
+        cache=get_object_cache(),
+        compression=policy if policy.enabled else None,
+    )
+
+
+get_aws_service = Lazy(_create_service)
@@ -0,0 +1,36 @@
+"""
+Процессный кеш известных бакетов с TTL
+"""
+
+import time
+from collections.abc import Iterable
+
+
+class BucketCache:
+
+    def __init__(self, ttl: float = 300):
+        self.ttl = ttl
+        self._buckets: dict[str, float] = {}
+
+    def __contains__(self, bucket_name: str) -> bool:
+        expires_at = self._buckets.get(bucket_name)
+        if expires_at is None:
+            return False
+        if expires_at < time.monotonic():
+            self._buckets.pop(bucket_name, None)
+            return False
+        return True
+
+    def add(self, bucket_name: str):
+        self._buckets[bucket_name] = time.monotonic() + self.ttl
+
+    def replace(self, bucket_names: Iterable[str]):
+        """Полностью заменить содержимое (после list_buckets)"""
+        expires_at = time.monotonic() + self.ttl
+        self._buckets = {name: expires_at for name in bucket_names}
+
+    def discard(self, bucket_name: str):
+        self._buckets.pop(bucket_name, None)
+
+    def clear(self):
+        self._buckets.clear()
@@ -0,0 +1,219 @@
+"""
+Дедупликация загрузок по SHA-256 содержимого
+- Индекс digest -> ключ объекта по бакету (таблица object_digests)
+- Запись индекса сверяется с S3 по ETag: удаленный или перезаписанный
+  объект копией не считается, запись удаляется
+- UploadFile хешируется до загрузки (он уже на диске), поток - по ходу
+  загрузки. Digest от клиента позволяет не принимать поток вовсе
+"""
+
+import asyncio
+import hashlib
+import re
+from collections.abc import Awaitable, Callable
+from typing import TYPE_CHECKING
+
+from fastapi import HTTPException, UploadFile
+from sqlalchemy import delete, select
+
+from core.conf import settings
+from core.database import BaseRepository
+from core.database.models import ObjectDigest
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+    from applications.aws.services.async_aws import S3Service
+
+_DIGEST_RE = re.compile(r"^[0-9a-f]{64}$")
+_HASH_CHUNK = 1024 * 1024
+
+
+def parse_digest(value: str | None) -> str | None:
+    """SHA-256 от клиента (hex), 400 при неверном формате"""
+    if value is None:
+        return None
+    value = value.strip().lower()
+    if not _DIGEST_RE.match(value):
+        raise HTTPException(status_code=400, detail="Invalid SHA-256 digest")
+    return value
+
+
+def _hash_file(fileobj) -> tuple[str, int]:
+    position = fileobj.tell()
+    fileobj.seek(0)
+    digest = hashlib.sha256()
+    size = 0
+    while chunk := fileobj.read(_HASH_CHUNK):
+        digest.update(chunk)
+        size += len(chunk)
+    fileobj.seek(position)
+    return digest.hexdigest(), size
+
+
+def _digest_mismatch():
+    return HTTPException(
+        status_code=400, detail="Content does not match the supplied SHA-256"
+    )
+
+
+class DedupService(BaseRepository):
+    model = ObjectDigest
+
+    async def create(
+        self,
+        session: "AsyncSession",
+        bucket: str,
+        digest: str,
+        key: str,
+        size: int,
+        etag: str,
+    ):
+        """Первая запись для digest остается (ON CONFLICT DO NOTHING)"""
+        row = {"bucket": bucket, "digest": digest, "key": key}
+        await self.insert_many(
+            session,
+            [{**row, "size": size, "etag": etag}],
+            conflict_columns=["bucket", "digest"],
+        )
+
+    async def delete(self, session: "AsyncSession", bucket: str, digest: str):
+        await session.execute(
+            delete(ObjectDigest).where(
+                ObjectDigest.bucket == bucket, ObjectDigest.digest == digest
+            )
+        )
+        await session.commit()
+
+    async def update(self, session: "AsyncSession", bucket: str, digest: str, **values):
+        return await self.update_one(
+            session,
+            ObjectDigest.bucket == bucket,
+            ObjectDigest.digest == digest,
+            **values,
+        )
+
+    async def find_all(
+        self, session: "AsyncSession", bucket: str, limit: int = 100
+    ) -> list[ObjectDigest]:
+        res = await session.scalars(
+            select(ObjectDigest)
+            .where(ObjectDigest.bucket == bucket)
+            .order_by(ObjectDigest.id)
+            .limit(limit)
+        )
+        return list(res)
+
+    async def find_existing(
+        self,
+        aws_service: "S3Service",
+        session: "AsyncSession",
+        bucket: str,
+        digest: str,
+    ) -> ObjectDigest | None:
+        """Объект с таким содержимым, если он еще есть в S3 без изменений"""
+        row = await session.scalar(
+            select(ObjectDigest).where(
+                ObjectDigest.bucket == bucket, ObjectDigest.digest == digest
+            )
+        )
+        if row is None:
+            return None
+        head = await aws_service.head_object(bucket, row.key)
+        if head is None or head["ETag"].strip('"') != row.etag:
+            await self.delete(session, bucket, digest)
+            return None
+        return row
+
+    async def _reuse(
+        self,
+        aws_service: "S3Service",
+        existing: ObjectDigest,
+        key: str,
+        copy: bool | None,
+    ) -> dict:
+        """copy=None - по настройке s3_dedup_copy"""
+        if copy is None:
+            copy = settings.s3_dedup_copy
+        result = {
+            "key": existing.key,
+            "etag": existing.etag,
+            "size": existing.size,
+            "sha256": existing.digest,
+            "deduplicated": True,
+        }
+        if existing.key == key or not copy:
+            return result
+        copied = await aws_service.copy_object(existing.bucket, existing.key, key)
+        return {
+            **result,
+            "key": key,
+            "etag": copied["CopyObjectResult"]["ETag"].strip('"'),
+        }
+
+    async def upload_file(
+        self,
+        aws_service: "S3Service",
+        bucket_name: str,
+        file: UploadFile,
+        session: "AsyncSession",
+        digest: str | None = None,
+        copy: bool | None = None,
+    ) -> dict:
+        computed, size = await asyncio.to_thread(_hash_file, file.file)
+        if digest is not None and digest != computed:
+            raise _digest_mismatch()
+        existing = await self.find_existing(aws_service, session, bucket_name, computed)
+        if existing is not None:
+            return await self._reuse(aws_service, existing, file.filename, copy)
+        result = await aws_service.upload_file(bucket_name=bucket_name, file=file)
+        etag = result["ETag"].strip('"')
+        await self.create(session, bucket_name, computed, file.filename, size, etag)
+        return {"key": file.filename, "etag": etag, "size": size, "sha256": computed}
+
+    async def upload_stream(
+        self,
+        aws_service: "S3Service",
+        bucket_name: str,
+        key: str,
+        read: Callable[[int], Awaitable[bytes]],
+        session: "AsyncSession",
+        content_type: str | None = None,
+        digest: str | None = None,
+        copy: bool | None = None,
+    ) -> dict:
+        if digest is not None:
+            existing = await self.find_existing(
+                aws_service, session, bucket_name, digest
+            )
+            if existing is not None:
+                return await self._reuse(aws_service, existing, key, copy)
+
+        hasher = hashlib.sha256()
+        size = 0
+
+        async def read_hashed(n: int) -> bytes:
+            nonlocal size
+            data = await read(n)
+            # hashlib отпускает GIL на больших кусках - считаем в потоке
+            await asyncio.to_thread(hasher.update, data)
+            size += len(data)
+            if len(data) < n and digest is not None and digest != hasher.hexdigest():
+                # Конец потока: ошибка здесь - до PutObject / CompleteMultipartUpload,
+                # загрузка отменяется, прежний объект под key не тронут
+                raise _digest_mismatch()
+            return data
+
+        result = await aws_service.upload_stream(
+            bucket_name=bucket_name,
+            key=key,
+            read=read_hashed,
+            content_type=content_type,
+        )
+        computed = hasher.hexdigest()
+        etag = result["ETag"].strip('"')
+        await self.create(session, bucket_name, computed, key, size, etag)
+        return {"key": key, "etag": etag, "size": size, "sha256": computed}
+
+
+dedup_service = DedupService()
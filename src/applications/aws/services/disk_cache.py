@@ -0,0 +1,209 @@
+"""
+Локальный LRU кеш объектов S3 на диске
+- Бюджет по суммарному размеру файлов, вытесняются давно не читанные
+- Актуальность проверяется по ETag (If-None-Match) при каждом чтении
+- Индекс хранится в памяти процесса: у каждого процесса (воркера) свой
+  подкаталог, чужие файлы процесс не трогает. Подкаталоги завершившихся
+  процессов этого хоста удаляются при старте
+- Файл открывается под блокировкой до отдачи ответа: вытеснение и
+  перезапись не затрагивают уже начатую отдачу
+"""
+
+import hashlib
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import BinaryIO
+
+from core.conf import settings
+from core.lazy import Lazy
+
+
+@dataclass
+class CacheEntry:
+    path: Path
+    etag: str
+    size: int
+    content_type: str | None
+    checked_at: float
+    # Объект хранится сжатым (gzip / zstd), см. applications.aws.compression
+    content_encoding: str | None = None
+    # LastModified из S3 - для Last-Modified / If-Modified-Since
+    last_modified: datetime | None = None
+
+
+@dataclass
+class CachedFile:
+    """Запись кеша и уже открытый файл (закрывает тот, кто отдает ответ)"""
+
+    entry: CacheEntry
+    file: BinaryIO
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class DiskCache:
+
+    def __init__(
+        self,
+        directory: str | Path,
+        max_bytes: int,
+        max_object_bytes: int,
+        fresh_for: float = 0,
+    ):
+        self.max_bytes = max_bytes
+        self.max_object_bytes = max_object_bytes
+        self.fresh_for = fresh_for
+        self._entries: OrderedDict[tuple[str, str], CacheEntry] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.root = Path(directory)
+        host = socket.gethostname()
+        self._prune(host)
+        self.directory = self.root / f"{host}-{os.getpid()}"
+        shutil.rmtree(self.directory, ignore_errors=True)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _prune(self, host: str):
+        """Подкаталоги завершившихся процессов этого хоста (после падения)"""
+        if not self.root.is_dir():
+            return
+        for path in self.root.glob(f"{host}-*"):
+            pid = path.name.removeprefix(f"{host}-")
+            if pid.isdigit() and not _pid_alive(int(pid)):
+                shutil.rmtree(path, ignore_errors=True)
+
+    def _path(self, bucket_name: str, key: str) -> Path:
+        digest = hashlib.sha256(f"{bucket_name}/{key}".encode()).hexdigest()
+        return self.directory / digest
+
+    def get(self, bucket_name: str, key: str) -> CacheEntry | None:
+        with self._lock:
+            entry = self._entries.get((bucket_name, key))
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end((bucket_name, key))
+            self.hits += 1
+            return entry
+
+    def open(self, bucket_name: str, key: str, entry: CacheEntry) -> CachedFile | None:
+        """
+        Открываем файл записи, пока она еще в кеше. Открытый файл переживает
+        вытеснение и перезапись. None - запись уже вытеснена
+        """
+        with self._lock:
+            if self._entries.get((bucket_name, key)) is not entry:
+                return None
+            return CachedFile(entry, open(entry.path, "rb"))
+
+    def is_fresh(self, entry: CacheEntry) -> bool:
+        return time.monotonic() - entry.checked_at < self.fresh_for
+
+    def touch(self, entry: CacheEntry):
+        entry.checked_at = time.monotonic()
+
+    def can_store(self, size: int | None) -> bool:
+        return size is not None and size <= min(self.max_object_bytes, self.max_bytes)
+
+    def open_temp(self):
+        """Временный файл в каталоге кеша, после записи передается в commit"""
+        return tempfile.NamedTemporaryFile(dir=self.directory, delete=False)
+
+    def commit(
+        self,
+        bucket_name: str,
+        key: str,
+        temp_path: str,
+        etag: str,
+        content_type: str | None,
+        content_encoding: str | None = None,
+        last_modified: datetime | None = None,
+    ) -> CacheEntry:
+        """Переносим записанный файл в кеш и вытесняем лишнее"""
+        path = self._path(bucket_name, key)
+        size = os.path.getsize(temp_path)
+        with self._lock:
+            self._drop((bucket_name, key))
+            os.replace(temp_path, path)
+            entry = CacheEntry(
+                path,
+                etag,
+                size,
+                content_type,
+                time.monotonic(),
+                content_encoding,
+                last_modified,
+            )
+            self._entries[(bucket_name, key)] = entry
+            self._size += size
+            while self._size > self.max_bytes and len(self._entries) > 1:
+                self._drop(next(iter(self._entries)))
+        return entry
+
+    def _drop(self, cache_key: tuple[str, str]):
+        entry = self._entries.pop(cache_key, None)
+        if entry is None:
+            return
+        self._size -= entry.size
+        entry.path.unlink(missing_ok=True)
+
+    def invalidate(self, bucket_name: str, key: str):
+        with self._lock:
+            self._drop((bucket_name, key))
+
+    def invalidate_bucket(self, bucket_name: str):
+        with self._lock:
+            for cache_key in [k for k in self._entries if k[0] == bucket_name]:
+                self._drop(cache_key)
+
+    def clear(self):
+        with self._lock:
+            for cache_key in list(self._entries):
+                self._drop(cache_key)
+
+    def close(self):
+        """Удаляем подкаталог процесса (остановка приложения)"""
+        self.clear()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+def _create_cache() -> DiskCache | None:
+    if not settings.s3_disk_cache_dir:
+        return None
+    return DiskCache(
+        directory=settings.s3_disk_cache_dir,
+        max_bytes=settings.s3_disk_cache_max_bytes,
+        max_object_bytes=settings.s3_disk_cache_max_object_bytes,
+        fresh_for=settings.s3_disk_cache_fresh_for,
+    )
+
+
+get_object_cache = Lazy(_create_cache)
@@ -0,0 +1,71 @@
+"""
+Метрики S3 через события botocore (одинаково для boto3 и aiobotocore клиентов)
+- Время каждого вызова API по операции и ошибки
+- Отправленные (тело запроса) и полученные (ContentLength ответа) байты
+"""
+
+import time
+
+from core import metrics
+from core.conf import settings
+
+_STARTED = "metrics_started"
+_OPERATION = "metrics_operation"
+
+
+def _body_size(body) -> int:
+    if body is None:
+        return 0
+    if isinstance(body, (bytes, bytearray, str)):
+        return len(body)
+    try:
+        position = body.tell()
+        body.seek(0, 2)
+        size = body.tell()
+        body.seek(position)
+        return size - position
+    except (AttributeError, OSError, ValueError):
+        return 0
+
+
+def _before_call(model, params, context, **kwargs):
+    context[_STARTED] = time.perf_counter()
+    context[_OPERATION] = model.name
+    sent = _body_size(params.get("body"))
+    if sent:
+        metrics.s3_bytes.inc(sent, operation=model.name, direction="sent")
+
+
+def _after_call(http_response, parsed, model, context, **kwargs):
+    started = context.pop(_STARTED, None)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    metrics.s3_request_duration.observe(elapsed, operation=model.name)
+    metrics.track("s3", elapsed)
+    if http_response.status_code >= 400:
+        metrics.s3_errors.inc(operation=model.name)
+    elif received := parsed.get("ContentLength"):
+        metrics.s3_bytes.inc(received, operation=model.name, direction="received")
+
+
+def _after_call_error(context, **kwargs):
+    # Сетевые ошибки: ответа нет, after-call не вызывается
+    started = context.pop(_STARTED, None)
+    if started is None:
+        return
+    operation = context.get(_OPERATION, "unknown")
+    elapsed = time.perf_counter() - started
+    metrics.s3_request_duration.observe(elapsed, operation=operation)
+    metrics.track("s3", elapsed)
+    metrics.s3_errors.inc(operation=operation)
+
+
+def instrument_client(client):
+    if not settings.metrics_enabled:
+        return client
+    events = client.meta.events
+    events.register("before-call.s3", _before_call)
+    events.register("after-call.s3", _after_call)
+    events.register("after-call-error.s3", _after_call_error)
+    return client
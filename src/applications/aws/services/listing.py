@@ -0,0 +1,46 @@
+"""
+Общий формат записей листинга объектов (ListObjectsV2) для обоих сервисов
+"""
+
+from collections.abc import Iterator
+
+
+def list_params(
+    bucket_name: str,
+    prefix: str = "",
+    delimiter: str | None = None,
+    continuation_token: str | None = None,
+    page_size: int = 1000,
+) -> dict:
+    params = {
+        "Bucket": bucket_name,
+        "Prefix": prefix,
+        "PaginationConfig": {"PageSize": page_size},
+    }
+    if delimiter:
+        params["Delimiter"] = delimiter
+    if continuation_token:
+        params["ContinuationToken"] = continuation_token
+    return params
+
+
+def page_records(page: dict) -> Iterator[dict]:
+    """
+    Записи одной страницы: "prefix" (папки при delimiter), "object",
+    и в конце усеченной страницы "page" с токеном для продолжения
+    """
+    for common_prefix in page.get("CommonPrefixes", []):
+        yield {"type": "prefix", "prefix": common_prefix["Prefix"]}
+    for obj in page.get("Contents", []):
+        yield {
+            "type": "object",
+            "key": obj["Key"],
+            "size": obj["Size"],
+            "etag": obj["ETag"].strip('"'),
+            "last_modified": obj["LastModified"].isoformat(),
+        }
+    if page.get("IsTruncated"):
+        yield {
+            "type": "page",
+            "next_continuation_token": page["NextContinuationToken"],
+        }
@@ -0,0 +1,320 @@
+"""
+Индекс объектов S3 в БД (таблица s3_objects)
+- Запись обновляется вместе с загрузкой / удалением через сервис
+- Листинг бакета, поиск и файлы пользователя - индексными запросами к БД
+- Объекты, загруженные или удаленные в обход сервиса, подтягивает
+  сверка с S3 (reconcile)
+"""
+
+import mimetypes
+from typing import TYPE_CHECKING
+
+from botocore.exceptions import ClientError
+from sqlalchemy import and_, delete, func, select
+
+from core.conf import settings
+from core.database import BaseRepository
+from core.database.models import S3Object
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+    from applications.aws.services.async_aws import S3Service
+
+
+def _row(
+    bucket: str,
+    key: str,
+    size: int,
+    etag: str,
+    content_type: str | None,
+) -> dict:
+    return {
+        "bucket": bucket,
+        "key": key,
+        "size": size,
+        "etag": etag.strip('"'),
+        "content_type": content_type or mimetypes.guess_type(key)[0],
+    }
+
+
+def _page_limit(limit: int) -> int:
+    return max(1, min(limit, settings.s3_index_page_max_size))
+
+
+def _key_column(session: "AsyncSession"):
+    """
+    Ключ в порядке байтов UTF-8, как в листинге S3: в sqlite это BINARY
+    по умолчанию, в postgresql - COLLATE "C" (под него индексы *_key_c)
+    """
+    if session.get_bind().dialect.name == "postgresql":
+        return S3Object.key.collate("C")
+    return S3Object.key
+
+
+def _startswith(column, prefix: str):
+    """
+    Префикс ключа диапазоном [prefix, prefix++) - его обслуживает индекс.
+    LIKE 'prefix%' сам по себе индексом не покрыт (в sqlite он регистронезависим)
+    """
+    clause = and_(column.startswith(prefix, autoescape=True), column >= prefix)
+    last = ord(prefix[-1])
+    if last < 0xD7FF:
+        clause = and_(clause, column < prefix[:-1] + chr(last + 1))
+    return clause
+
+
+class ObjectIndexService(BaseRepository):
+    model = S3Object
+
+    async def create(
+        self,
+        session: "AsyncSession",
+        bucket: str,
+        key: str,
+        size: int,
+        etag: str,
+        content_type: str | None = None,
+        uploader_id: int | None = None,
+    ):
+        """Перезапись ключа в S3 - обновление существующей строки (upsert)"""
+        row = _row(bucket, key, size, etag, content_type)
+        await self.upsert_many(
+            session, [{**row, "uploader_id": uploader_id}], ["bucket", "key"]
+        )
+
+    async def create_many(
+        self,
+        session: "AsyncSession",
+        bucket: str,
+        results: list[dict],
+        uploader_id: int | None = None,
+    ):
+        """Результаты пакетной загрузки (UploadResult), строки с ошибкой пропускаются"""
+        rows = [
+            {
+                **_row(bucket, r["key"], r["size"], r["etag"], None),
+                "uploader_id": uploader_id,
+            }
+            for r in results
+            if r.get("error") is None and r.get("etag")
+        ]
+        # Пачками: лимит параметров запроса (32767 в postgresql)
+        batch_size = settings.s3_index_reconcile_batch_size
+        for start in range(0, len(rows), batch_size):
+            await self.upsert_many(
+                session, rows[start : start + batch_size], ["bucket", "key"]
+            )
+
+    async def delete(self, session: "AsyncSession", bucket: str, key: str):
+        await session.execute(
+            delete(S3Object).where(S3Object.bucket == bucket, S3Object.key == key)
+        )
+        await session.commit()
+
+    async def delete_bucket(self, session: "AsyncSession", bucket: str | None = None):
+        """Все записи бакета, без bucket - весь индекс"""
+        stmt = delete(S3Object)
+        if bucket is not None:
+            stmt = stmt.where(S3Object.bucket == bucket)
+        await session.execute(stmt)
+        await session.commit()
+
+    async def update(self, session: "AsyncSession", bucket: str, key: str, **values):
+        return await self.update_one(
+            session, S3Object.bucket == bucket, S3Object.key == key, **values
+        )
+
+    async def find_all(
+        self,
+        session: "AsyncSession",
+        bucket: str,
+        prefix: str = "",
+        after_key: str | None = None,
+        limit: int = 100,
+    ) -> tuple[list[S3Object], str | None]:
+        """
+        Листинг бакета по ключу (keyset по уникальному индексу bucket, key).
+        Возвращаем страницу и ключ-курсор следующей (None - страниц больше нет)
+        """
+        limit = _page_limit(limit)
+        key = _key_column(session)
+        stmt = (
+            select(S3Object)
+            .where(S3Object.bucket == bucket)
+            .order_by(key)
+            .limit(limit + 1)
+        )
+        if prefix:
+            stmt = stmt.where(_startswith(key, prefix))
+        if after_key is not None:
+            stmt = stmt.where(key > after_key)
+        objects = list(await session.scalars(stmt))
+        if len(objects) > limit:
+            return objects[:limit], objects[limit - 1].key
+        return objects, None
+
+    async def search(
+        self,
+        session: "AsyncSession",
+        bucket: str | None = None,
+        name: str | None = None,
+        content_type: str | None = None,
+        min_size: int | None = None,
+        max_size: int | None = None,
+        uploader_id: int | None = None,
+        after_id: int | None = None,
+        limit: int = 100,
+    ) -> tuple[list[S3Object], int | None]:
+        """
+        Поиск по началу ключа, типу (шаблон вида image/*), размеру и владельцу.
+        Keyset по id; файлы пользователя - индекс (uploader_id, id),
+        имя - индекс ключа (подстрока в середине индексом не ищется)
+        """
+        limit = _page_limit(limit)
+        stmt = select(S3Object).order_by(S3Object.id).limit(limit + 1)
+        if bucket is not None:
+            stmt = stmt.where(S3Object.bucket == bucket)
+        if name:
+            stmt = stmt.where(_startswith(_key_column(session), name))
+        if content_type and content_type.endswith("/*"):
+            stmt = stmt.where(
+                S3Object.content_type.startswith(content_type[:-1], autoescape=True)
+            )
+        elif content_type:
+            stmt = stmt.where(S3Object.content_type == content_type)
+        if min_size is not None:
+            stmt = stmt.where(S3Object.size >= min_size)
+        if max_size is not None:
+            stmt = stmt.where(S3Object.size <= max_size)
+        if uploader_id is not None:
+            stmt = stmt.where(S3Object.uploader_id == uploader_id)
+        if after_id is not None:
+            stmt = stmt.where(S3Object.id > after_id)
+        objects = list(await session.scalars(stmt))
+        if len(objects) > limit:
+            return objects[:limit], objects[limit - 1].id
+        return objects, None
+
+    async def buckets(self, session: "AsyncSession") -> list[dict]:
+        """Бакеты из индекса: число объектов и суммарный размер"""
+        res = await session.execute(
+            select(
+                S3Object.bucket,
+                func.count().label("objects"),
+                func.sum(S3Object.size).label("size"),
+            )
+            .group_by(S3Object.bucket)
+            .order_by(S3Object.bucket)
+        )
+        return [row._asdict() for row in res]
+
+    async def reconcile(
+        self,
+        aws_service: "S3Service",
+        session: "AsyncSession",
+        bucket: str | None = None,
+    ) -> list[dict]:
+        """
+        Пересборка индекса из S3. Без bucket - все бакеты, записи
+        несуществующих бакетов удаляются. Удаляются только строки, созданные
+        до начала сверки (id <= max id на старте) - загруженное во время
+        сверки не трогаем
+        """
+        max_id = await session.scalar(select(func.max(S3Object.id))) or 0
+        if bucket is not None:
+            return [await self._reconcile_bucket(aws_service, session, bucket, max_id)]
+        result = await aws_service.get_buckets()
+        buckets = [b["Name"] for b in result["Buckets"]]
+        await session.execute(
+            delete(S3Object).where(
+                S3Object.bucket.not_in(buckets), S3Object.id <= max_id
+            )
+        )
+        await session.commit()
+        return [
+            await self._reconcile_bucket(aws_service, session, b, max_id)
+            for b in buckets
+        ]
+
+    async def _reconcile_bucket(
+        self,
+        aws_service: "S3Service",
+        session: "AsyncSession",
+        bucket: str,
+        max_id: int,
+    ) -> dict:
+        """
+        Листинг S3 идет по возрастанию ключа, индекс читаем в том же порядке:
+        страница листинга сверяется с диапазоном ключей (предыдущая страница,
+        последний ключ страницы]. Новые и измененные объекты - одним upsert
+        на страницу, строки диапазона, которых нет в листинге, - удаляются.
+        Память - одна страница. Владелец у существующих строк сохраняется
+        """
+        batch_size = settings.s3_index_reconcile_batch_size
+        summary = {"bucket": bucket, "scanned": 0, "upserted": 0, "deleted": 0}
+        after_key = None
+        try:
+            async for contents in aws_service.iter_object_pages(bucket, batch_size):
+                if not contents:
+                    continue
+                keys = [obj["Key"] for obj in contents]
+                res = await session.execute(
+                    select(S3Object.key, S3Object.etag).where(
+                        S3Object.bucket == bucket, S3Object.key.in_(keys)
+                    )
+                )
+                known = dict(res.tuples().all())
+                rows = [
+                    _row(bucket, obj["Key"], obj["Size"], obj["ETag"], None)
+                    for obj in contents
+                    if known.get(obj["Key"]) != obj["ETag"].strip('"')
+                ]
+                await self.upsert_many(session, rows, ["bucket", "key"])
+                summary["scanned"] += len(keys)
+                summary["upserted"] += len(rows)
+                summary["deleted"] += await self._delete_stale(
+                    session, bucket, max_id, after_key, keys[-1], keys
+                )
+                after_key = keys[-1]
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") != "NoSuchBucket":
+                raise
+        # Хвост: ключи после последней страницы листинга (или весь бакет)
+        summary["deleted"] += await self._delete_stale(
+            session, bucket, max_id, after_key, None, []
+        )
+        return summary
+
+    async def _delete_stale(
+        self,
+        session: "AsyncSession",
+        bucket: str,
+        max_id: int,
+        after_key: str | None,
+        last_key: str | None,
+        keys: list[str],
+    ) -> int:
+        """Строки в диапазоне ключей (after_key, last_key], кроме keys, пачками"""
+        batch_size = settings.s3_index_reconcile_batch_size
+        key = _key_column(session)
+        stmt = (
+            select(S3Object.id)
+            .where(S3Object.bucket == bucket, S3Object.id <= max_id)
+            .limit(batch_size)
+        )
+        if after_key is not None:
+            stmt = stmt.where(key > after_key)
+        if last_key is not None:
+            stmt = stmt.where(key <= last_key)
+        if keys:
+            stmt = stmt.where(S3Object.key.not_in(keys))
+        deleted = 0
+        while stale := list(await session.scalars(stmt)):
+            await session.execute(delete(S3Object).where(S3Object.id.in_(stale)))
+            await session.commit()
+            deleted += len(stale)
+        return deleted
+
+
+object_index = ObjectIndexService()
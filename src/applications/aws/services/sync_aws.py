@@ -1,9 +1,29 @@
-from pprint import pprint
+import threading
+from collections.abc import Iterator
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 
-import boto3
-from fastapi import UploadFile
+from fastapi import HTTPException, UploadFile
+from loguru import logger
 
+from applications.aws.compression import (
+    CompressingReader,
+    CompressionPolicy,
+    get_compression_policy,
+)
+from applications.aws.services.disk_cache import DiskCache, get_object_cache
+from applications.aws.services.instrumentation import instrument_client
+from applications.aws.services.listing import list_params, page_records
 from core.conf import settings
+from core.executor import BlockingExecutor, ExecutorBusy
+from core.lazy import Lazy
+
+
+def _busy_error() -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail="Service is busy, try again later",
+        headers={"Retry-After": "1"},
+    )
 
 
 class S3Service:
@@ -14,54 +34,352 @@ class S3Service:
         aws_secret_access_key: str,
         endpoint_url: str,
         bucket_name: str = None,
+        multipart_threshold: int = 64 * 1024 * 1024,
+        multipart_part_size: int = 8 * 1024 * 1024,
+        multipart_concurrency: int = 4,
+        max_workers: int = 16,
+        max_queue: int | None = None,
+        purge_batch_concurrency: int = 4,
+        purge_bucket_concurrency: int = 4,
+        cache: DiskCache | None = None,
+        compression: CompressionPolicy | None = None,
     ):
-        self.client = boto3.client(
-            "s3",
-            aws_access_key_id=aws_access_key_id,
-            aws_secret_access_key=aws_secret_access_key,
-            endpoint_url=endpoint_url,
+        # boto3 грузится при создании сервиса, не при импорте модуля
+        import boto3
+        from boto3.s3.transfer import TransferConfig
+        from botocore.config import Config
+
+        # Каждый поток пула может грузить файл в multipart_concurrency потоков
+        self.client = instrument_client(
+            boto3.client(
+                "s3",
+                aws_access_key_id=aws_access_key_id,
+                aws_secret_access_key=aws_secret_access_key,
+                endpoint_url=endpoint_url,
+                config=Config(max_pool_connections=max_workers * multipart_concurrency),
+            )
+        )
+        self.executor = BlockingExecutor(
+            max_workers=max_workers, max_queue=max_queue, name="s3-sync"
         )
         self.bucket_name = bucket_name
+        self.multipart_part_size = multipart_part_size
+        self.purge_batch_concurrency = purge_batch_concurrency
+        self.purge_bucket_concurrency = purge_bucket_concurrency
+        # Общий с async сервисом дисковый кеш - запись должна его сбрасывать
+        self.cache = cache
+        self.compression = compression
+        self.transfer_config = TransferConfig(
+            multipart_threshold=multipart_threshold,
+            multipart_chunksize=multipart_part_size,
+            max_concurrency=multipart_concurrency,
+        )
+
+    async def run(self, fn, /, *args, **kwargs):
+        """
+        Вызвать блокирующий метод сервиса в его пуле потоков, не блокируя loop
+        503 при переполнении очереди пула
+        """
+        try:
+            return await self.executor.run(fn, *args, **kwargs)
+        except ExecutorBusy:
+            raise _busy_error()
+
+    async def iterate(self, iterator: Iterator):
+        """Обход блокирующего итератора в пуле, 503 при переполнении очереди"""
+        try:
+            async for item in self.executor.iterate(iterator):
+                yield item
+        except ExecutorBusy:
+            raise _busy_error()
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+
+    def _upload_fileobj(
+        self,
+        fileobj,
+        bucket_name: str,
+        key: str,
+        content_type: str | None = None,
+        size: int | None = None,
+    ):
+        """Сжимаемые по политике файлы boto3 получает уже сжатым потоком"""
+        extra = {"ContentType": content_type} if content_type else {}
+        encoding = (
+            self.compression.encoding_for(bucket_name, key, content_type, size)
+            if self.compression is not None
+            else None
+        )
+        if encoding is not None:
+            fileobj = CompressingReader(fileobj, encoding, self.compression.level)
+            extra.update(self.compression.object_params(encoding))
+            extra.setdefault("ContentType", "application/octet-stream")
+        self.client.upload_fileobj(
+            Fileobj=fileobj,
+            Bucket=bucket_name,
+            Key=key,
+            Config=self.transfer_config,
+            ExtraArgs=extra or None,
+        )
+        if self.cache is not None:
+            self.cache.invalidate(bucket_name, key)
 
     def upload_file(self, file: UploadFile, bucket_name: str = None):
-        if bucket_name is None:
-            res = self.client.put_object(
-                Body=file.file, Bucket=self.bucket_name, Key=file.filename
-            )
-            pprint(res)
-            return
-        self.client.put_object(Body=file.file, Bucket=bucket_name, Key=file.filename)
+        """
+        Файлы больше multipart_threshold boto3 сам грузит частями
+        в несколько потоков (с complete/abort multipart upload)
+        """
+        self._upload_fileobj(
+            file.file,
+            bucket_name=bucket_name or self.bucket_name,
+            key=file.filename,
+            content_type=file.content_type,
+            size=file.size,
+        )
+
+    def upload_stream(
+        self,
+        fileobj,
+        object_name: str,
+        content_type: str | None = None,
+        bucket_name: str = None,
+    ):
+        """
+        Загрузка из файлоподобного потока без seek (тело запроса):
+        boto3 читает его частями по multipart_chunksize
+        """
+        self._upload_fileobj(
+            fileobj,
+            bucket_name=bucket_name or self.bucket_name,
+            key=object_name,
+            content_type=content_type,
+        )
 
-    def all_methods(self):
-        pprint(self.client.__dir__())
+    def all_methods(self) -> list[str]:
+        methods = [name for name in dir(self.client) if not name.startswith("_")]
+        logger.debug("S3 client methods: {}", methods)
+        return methods
 
     def create_bucket(self, bucket_name: str):
         return self.client.create_bucket(Bucket=bucket_name)
 
+    def head_object(self, object_name: str, bucket_name: str = None) -> dict:
+        return self.client.head_object(
+            Bucket=bucket_name or self.bucket_name, Key=object_name
+        )
+
     def delete_bucket(self, bucket_name: str = None):
-        if bucket_name:
-            self.client.delete_bucket(Bucket=bucket_name)
-            return
-        self.client.delete_bucket(Bucket=self.bucket_name)
+        bucket_name = bucket_name or self.bucket_name
+        self.client.delete_bucket(Bucket=bucket_name)
+        if self.cache is not None:
+            self.cache.invalidate_bucket(bucket_name)
 
     def list_buckets(self):
         res = self.client.list_buckets()
         return [_["Name"] for _ in res["Buckets"]]
 
-    def delete_all_buckets(self):
-        pass
+    def list_objects(
+        self,
+        bucket_name: str = None,
+        prefix: str = "",
+        delimiter: str = None,
+        continuation_token: str = None,
+    ) -> Iterator[dict]:
+        """Листинг объектов бакета постранично (paginator), без загрузки в память"""
+        params = list_params(
+            bucket_name or self.bucket_name, prefix, delimiter, continuation_token
+        )
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(**params):
+            yield from page_records(page)
+
+    def empty_bucket(self, bucket_name: str = None) -> dict:
+        """
+        Удаляем все объекты бакета: список через paginator,
+        удаление пачками по 1000 ключей (delete_objects), пачки параллельно
+        """
+        bucket_name = bucket_name or self.bucket_name
+        stats = {"bucket": bucket_name, "deleted": 0, "errors": 0}
+        if self.cache is not None:
+            self.cache.invalidate_bucket(bucket_name)
+        lock = threading.Lock()
 
-    def get_object(self, object_name: str, bucket_name: str = None):
-        if bucket_name:
-            res = self.client.get_object(Bucket=bucket_name, Key=object_name)
-            return res
-        res = self.client.get_object(Bucket=self.bucket_name, Key=object_name)
-        return res
+        def delete_batch(keys: list[dict]):
+            res = self.client.delete_objects(
+                Bucket=bucket_name, Delete={"Objects": keys, "Quiet": True}
+            )
+            errors = len(res.get("Errors", []))
+            with lock:
+                stats["deleted"] += len(keys) - errors
+                stats["errors"] += errors
+                logger.info(
+                    "Purge {}: deleted {} objects", bucket_name, stats["deleted"]
+                )
+
+        paginator = self.client.get_paginator("list_objects_v2")
+        pages = paginator.paginate(
+            Bucket=bucket_name, PaginationConfig={"PageSize": 1000}
+        )
+        with ThreadPoolExecutor(max_workers=self.purge_batch_concurrency) as pool:
+            futures = set()
+            for page in pages:
+                if keys := [{"Key": obj["Key"]} for obj in page.get("Contents", [])]:
+                    if len(futures) >= self.purge_batch_concurrency:
+                        done, futures = wait(futures, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            future.result()
+                    futures.add(pool.submit(delete_batch, keys))
+            for future in futures:
+                future.result()
+        return stats
 
+    def delete_all_buckets(self) -> list[dict]:
+        """удаляем все бакеты вместе с объектами, несколько бакетов сразу"""
 
-sync_aws_service = S3Service(
-    aws_access_key_id=settings.MINIO_ROOT_USER,
-    aws_secret_access_key=settings.MINIO_ROOT_PASSWORD,
-    endpoint_url=settings.s3_endpoint,
-    bucket_name="yoyo",
-)
+        def purge(bucket_name: str) -> dict:
+            stats = self.empty_bucket(bucket_name)
+            self.delete_bucket(bucket_name)
+            return stats
+
+        with ThreadPoolExecutor(max_workers=self.purge_bucket_concurrency) as pool:
+            return list(pool.map(purge, self.list_buckets()))
+
+    def presign_put(
+        self,
+        object_name: str,
+        content_type: str,
+        size: int,
+        expires: int,
+        bucket_name: str = None,
+    ) -> str:
+        """Подпись считается локально, без запроса к S3 (пул не нужен)"""
+        return self.client.generate_presigned_url(
+            "put_object",
+            Params={
+                "Bucket": bucket_name or self.bucket_name,
+                "Key": object_name,
+                "ContentType": content_type,
+                "ContentLength": size,
+            },
+            ExpiresIn=expires,
+        )
+
+    def presign_get(
+        self, object_name: str, expires: int, bucket_name: str = None
+    ) -> str:
+        return self.client.generate_presigned_url(
+            "get_object",
+            Params={"Bucket": bucket_name or self.bucket_name, "Key": object_name},
+            ExpiresIn=expires,
+        )
+
+    def presign_multipart(
+        self,
+        object_name: str,
+        content_type: str,
+        size: int,
+        part_size: int,
+        expires: int,
+        bucket_name: str = None,
+    ) -> dict:
+        """Начинаем multipart upload (запрос к S3) и подписываем URL каждой части"""
+        bucket_name = bucket_name or self.bucket_name
+        upload = self.client.create_multipart_upload(
+            Bucket=bucket_name, Key=object_name, ContentType=content_type
+        )
+        upload_id = upload["UploadId"]
+        parts = []
+        for number, offset in enumerate(range(0, size, part_size), 1):
+            length = min(part_size, size - offset)
+            url = self.client.generate_presigned_url(
+                "upload_part",
+                Params={
+                    "Bucket": bucket_name,
+                    "Key": object_name,
+                    "UploadId": upload_id,
+                    "PartNumber": number,
+                    "ContentLength": length,
+                },
+                ExpiresIn=expires,
+            )
+            parts.append({"part_number": number, "size": length, "url": url})
+        return {"key": object_name, "upload_id": upload_id, "parts": parts}
+
+    def complete_multipart(
+        self,
+        object_name: str,
+        upload_id: str,
+        parts: list[dict],
+        bucket_name: str = None,
+    ):
+        """parts: [{"PartNumber": n, "ETag": etag}] в любом порядке"""
+        bucket_name = bucket_name or self.bucket_name
+        result = self.client.complete_multipart_upload(
+            Bucket=bucket_name,
+            Key=object_name,
+            UploadId=upload_id,
+            MultipartUpload={
+                "Parts": sorted(parts, key=lambda part: part["PartNumber"])
+            },
+        )
+        if self.cache is not None:
+            self.cache.invalidate(bucket_name, object_name)
+        return result
+
+    def abort_multipart(
+        self, object_name: str, upload_id: str, bucket_name: str = None
+    ):
+        self.client.abort_multipart_upload(
+            Bucket=bucket_name or self.bucket_name, Key=object_name, UploadId=upload_id
+        )
+
+    def confirm_upload(self, object_name: str, bucket_name: str = None) -> dict:
+        """Объект загружен клиентом в обход сервиса: HeadObject и сброс кеша"""
+        bucket_name = bucket_name or self.bucket_name
+        if self.cache is not None:
+            self.cache.invalidate(bucket_name, object_name)
+        return self.client.head_object(Bucket=bucket_name, Key=object_name)
+
+    def delete_object(self, object_name: str, bucket_name: str = None):
+        bucket_name = bucket_name or self.bucket_name
+        if self.cache is not None:
+            self.cache.invalidate(bucket_name, object_name)
+        return self.client.delete_object(Bucket=bucket_name, Key=object_name)
+
+    def get_object(
+        self,
+        object_name: str,
+        bucket_name: str = None,
+        range: str = None,
+        conditions: dict = None,
+    ):
+        params = {"Range": range} if range else {}
+        return self.client.get_object(
+            Bucket=bucket_name or self.bucket_name,
+            Key=object_name,
+            **params,
+            **(conditions or {}),
+        )
+
+
+def _create_service() -> S3Service:
+    policy = get_compression_policy()
+    return S3Service(
+        aws_access_key_id=settings.MINIO_ROOT_USER,
+        aws_secret_access_key=settings.MINIO_ROOT_PASSWORD,
+        endpoint_url=settings.s3_endpoint,
+        bucket_name="yoyo",
+        multipart_threshold=settings.s3_multipart_threshold,
+        multipart_part_size=settings.s3_multipart_part_size,
+        multipart_concurrency=settings.s3_multipart_concurrency,
+        max_workers=settings.s3_sync_max_workers,
+        max_queue=settings.s3_sync_max_queue,
+        purge_batch_concurrency=settings.s3_purge_batch_concurrency,
+        purge_bucket_concurrency=settings.s3_purge_bucket_concurrency,
+        cache=get_object_cache(),
+        compression=policy if policy.enabled else None,
+    )
+
+
+get_sync_aws_service = Lazy(_create_service)
@@ -0,0 +1,381 @@
+"""
+Отдача объектов S3 клиенту
+- Поддержка Range / 206 Partial Content
+- Чтение тела кусками фиксированного размера
+- Гарантированное закрытие тела при обрыве соединения
+- ETag / Last-Modified / Cache-Control, условные запросы (304 Not Modified)
+Прием тела запроса потоком: read(size) поверх request.stream()
+"""
+
+import asyncio
+import json
+import re
+from collections.abc import AsyncIterable, AsyncIterator
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+
+from botocore.exceptions import ClientError
+from fastapi import HTTPException
+from fastapi.responses import Response, StreamingResponse
+
+from applications.aws.compression import (
+    METADATA_KEY,
+    accepts_encoding,
+    decompress_stream,
+    stored_encoding,
+)
+from applications.aws.services.disk_cache import CachedFile
+from core.conf import settings
+from core.executor import BlockingExecutor
+
+_RANGE_RE = re.compile(r"^bytes=(\d+-\d*|-\d+)$")
+
+
+def parse_range(range_header: str | None) -> str | None:
+    """
+    Возвращаем Range для S3 GetObject или None.
+    Поддерживается один диапазон, остальное отдаем целиком (как разрешает RFC 9110)
+    """
+    if not range_header:
+        return None
+    range_header = range_header.strip().replace(" ", "")
+    if not _RANGE_RE.match(range_header):
+        return None
+    start, _, end = range_header[len("bytes=") :].partition("-")
+    if start and end and int(end) < int(start):
+        raise HTTPException(status_code=416, detail="Requested range not satisfiable")
+    return range_header
+
+
+def cache_control_for(bucket_name: str) -> str | None:
+    return settings.s3_cache_control.get(
+        bucket_name, settings.s3_cache_control.get("*")
+    )
+
+
+def request_conditions(
+    if_none_match: str | None, if_modified_since: str | None
+) -> dict:
+    """
+    Условные заголовки клиента -> параметры S3 GetObject.
+    If-Modified-Since учитывается только без If-None-Match (RFC 9110)
+    """
+    if if_none_match:
+        # W/ - слабый ETag распакованного на лету объекта, S3 сравнивает сам ETag
+        return {"IfNoneMatch": if_none_match.replace("W/", "")}
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return {}
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        return {"IfModifiedSince": since}
+    return {}
+
+
+def is_not_modified(
+    conditions: dict, etag: str, last_modified: datetime | None
+) -> bool:
+    """Проверка условий без запроса в S3 (объект уже получен или в кеше)"""
+    if "IfNoneMatch" in conditions:
+        tags = {tag.strip().strip('"') for tag in conditions["IfNoneMatch"].split(",")}
+        return "*" in tags or etag.strip('"') in tags
+    if "IfModifiedSince" in conditions and last_modified is not None:
+        # В HTTP дате нет долей секунды
+        return last_modified.replace(microsecond=0) <= conditions["IfModifiedSince"]
+    return False
+
+
+def cache_headers(
+    etag: str | None,
+    last_modified: datetime | None,
+    cache_control: str | None = None,
+) -> dict:
+    headers = {}
+    if etag:
+        headers["ETag"] = '"' + etag.strip('"') + '"'
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(
+            last_modified.astimezone(timezone.utc), usegmt=True
+        )
+    if cache_control:
+        headers["Cache-Control"] = cache_control
+    return headers
+
+
+def _representation_headers(
+    headers: dict, encoding: str | None, accept_encoding: str | None
+) -> dict:
+    """Распакованный на лету объект - другое представление: слабый ETag"""
+    if encoding is not None:
+        headers["Vary"] = "Accept-Encoding"
+        if "ETag" in headers and not accepts_encoding(accept_encoding, encoding):
+            headers["ETag"] = "W/" + headers["ETag"]
+    return headers
+
+
+def not_modified_response(
+    etag: str | None,
+    last_modified: datetime | None,
+    encoding: str | None,
+    accept_encoding: str | None,
+    cache_control: str | None,
+) -> Response:
+    headers = cache_headers(etag, last_modified, cache_control)
+    return Response(
+        status_code=304,
+        headers=_representation_headers(headers, encoding, accept_encoding),
+    )
+
+
+def check_not_modified(
+    obj: CachedFile | dict,
+    conditions: dict,
+    accept_encoding: str | None,
+    cache_control: str | None,
+) -> Response | None:
+    """304 по уже полученному объекту (ответ GetObject или файл дискового кеша)"""
+    if isinstance(obj, CachedFile):
+        etag, last_modified = obj.entry.etag, obj.entry.last_modified
+        encoding = obj.entry.content_encoding
+    else:
+        etag, last_modified = obj["ETag"], obj.get("LastModified")
+        encoding = stored_encoding(obj)
+    if not is_not_modified(conditions, etag, last_modified):
+        return None
+    if isinstance(obj, CachedFile):
+        obj.file.close()
+    else:
+        obj["Body"].close()
+    return not_modified_response(
+        etag, last_modified, encoding, accept_encoding, cache_control
+    )
+
+
+def not_modified_from_error(
+    error: ClientError, accept_encoding: str | None, cache_control: str | None
+) -> Response | None:
+    """S3 ответил 304 на условный GetObject - отдаем 304 клиенту, иначе None"""
+    if error.response.get("Error", {}).get("Code") != "304":
+        return None
+    headers = error.response.get("ResponseMetadata", {}).get("HTTPHeaders", {})
+    last_modified = headers.get("last-modified")
+    return not_modified_response(
+        headers.get("etag"),
+        parsedate_to_datetime(last_modified) if last_modified else None,
+        headers.get(f"x-amz-meta-{METADATA_KEY}"),
+        accept_encoding,
+        cache_control,
+    )
+
+
+async def iter_async_body(body, chunk_size: int):
+    """Читаем тело aiobotocore кусками, закрываем его в любом случае"""
+    try:
+        async for chunk in body.iter_chunks(chunk_size):
+            yield chunk
+    finally:
+        body.close()
+
+
+async def iter_sync_body(body, chunk_size: int, executor: BlockingExecutor):
+    """
+    Читаем тело boto3 кусками в пуле executor, закрываем его в любом случае
+    Без лимита очереди: GetObject уже выполнен, ответ уже отправляется
+    """
+    try:
+        chunks = iter(lambda: body.read(chunk_size), b"")
+        async for chunk in executor.iterate(chunks, limited=False):
+            yield chunk
+    finally:
+        body.close()
+
+
+class StreamReader:
+    """read(size) поверх асинхронного потока кусков (request.stream())"""
+
+    def __init__(self, chunks: AsyncIterator[bytes]):
+        self._chunks = aiter(chunks)
+        self._buffer = bytearray()
+        self._eof = False
+        self.size = 0
+
+    async def read(self, size: int = -1) -> bytes:
+        """Ровно size байт (меньше - только в конце потока), -1 - всё"""
+        while not self._eof and (size < 0 or len(self._buffer) < size):
+            try:
+                self._buffer += await anext(self._chunks)
+            except StopAsyncIteration:
+                self._eof = True
+        if size < 0 or size >= len(self._buffer):
+            data = bytes(self._buffer)
+            self._buffer.clear()
+        else:
+            data = bytes(self._buffer[:size])
+            del self._buffer[:size]
+        self.size += len(data)
+        return data
+
+
+def raw_body_content_type(content_type: str | None) -> str | None:
+    """Content-Type объекта из заголовка запроса; формы - на /upload/{bucket}"""
+    if content_type and content_type.startswith("multipart/form-data"):
+        raise HTTPException(
+            status_code=415,
+            detail="Send the file as the raw request body, not as a form",
+        )
+    return content_type
+
+
+class SyncStreamReader:
+    """
+    Файлоподобная обертка над StreamReader для boto3 в потоке пула:
+    каждый read() выполняется в event loop и ждет результата
+    """
+
+    def __init__(self, reader: StreamReader, loop: asyncio.AbstractEventLoop):
+        self.reader = reader
+        self.loop = loop
+
+    def read(self, size: int = -1) -> bytes:
+        return asyncio.run_coroutine_threadsafe(
+            self.reader.read(size), self.loop
+        ).result()
+
+
+async def iter_ndjson(records: AsyncIterable[dict]):
+    """Каждая запись - отдельная строка JSON, отдаются по мере получения"""
+    async for record in records:
+        yield json.dumps(record, ensure_ascii=False) + "\n"
+
+
+async def _prepend(first: dict | None, records: AsyncIterator[dict]):
+    if first is not None:
+        yield first
+    async for record in records:
+        yield record
+
+
+async def ndjson_response(records: AsyncIterable[dict]) -> StreamingResponse:
+    """
+    Первая запись читается до ответа: ошибка первого запроса к S3
+    (NoSuchBucket) - это 404, а не обрыв потока после заголовков 200
+    """
+    records = aiter(records)
+    try:
+        first = await anext(records, None)
+    except ClientError as e:
+        raise_s3_http_error(e)
+    return StreamingResponse(
+        content=iter_ndjson(_prepend(first, records)),
+        media_type="application/x-ndjson",
+    )
+
+
+def object_response(
+    obj: dict, filename: str, content, cache_control: str | None = None
+) -> StreamingResponse:
+    """Собираем StreamingResponse с заголовками из ответа GetObject"""
+    headers = {
+        "Content-Disposition": f"attachment; filename={filename.split('/')[-1]}",
+        "Accept-Ranges": "bytes",
+        **cache_headers(obj.get("ETag"), obj.get("LastModified"), cache_control),
+    }
+    if obj.get("ContentLength") is not None:
+        headers["Content-Length"] = str(obj["ContentLength"])
+    if obj.get("ContentRange"):
+        headers["Content-Range"] = obj["ContentRange"]
+    return StreamingResponse(
+        content=content,
+        status_code=206 if obj.get("ContentRange") else 200,
+        media_type=obj.get("ContentType"),
+        headers=headers,
+    )
+
+
+def encoded_object_response(
+    obj: dict,
+    filename: str,
+    content,
+    accept_encoding: str | None,
+    cache_control: str | None = None,
+) -> StreamingResponse:
+    """
+    Объект, сжатый при загрузке: клиенту, принимающему кодировку, отдаем
+    сжатые байты как есть (Content-Encoding), остальным - распаковываем потоком
+    """
+    encoding = stored_encoding(obj)
+    if encoding is None:
+        return object_response(obj, filename, content, cache_control)
+    if accepts_encoding(accept_encoding, encoding):
+        response = object_response(obj, filename, content, cache_control)
+        response.headers["Content-Encoding"] = encoding
+    else:
+        # Размер распакованного объекта заранее неизвестен
+        response = object_response(
+            {**obj, "ContentLength": None, "ContentRange": None},
+            filename,
+            decompress_stream(content, encoding),
+            cache_control,
+        )
+        if "ETag" in response.headers:
+            response.headers["ETag"] = "W/" + response.headers["ETag"]
+    response.headers["Vary"] = "Accept-Encoding"
+    return response
+
+
+async def iter_file(file, chunk_size: int):
+    """Читаем уже открытый файл кусками, закрываем его в любом случае"""
+    try:
+        while chunk := await asyncio.to_thread(file.read, chunk_size):
+            yield chunk
+    finally:
+        file.close()
+
+
+def cached_file_response(
+    cached: CachedFile,
+    filename: str,
+    accept_encoding: str | None = None,
+    cache_control: str | None = None,
+) -> StreamingResponse:
+    """
+    Отдаем объект из дискового кеша. Файл открыт до вызова: вытеснение
+    записи во время отдачи не обрывает ответ
+    """
+    entry = cached.entry
+    headers = {
+        "Content-Disposition": f"attachment; filename={filename.split('/')[-1]}",
+        "Accept-Ranges": "bytes",
+        **cache_headers(entry.etag, entry.last_modified, cache_control),
+    }
+    encoding = entry.content_encoding
+    _representation_headers(headers, encoding, accept_encoding)
+    content = iter_file(cached.file, settings.s3_download_chunk_size)
+    if encoding is not None and not accepts_encoding(accept_encoding, encoding):
+        # Размер распакованного объекта заранее неизвестен
+        content = decompress_stream(content, encoding)
+    else:
+        headers["Content-Length"] = str(entry.size)
+        if encoding is not None:
+            headers["Content-Encoding"] = encoding
+    return StreamingResponse(
+        content=content, media_type=entry.content_type, headers=headers
+    )
+
+
+def raise_s3_http_error(error: ClientError):
+    """Переводим ошибки S3 (GetObject, multipart) в HTTP ответы, остальное пробрасываем"""
+    code = error.response.get("Error", {}).get("Code", "")
+    if code == "InvalidRange":
+        raise HTTPException(status_code=416, detail="Requested range not satisfiable")
+    if code == "NoSuchBucket":
+        raise HTTPException(status_code=404, detail="Bucket not found")
+    if code in ("NoSuchKey", "404"):
+        raise HTTPException(status_code=404, detail="Object not found")
+    if code == "NoSuchUpload":
+        raise HTTPException(status_code=404, detail="Upload not found")
+    if code in ("InvalidPart", "InvalidPartOrder", "EntityTooSmall"):
+        raise HTTPException(status_code=400, detail=error.response["Error"]["Message"])
+    raise error
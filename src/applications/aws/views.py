@@ -1,61 +1,315 @@
-from pprint import pprint
+from botocore.exceptions import ClientError
+from fastapi import APIRouter, Depends, Header, Request, UploadFile
+from loguru import logger
 
-from fastapi import APIRouter, UploadFile
-from fastapi.responses import StreamingResponse
-
-from applications.aws.services import async_aws_service
+from applications.auth.dependecies import get_optional_user
+from applications.aws.archive import iter_archive
+from applications.aws.compression import accepts_encoding, stored_encoding
+from applications.aws.schemas import UploadResult
+from applications.aws.services import get_async_aws_service
+from applications.aws.services.dedup import dedup_service, parse_digest
+from applications.aws.services.disk_cache import CachedFile
+from applications.aws.services.object_index import object_index
+from applications.aws.streaming import (
+    cache_control_for,
+    cached_file_response,
+    check_not_modified,
+    encoded_object_response,
+    iter_async_body,
+    ndjson_response,
+    not_modified_from_error,
+    parse_range,
+    raise_s3_http_error,
+    raw_body_content_type,
+    request_conditions,
+    StreamReader,
+)
+from core.conf import settings
+from core.database import get_session
 
 router = APIRouter(tags=["S3 Async"])
 
 
 @router.post("/upload/{bucket_name}")
-async def push_to_aws(bucket_name: str, file: UploadFile):
-    await async_aws_service.upload_file(bucket_name=bucket_name, file=file)
-    return {"file": file.filename}
+async def push_to_aws(
+    bucket_name: str,
+    file: UploadFile,
+    dedup: bool | None = None,
+    sha256: str | None = Header(default=None, alias="X-Content-SHA256"),
+    aws_service=Depends(get_async_aws_service.dependency),
+    session=Depends(get_session),
+    user=Depends(get_optional_user),
+):
+    """
+    dedup=true: файл с уже загруженным содержимым (SHA-256) не отправляется
+    в S3 повторно, в ответе ключ существующего объекта.
+    Без параметра dedup - по настройке s3_dedup
+    """
+    if dedup is None:
+        dedup = settings.s3_dedup
+    uploader_id = user.id if user else None
+    if not dedup:
+        result = await aws_service.upload_file(bucket_name=bucket_name, file=file)
+        await object_index.create(
+            session,
+            bucket_name,
+            file.filename,
+            file.size,
+            result["ETag"],
+            content_type=file.content_type,
+            uploader_id=uploader_id,
+        )
+        return {"file": file.filename}
+    result = await dedup_service.upload_file(
+        aws_service=aws_service,
+        bucket_name=bucket_name,
+        file=file,
+        session=session,
+        digest=parse_digest(sha256),
+    )
+    # Без копии новый объект не появился - в ответе старый ключ
+    if result["key"] == file.filename:
+        await object_index.create(
+            session,
+            bucket_name,
+            file.filename,
+            result["size"],
+            result["etag"],
+            content_type=file.content_type,
+            uploader_id=uploader_id,
+        )
+    return {
+        "file": result["key"],
+        "sha256": result["sha256"],
+        "deduplicated": result.get("deduplicated", False),
+    }
+
+
+@router.put("/upload/{bucket_name}/stream/{key:path}")
+async def stream_to_aws(
+    bucket_name: str,
+    key: str,
+    request: Request,
+    dedup: bool | None = None,
+    sha256: str | None = Header(default=None, alias="X-Content-SHA256"),
+    aws_service=Depends(get_async_aws_service.dependency),
+    session=Depends(get_session),
+    user=Depends(get_optional_user),
+) -> UploadResult:
+    """
+    Тело запроса - сам файл: идет в S3 частями по мере приема,
+    без разбора формы и временных файлов.
+    dedup=true + X-Content-SHA256 известного содержимого - тело не читается
+    """
+    if dedup is None:
+        dedup = settings.s3_dedup
+    content_type = raw_body_content_type(request.headers.get("content-type"))
+    reader = StreamReader(request.stream())
+    if dedup:
+        result = await dedup_service.upload_stream(
+            aws_service=aws_service,
+            bucket_name=bucket_name,
+            key=key,
+            read=reader.read,
+            session=session,
+            content_type=content_type,
+            digest=parse_digest(sha256),
+        )
+    else:
+        response = await aws_service.upload_stream(
+            bucket_name=bucket_name,
+            key=key,
+            read=reader.read,
+            content_type=content_type,
+        )
+        result = {"key": key, "etag": response["ETag"].strip('"'), "size": reader.size}
+    if result["key"] == key:
+        await object_index.create(
+            session,
+            bucket_name,
+            key,
+            result["size"],
+            result["etag"],
+            content_type=content_type,
+            uploader_id=user.id if user else None,
+        )
+    return UploadResult(**result)
+
+
+@router.post("/upload/{bucket_name}/batch")
+async def push_many_to_aws(
+    bucket_name: str,
+    files: list[UploadFile],
+    aws_service=Depends(get_async_aws_service.dependency),
+    session=Depends(get_session),
+    user=Depends(get_optional_user),
+) -> list[UploadResult]:
+    """Пакетная загрузка: много файлов за один запрос"""
+    results = await aws_service.upload_files(bucket_name=bucket_name, files=files)
+    await object_index.create_many(
+        session, bucket_name, results, uploader_id=user.id if user else None
+    )
+    return results
+
+
+@router.post("/upload/{bucket_name}/archive")
+async def push_archive_to_aws(
+    bucket_name: str,
+    file: UploadFile,
+    aws_service=Depends(get_async_aws_service.dependency),
+    session=Depends(get_session),
+    user=Depends(get_optional_user),
+) -> list[UploadResult]:
+    """Пакетная загрузка содержимого zip / tar архива, ключ - путь внутри архива"""
+    results = await aws_service.upload_files(
+        bucket_name=bucket_name, files=iter_archive(file)
+    )
+    await object_index.create_many(
+        session, bucket_name, results, uploader_id=user.id if user else None
+    )
+    return results
 
 
 @router.get("/download/")
-async def get_from_aws(filename: str, bucket_name: str):
+async def get_from_aws(
+    filename: str,
+    bucket_name: str,
+    range_header: str | None = Header(default=None, alias="Range"),
+    accept_encoding: str | None = Header(default=None),
+    if_none_match: str | None = Header(default=None),
+    if_modified_since: str | None = Header(default=None),
+    aws_service=Depends(get_async_aws_service.dependency),
+):
     """
-    TODO пересмотреть
+    Отдаем объект кусками, поддерживается Range (206 Partial Content).
+    Сжатый при загрузке объект отдается сжатым, если клиент принимает кодировку
     :param filename:
     :param bucket_name:
+    :param range_header: заголовок Range, пробрасывается в S3 GetObject
+    :param accept_encoding: кодировки, которые принимает клиент
+    :param if_none_match: вместе с if_modified_since пробрасывается в S3,
+        неизмененный объект - 304 без передачи тела
     :return:
     """
-    file = await async_aws_service.download_file(
-        bucket_name=bucket_name, filename=filename
-    )
-    pprint(file)
-
-    return StreamingResponse(
-        content=file["Body"],
-        media_type=file["ContentType"],
-        headers={
-            "Content-Disposition": f"attachment; filename={filename.split('/')[-1]}"
-        },
+    byte_range = parse_range(range_header)
+    conditions = request_conditions(if_none_match, if_modified_since)
+    cache_control = cache_control_for(bucket_name)
+    try:
+        if aws_service.cache is not None and byte_range is None:
+            file = await aws_service.download_file_cached(
+                bucket_name=bucket_name, filename=filename
+            )
+            not_modified = check_not_modified(
+                file, conditions, accept_encoding, cache_control
+            )
+            if not_modified is not None:
+                return not_modified
+            if isinstance(file, CachedFile):
+                return cached_file_response(
+                    file,
+                    filename=filename,
+                    accept_encoding=accept_encoding,
+                    cache_control=cache_control,
+                )
+        else:
+            file = await aws_service.download_file(
+                bucket_name=bucket_name,
+                filename=filename,
+                range=byte_range,
+                conditions=conditions,
+            )
+            encoding = stored_encoding(file)
+            if (
+                byte_range
+                and encoding
+                and not accepts_encoding(accept_encoding, encoding)
+            ):
+                # Диапазон сжатых байт без распаковки бесполезен - отдаем целиком
+                file["Body"].close()
+                file = await aws_service.download_file(
+                    bucket_name=bucket_name, filename=filename, conditions=conditions
+                )
+    except ClientError as e:
+        not_modified = not_modified_from_error(e, accept_encoding, cache_control)
+        if not_modified is not None:
+            return not_modified
+        raise_s3_http_error(e)
+
+    return encoded_object_response(
+        obj=file,
+        filename=filename,
+        content=iter_async_body(file["Body"], settings.s3_download_chunk_size),
+        accept_encoding=accept_encoding,
+        cache_control=cache_control,
     )
 
 
+@router.get("/cache/stats")
+async def get_cache_stats(aws_service=Depends(get_async_aws_service.dependency)):
+    """Метрики дискового кеша объектов"""
+    if aws_service.cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **aws_service.cache.stats()}
+
+
 @router.delete("/delete/{filename}")
-async def delete_from_aws(filename: str, bucket_name: str):
-    file = await async_aws_service.delete_file(bucket_name, filename)
-    print(file)
+async def delete_from_aws(
+    filename: str,
+    bucket_name: str,
+    aws_service=Depends(get_async_aws_service.dependency),
+    session=Depends(get_session),
+):
+    result = await aws_service.delete_file(bucket_name, filename)
+    await object_index.delete(session, bucket_name, filename)
+    logger.debug("Deleted {}/{}: {}", bucket_name, filename, result)
     return {"status": "success"}
 
 
 @router.get("/list/buckets")
-async def get_from_aws_list():
-    result = await async_aws_service.get_buckets()
+async def get_from_aws_list(aws_service=Depends(get_async_aws_service.dependency)):
+    result = await aws_service.get_buckets()
     return [bucket["Name"] for bucket in result["Buckets"]]
 
 
+@router.get("/list/objects/{bucket_name}")
+async def list_objects(
+    bucket_name: str,
+    prefix: str = "",
+    delimiter: str | None = None,
+    continuation_token: str | None = None,
+    aws_service=Depends(get_async_aws_service.dependency),
+):
+    """Потоковый листинг объектов бакета в формате NDJSON"""
+    return await ndjson_response(
+        aws_service.list_objects(
+            bucket_name=bucket_name,
+            prefix=prefix,
+            delimiter=delimiter,
+            continuation_token=continuation_token,
+        )
+    )
+
+
 @router.get("/delete/buckets")
-async def delete_one_buckets(bucket_name: str):
-    await async_aws_service.delete_bucket(bucket_name)
-    return {"status": "success"}
+async def delete_one_buckets(
+    bucket_name: str,
+    purge: bool = False,
+    aws_service=Depends(get_async_aws_service.dependency),
+    session=Depends(get_session),
+):
+    """purge=true - сначала удалить все объекты бакета"""
+    stats = None
+    if purge:
+        stats = await aws_service.empty_bucket(bucket_name)
+    await aws_service.delete_bucket(bucket_name)
+    await object_index.delete_bucket(session, bucket_name)
+    return {"status": "success", "purged": stats}
 
 
 @router.get("/delete/all/buckets")
-async def delete_one_buckets():
-    await async_aws_service.delete_all_buckets()
-    return {"status": "success"}
+async def delete_all_buckets(
+    aws_service=Depends(get_async_aws_service.dependency), session=Depends(get_session)
+):
+    summary = await aws_service.delete_all_buckets()
+    await object_index.delete_bucket(session)
+    return {"status": "success", "buckets": summary}
@@ -0,0 +1,119 @@
+"""
+Листинг и поиск объектов по индексу в БД, без запросов в S3.
+Индекс расходится с S3 только для объектов, измененных в обход сервиса -
+их подтягивает /index/reconcile
+"""
+
+from typing import Annotated
+
+from botocore.exceptions import ClientError
+from fastapi import APIRouter, Depends, HTTPException, status
+
+from applications.auth.dependecies import get_current_user
+from applications.auth.schemas import User
+from applications.aws.schemas import (
+    IndexedBucket,
+    IndexedKeyPage,
+    IndexedObjectPage,
+    ReconcileResult,
+)
+from applications.aws.services import get_async_aws_service
+from applications.aws.services.object_index import object_index
+from applications.aws.streaming import raise_s3_http_error
+from core.database import get_session
+
+router = APIRouter(prefix="/index", tags=["S3 Index"])
+annotated_current_user = Annotated[User, Depends(get_current_user)]
+
+
+@router.get("/buckets")
+async def indexed_buckets(session=Depends(get_session)) -> list[IndexedBucket]:
+    """Бакеты с объектами: число и суммарный размер"""
+    return await object_index.buckets(session)
+
+
+@router.get("/buckets/{bucket_name}/objects")
+async def indexed_objects(
+    bucket_name: str,
+    prefix: str = "",
+    after_key: str | None = None,
+    limit: int = 100,
+    session=Depends(get_session),
+) -> IndexedKeyPage:
+    """Объекты бакета по ключу постранично, next_key передается в after_key"""
+    objects, next_key = await object_index.find_all(
+        session,
+        bucket=bucket_name,
+        prefix=prefix,
+        after_key=after_key,
+        limit=limit,
+    )
+    return IndexedKeyPage(items=objects, next_key=next_key)
+
+
+@router.get("/search")
+async def search_objects(
+    bucket_name: str | None = None,
+    name: str | None = None,
+    content_type: str | None = None,
+    min_size: int | None = None,
+    max_size: int | None = None,
+    uploader_id: int | None = None,
+    after_id: int | None = None,
+    limit: int = 100,
+    session=Depends(get_session),
+) -> IndexedObjectPage:
+    """
+    Поиск по началу ключа, Content-Type (image/* - по типу), размеру
+    и владельцу. next_cursor передается в after_id
+    """
+    objects, next_cursor = await object_index.search(
+        session,
+        bucket=bucket_name,
+        name=name,
+        content_type=content_type,
+        min_size=min_size,
+        max_size=max_size,
+        uploader_id=uploader_id,
+        after_id=after_id,
+        limit=limit,
+    )
+    return IndexedObjectPage(items=objects, next_cursor=next_cursor)
+
+
+@router.get("/me/objects")
+async def my_objects(
+    user: annotated_current_user,
+    bucket_name: str | None = None,
+    after_id: int | None = None,
+    limit: int = 100,
+    session=Depends(get_session),
+) -> IndexedObjectPage:
+    """Файлы, загруженные текущим пользователем"""
+    objects, next_cursor = await object_index.search(
+        session,
+        bucket=bucket_name,
+        uploader_id=user.id,
+        after_id=after_id,
+        limit=limit,
+    )
+    return IndexedObjectPage(items=objects, next_cursor=next_cursor)
+
+
+@router.post("/reconcile")
+async def reconcile_index(
+    user: annotated_current_user,
+    bucket_name: str | None = None,
+    aws_service=Depends(get_async_aws_service.dependency),
+    session=Depends(get_session),
+) -> list[ReconcileResult]:
+    """Пересборка индекса из S3 (бакет или все), только администраторы"""
+    if not user.is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="доступно только администраторам",
+        )
+    try:
+        return await object_index.reconcile(aws_service, session, bucket=bucket_name)
+    except ClientError as e:
+        raise_s3_http_error(e)
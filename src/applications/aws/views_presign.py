@@ -0,0 +1,179 @@
+"""
+Presigned URL: файлы идут между клиентом и S3 напрямую, минуя воркер
+- upload: PUT одним запросом, затем /complete
+- multipart: URL на каждую часть, затем /multipart/complete с ETag частей
+- download: GET URL
+"""
+
+from botocore.exceptions import ClientError
+from fastapi import APIRouter, Depends, HTTPException, status
+from loguru import logger
+
+from applications.auth.dependecies import get_optional_user
+from applications.aws.presign import check_upload, expires_in, part_size_for
+from applications.aws.schemas import (
+    MultipartCompleteRequest,
+    MultipartUpload,
+    ObjectInfo,
+    PresignedMultipart,
+    PresignedUrl,
+    PresignUploadRequest,
+    UploadComplete,
+)
+from applications.aws.services import get_async_aws_service
+from applications.aws.services.object_index import object_index
+from applications.aws.streaming import raise_s3_http_error
+from core.database import get_session
+
+router = APIRouter(prefix="/presign", tags=["S3 Presigned"])
+
+
+async def _record_upload(
+    aws_service, bucket_name: str, key: str, session, user
+) -> ObjectInfo:
+    """
+    Проверяем загруженный клиентом объект. Нарушает ограничения
+    (например, загружен по старому URL после смены настроек) - удаляем,
+    иначе записываем в индекс объектов
+    """
+    try:
+        head = await aws_service.confirm_upload(bucket_name, key)
+    except ClientError as e:
+        raise_s3_http_error(e)
+    info = ObjectInfo(
+        key=key,
+        size=head["ContentLength"],
+        etag=head["ETag"].strip('"'),
+        content_type=head.get("ContentType"),
+    )
+    try:
+        check_upload(info.size, info.content_type or "")
+    except HTTPException:
+        await aws_service.delete_file(bucket_name, key)
+        raise
+    await object_index.create(
+        session,
+        bucket_name,
+        key,
+        info.size,
+        info.etag,
+        content_type=info.content_type,
+        uploader_id=user.id if user else None,
+    )
+    logger.info("Presigned upload {}/{}: {} bytes", bucket_name, key, info.size)
+    return info
+
+
+@router.post("/{bucket_name}/upload")
+async def presign_upload(
+    bucket_name: str,
+    data: PresignUploadRequest,
+    aws_service=Depends(get_async_aws_service.dependency),
+) -> PresignedUrl:
+    """URL для PUT загрузки, после нее клиент вызывает /complete"""
+    check_upload(data.size, data.content_type)
+    expires = expires_in(data.expires)
+    url = await aws_service.presign_put(
+        bucket_name=bucket_name,
+        key=data.key,
+        content_type=data.content_type,
+        size=data.size,
+        expires=expires,
+    )
+    return PresignedUrl(
+        url=url,
+        method="PUT",
+        expires_in=expires,
+        headers={"Content-Type": data.content_type, "Content-Length": str(data.size)},
+    )
+
+
+@router.post("/{bucket_name}/complete")
+async def presign_upload_complete(
+    bucket_name: str,
+    data: UploadComplete,
+    aws_service=Depends(get_async_aws_service.dependency),
+    session=Depends(get_session),
+    user=Depends(get_optional_user),
+) -> ObjectInfo:
+    """Клиент сообщает об окончании загрузки по presigned URL"""
+    return await _record_upload(aws_service, bucket_name, data.key, session, user)
+
+
+@router.get("/{bucket_name}/download")
+async def presign_download(
+    bucket_name: str,
+    filename: str,
+    expires: int | None = None,
+    aws_service=Depends(get_async_aws_service.dependency),
+) -> PresignedUrl:
+    expires = expires_in(expires)
+    url = await aws_service.presign_get(
+        bucket_name=bucket_name, key=filename, expires=expires, filename=filename
+    )
+    return PresignedUrl(url=url, method="GET", expires_in=expires)
+
+
+@router.post("/{bucket_name}/multipart")
+async def presign_multipart(
+    bucket_name: str,
+    data: PresignUploadRequest,
+    aws_service=Depends(get_async_aws_service.dependency),
+) -> PresignedMultipart:
+    """
+    Начинаем multipart upload: URL на каждую часть (размер части подписан).
+    Клиент грузит части (можно параллельно) и вызывает /multipart/complete
+    """
+    check_upload(data.size, data.content_type)
+    if data.size == 0:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Empty file, use presigned upload",
+        )
+    expires = expires_in(data.expires)
+    part_size = part_size_for(data.size, aws_service.multipart_part_size)
+    upload = await aws_service.presign_multipart(
+        bucket_name=bucket_name,
+        key=data.key,
+        content_type=data.content_type,
+        size=data.size,
+        part_size=part_size,
+        expires=expires,
+    )
+    return PresignedMultipart(**upload, part_size=part_size, expires_in=expires)
+
+
+@router.post("/{bucket_name}/multipart/complete")
+async def presign_multipart_complete(
+    bucket_name: str,
+    data: MultipartCompleteRequest,
+    aws_service=Depends(get_async_aws_service.dependency),
+    session=Depends(get_session),
+    user=Depends(get_optional_user),
+) -> ObjectInfo:
+    try:
+        await aws_service.complete_multipart(
+            bucket_name=bucket_name,
+            key=data.key,
+            upload_id=data.upload_id,
+            parts=[
+                {"PartNumber": part.part_number, "ETag": part.etag}
+                for part in data.parts
+            ],
+        )
+    except ClientError as e:
+        raise_s3_http_error(e)
+    return await _record_upload(aws_service, bucket_name, data.key, session, user)
+
+
+@router.post("/{bucket_name}/multipart/abort")
+async def presign_multipart_abort(
+    bucket_name: str,
+    data: MultipartUpload,
+    aws_service=Depends(get_async_aws_service.dependency),
+):
+    try:
+        await aws_service.abort_multipart(bucket_name, data.key, data.upload_id)
+    except ClientError as e:
+        raise_s3_http_error(e)
+    return {"status": "success"}
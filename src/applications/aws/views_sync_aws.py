@@ -1,39 +1,357 @@
-from fastapi import APIRouter, UploadFile
-from fastapi.responses import StreamingResponse
+import asyncio
 
-from applications.aws.services import sync_aws_service
+from botocore.exceptions import ClientError
+from fastapi import (
+    APIRouter,
+    Depends,
+    Header,
+    HTTPException,
+    Request,
+    UploadFile,
+    status,
+)
+from loguru import logger
+
+from applications.auth.dependecies import get_optional_user
+from applications.aws.compression import accepts_encoding, stored_encoding
+from applications.aws.presign import check_upload, expires_in, part_size_for
+from applications.aws.schemas import (
+    MultipartCompleteRequest,
+    MultipartUpload,
+    ObjectInfo,
+    PresignedMultipart,
+    PresignedUrl,
+    PresignUploadRequest,
+    UploadComplete,
+    UploadResult,
+)
+from applications.aws.services import get_sync_aws_service
+from applications.aws.services.object_index import object_index
+from applications.aws.streaming import (
+    cache_control_for,
+    encoded_object_response,
+    iter_sync_body,
+    ndjson_response,
+    not_modified_from_error,
+    parse_range,
+    raise_s3_http_error,
+    raw_body_content_type,
+    request_conditions,
+    StreamReader,
+    SyncStreamReader,
+)
+from core.conf import settings
+from core.database import get_session
 
 router = APIRouter(tags=["S3 Sync"])
 
 
 @router.post("/create/bucket")
-async def create_bucket(bucket_name: str):
-    return sync_aws_service.create_bucket(bucket_name=bucket_name)
+async def create_bucket(
+    bucket_name: str, aws_service=Depends(get_sync_aws_service.dependency)
+):
+    return await aws_service.run(aws_service.create_bucket, bucket_name=bucket_name)
 
 
 @router.post("/delete/bucket")
-async def delete_bucket(bucket_name: str):
-    return sync_aws_service.delete_bucket(bucket_name=bucket_name)
+async def delete_bucket(
+    bucket_name: str,
+    aws_service=Depends(get_sync_aws_service.dependency),
+    session=Depends(get_session),
+):
+    result = await aws_service.run(aws_service.delete_bucket, bucket_name=bucket_name)
+    await object_index.delete_bucket(session, bucket_name)
+    return result
+
+
+@router.post("/empty/bucket")
+async def empty_bucket(
+    bucket_name: str,
+    aws_service=Depends(get_sync_aws_service.dependency),
+    session=Depends(get_session),
+):
+    result = await aws_service.run(aws_service.empty_bucket, bucket_name=bucket_name)
+    await object_index.delete_bucket(session, bucket_name)
+    return result
+
+
+@router.post("/delete/all/buckets")
+async def delete_all_buckets(
+    aws_service=Depends(get_sync_aws_service.dependency), session=Depends(get_session)
+):
+    result = await aws_service.run(aws_service.delete_all_buckets)
+    await object_index.delete_bucket(session)
+    return result
 
 
 @router.get("/buckets")
-async def get_buckets():
-    return sync_aws_service.list_buckets()
+async def get_buckets(aws_service=Depends(get_sync_aws_service.dependency)):
+    return await aws_service.run(aws_service.list_buckets)
+
+
+@router.get("/objects")
+async def list_objects(
+    bucket_name: str | None = None,
+    prefix: str = "",
+    delimiter: str | None = None,
+    continuation_token: str | None = None,
+    aws_service=Depends(get_sync_aws_service.dependency),
+):
+    """Потоковый листинг объектов бакета в формате NDJSON"""
+    records = aws_service.list_objects(
+        bucket_name=bucket_name,
+        prefix=prefix,
+        delimiter=delimiter,
+        continuation_token=continuation_token,
+    )
+    return await ndjson_response(aws_service.iterate(records))
 
 
 @router.get("/object/{file_name}")
-async def get_objects(file_name: str):
-    res = sync_aws_service.get_object(object_name=file_name)
-    return StreamingResponse(
-        content=res["Body"],
-        media_type=res["ContentType"],
-        headers={
-            "Content-Disposition": f"attachment; filename={file_name.split('/')[-1]}",
-        },
+async def get_objects(
+    file_name: str,
+    range_header: str | None = Header(default=None, alias="Range"),
+    accept_encoding: str | None = Header(default=None),
+    if_none_match: str | None = Header(default=None),
+    if_modified_since: str | None = Header(default=None),
+    aws_service=Depends(get_sync_aws_service.dependency),
+):
+    byte_range = parse_range(range_header)
+    conditions = request_conditions(if_none_match, if_modified_since)
+    cache_control = cache_control_for(aws_service.bucket_name)
+    try:
+        res = await aws_service.run(
+            aws_service.get_object,
+            object_name=file_name,
+            range=byte_range,
+            conditions=conditions,
+        )
+        encoding = stored_encoding(res)
+        if byte_range and encoding and not accepts_encoding(accept_encoding, encoding):
+            # Диапазон сжатых байт без распаковки бесполезен - отдаем целиком
+            res["Body"].close()
+            res = await aws_service.run(
+                aws_service.get_object, object_name=file_name, conditions=conditions
+            )
+    except ClientError as e:
+        not_modified = not_modified_from_error(e, accept_encoding, cache_control)
+        if not_modified is not None:
+            return not_modified
+        raise_s3_http_error(e)
+    return encoded_object_response(
+        obj=res,
+        filename=file_name,
+        content=iter_sync_body(
+            res["Body"],
+            settings.s3_download_chunk_size,
+            executor=aws_service.executor,
+        ),
+        accept_encoding=accept_encoding,
+        cache_control=cache_control,
+    )
+
+
+@router.get("/presign/object/{file_name}")
+async def presign_object(
+    file_name: str,
+    expires: int | None = None,
+    aws_service=Depends(get_sync_aws_service.dependency),
+) -> PresignedUrl:
+    """URL для скачивания напрямую из S3 (бакет по умолчанию)"""
+    expires = expires_in(expires)
+    url = aws_service.presign_get(object_name=file_name, expires=expires)
+    return PresignedUrl(url=url, method="GET", expires_in=expires)
+
+
+@router.post("/presign/save/file")
+async def presign_save_file(
+    data: PresignUploadRequest,
+    aws_service=Depends(get_sync_aws_service.dependency),
+) -> PresignedUrl:
+    """
+    URL для PUT загрузки напрямую в S3 (бакет по умолчанию),
+    после нее клиент вызывает /presign/save/file/complete
+    """
+    check_upload(data.size, data.content_type)
+    expires = expires_in(data.expires)
+    url = aws_service.presign_put(
+        object_name=data.key,
+        content_type=data.content_type,
+        size=data.size,
+        expires=expires,
+    )
+    return PresignedUrl(
+        url=url,
+        method="PUT",
+        expires_in=expires,
+        headers={"Content-Type": data.content_type, "Content-Length": str(data.size)},
+    )
+
+
+async def _record_upload(aws_service, key: str, session, user) -> ObjectInfo:
+    """
+    Проверяем загруженный клиентом объект: нарушает ограничения - удаляем,
+    иначе записываем в индекс объектов (как /presign/{bucket}/complete)
+    """
+    try:
+        head = await aws_service.run(aws_service.confirm_upload, object_name=key)
+    except ClientError as e:
+        raise_s3_http_error(e)
+    info = ObjectInfo(
+        key=key,
+        size=head["ContentLength"],
+        etag=head["ETag"].strip('"'),
+        content_type=head.get("ContentType"),
     )
+    try:
+        check_upload(info.size, info.content_type or "")
+    except HTTPException:
+        await aws_service.run(aws_service.delete_object, object_name=key)
+        raise
+    await object_index.create(
+        session,
+        aws_service.bucket_name,
+        key,
+        info.size,
+        info.etag,
+        content_type=info.content_type,
+        uploader_id=user.id if user else None,
+    )
+    logger.info(
+        "Presigned upload {}/{}: {} bytes", aws_service.bucket_name, key, info.size
+    )
+    return info
+
+
+@router.post("/presign/save/file/complete")
+async def presign_save_file_complete(
+    data: UploadComplete,
+    aws_service=Depends(get_sync_aws_service.dependency),
+    session=Depends(get_session),
+    user=Depends(get_optional_user),
+) -> ObjectInfo:
+    """Клиент сообщает об окончании загрузки по presigned URL"""
+    return await _record_upload(aws_service, data.key, session, user)
+
+
+@router.post("/presign/save/multipart")
+async def presign_save_multipart(
+    data: PresignUploadRequest,
+    aws_service=Depends(get_sync_aws_service.dependency),
+) -> PresignedMultipart:
+    """URL на каждую часть multipart upload, затем /presign/save/multipart/complete"""
+    check_upload(data.size, data.content_type)
+    if data.size == 0:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Empty file, use presigned upload",
+        )
+    expires = expires_in(data.expires)
+    part_size = part_size_for(data.size, aws_service.multipart_part_size)
+    try:
+        upload = await aws_service.run(
+            aws_service.presign_multipart,
+            object_name=data.key,
+            content_type=data.content_type,
+            size=data.size,
+            part_size=part_size,
+            expires=expires,
+        )
+    except ClientError as e:
+        raise_s3_http_error(e)
+    return PresignedMultipart(**upload, part_size=part_size, expires_in=expires)
+
+
+@router.post("/presign/save/multipart/complete")
+async def presign_save_multipart_complete(
+    data: MultipartCompleteRequest,
+    aws_service=Depends(get_sync_aws_service.dependency),
+    session=Depends(get_session),
+    user=Depends(get_optional_user),
+) -> ObjectInfo:
+    try:
+        await aws_service.run(
+            aws_service.complete_multipart,
+            object_name=data.key,
+            upload_id=data.upload_id,
+            parts=[
+                {"PartNumber": part.part_number, "ETag": part.etag}
+                for part in data.parts
+            ],
+        )
+    except ClientError as e:
+        raise_s3_http_error(e)
+    return await _record_upload(aws_service, data.key, session, user)
+
+
+@router.post("/presign/save/multipart/abort")
+async def presign_save_multipart_abort(
+    data: MultipartUpload,
+    aws_service=Depends(get_sync_aws_service.dependency),
+):
+    try:
+        await aws_service.run(
+            aws_service.abort_multipart, object_name=data.key, upload_id=data.upload_id
+        )
+    except ClientError as e:
+        raise_s3_http_error(e)
+    return {"status": "success"}
 
 
 @router.post("/save/file")
-async def save_file(file: UploadFile):
-    sync_aws_service.upload_file(file=file)
+async def save_file(
+    file: UploadFile,
+    aws_service=Depends(get_sync_aws_service.dependency),
+    session=Depends(get_session),
+    user=Depends(get_optional_user),
+):
+    await aws_service.run(aws_service.upload_file, file=file)
+    # upload_fileobj не возвращает ETag
+    head = await aws_service.run(aws_service.head_object, object_name=file.filename)
+    await object_index.create(
+        session,
+        aws_service.bucket_name,
+        file.filename,
+        file.size,
+        head["ETag"],
+        content_type=file.content_type,
+        uploader_id=user.id if user else None,
+    )
     return {"status": "ok"}
+
+
+@router.put("/save/stream/{file_name:path}")
+async def save_stream(
+    file_name: str,
+    request: Request,
+    aws_service=Depends(get_sync_aws_service.dependency),
+    session=Depends(get_session),
+    user=Depends(get_optional_user),
+) -> UploadResult:
+    """Тело запроса - сам файл, boto3 читает его из потока без временных файлов"""
+    content_type = raw_body_content_type(request.headers.get("content-type"))
+    reader = StreamReader(request.stream())
+    await aws_service.run(
+        aws_service.upload_stream,
+        fileobj=SyncStreamReader(reader, asyncio.get_running_loop()),
+        object_name=file_name,
+        content_type=content_type,
+    )
+    head = await aws_service.run(aws_service.head_object, object_name=file_name)
+    etag = head["ETag"].strip('"')
+    await object_index.create(
+        session,
+        aws_service.bucket_name,
+        file_name,
+        reader.size,
+        etag,
+        content_type=content_type,
+        uploader_id=user.id if user else None,
+    )
+    return UploadResult(key=file_name, etag=etag, size=reader.size)
+
+
+@router.get("/sync/stats")
+async def get_sync_stats(aws_service=Depends(get_sync_aws_service.dependency)):
+    """Метрики пула потоков синхронного сервиса"""
+    return aws_service.executor.stats()
@@ -0,0 +1,247 @@
+"""
+Нагрузочный бенчмарк приложения внутри процесса (ASGI transport, без сети)
+
+- Приложение: main.create_app(), запросы через httpx.ASGITransport
+- S3: локальный moto server (pip install "moto[server]")
+- БД: временный файл SQLite, схема из моделей
+- Сценарии: sign-in, /auth/auth/me, refresh, upload, download, listing
+- Результат: rps и p50/p95/p99 по каждому сценарию, JSON для сравнения
+
+Запуск из каталога src:
+    python -m benchmarks.asgi_bench --requests 500 --concurrency 32 \\
+        --out bench.json --baseline bench-before.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import statistics
+import tempfile
+import time
+from collections.abc import Awaitable, Callable
+from datetime import UTC, datetime
+from pathlib import Path
+
+_BUCKET = "bench"
+_EMAIL = "bench@example.com"
+_PASSWORD = "bench-password"
+
+
+def _configure_env(s3_endpoint_port: int, db_path: str):
+    """Настройки читаются при создании приложения - выставляем их до импорта main"""
+    os.environ.update(
+        MINIO_ROOT_USER="bench",
+        MINIO_ROOT_PASSWORD="bench-secret",
+        MINIO_DOMAIN="127.0.0.1",
+        MINIO_API_PORT=str(s3_endpoint_port),
+        MINIO_CONSOLE_PORT="0",
+        AWS_DEFAULT_REGION="us-east-1",
+        SQLITE_PATH=db_path,
+        DB_ENGINE="sqlite",
+    )
+
+
+def _start_s3(port: int):
+    try:
+        from moto.server import ThreadedMotoServer
+    except ImportError as e:
+        raise SystemExit('S3 stand-in requires moto: pip install "moto[server]"') from e
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    server = ThreadedMotoServer(ip_address="127.0.0.1", port=port, verbose=False)
+    server.start()
+    return server
+
+
+def percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def run_scenario(
+    name: str,
+    call: Callable[[int], Awaitable[int]],
+    requests: int,
+    concurrency: int,
+) -> dict:
+    """call(i) делает один запрос и возвращает HTTP статус"""
+    latencies: list[float] = []
+    errors = 0
+    counter = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            started = time.perf_counter()
+            try:
+                status = await call(i)
+            except Exception:
+                status = 0
+            latencies.append(time.perf_counter() - started)
+            if status >= 400 or status == 0:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    ms = [value * 1000 for value in latencies]
+    return {
+        "name": name,
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "rps": round(requests / elapsed, 1) if elapsed else 0.0,
+        "mean_ms": round(statistics.fmean(ms), 3) if ms else 0.0,
+        "p50_ms": round(percentile(ms, 50), 3),
+        "p95_ms": round(percentile(ms, 95), 3),
+        "p99_ms": round(percentile(ms, 99), 3),
+    }
+
+
+async def bench(args) -> dict:
+    import httpx
+
+    from main import create_app
+    from core.database.conf import dispose_engines, get_engine
+    from core.database.models import Base
+
+    async with get_engine().begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+
+    app = create_app()
+    payload = os.urandom(args.object_size)
+    transport = httpx.ASGITransport(app=app)
+    results = []
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(
+            transport=transport, base_url="https://bench", timeout=60
+        ) as client:
+            await client.post(
+                "/auth/sign-up",
+                json={
+                    "fullname": "Bench",
+                    "phone": None,
+                    "email": _EMAIL,
+                    "password1": _PASSWORD,
+                    "password2": _PASSWORD,
+                },
+            )
+            login = {"username": _EMAIL, "password": _PASSWORD}
+
+            async def sign_in(_):
+                return (await client.post("/auth/sign-in", data=login)).status_code
+
+            # Токены и refresh cookie для остальных сценариев
+            res = await client.post("/auth/sign-in", data=login)
+            headers = {"Authorization": f"Bearer {res.json()['access_token']}"}
+            refresh_cookie = {"refresh_token": res.cookies["refresh_token"]}
+
+            async def me(_):
+                res = await client.get("/auth/auth/me", headers=headers)
+                return res.status_code
+
+            async def refresh(_):
+                client.cookies.update(refresh_cookie)
+                return (await client.post("/auth/refresh")).status_code
+
+            async def upload(i):
+                files = {"file": (f"obj-{i % args.objects}.bin", payload)}
+                res = await client.post(f"/upload/{_BUCKET}", files=files)
+                return res.status_code
+
+            async def download(i):
+                params = {
+                    "filename": f"obj-{i % args.objects}.bin",
+                    "bucket_name": _BUCKET,
+                }
+                res = await client.get("/download/", params=params)
+                return res.status_code
+
+            async def listing(_):
+                res = await client.get(f"/list/objects/{_BUCKET}")
+                return res.status_code
+
+            scenarios = {
+                "sign_in": sign_in,
+                "me": me,
+                "refresh": refresh,
+                "upload": upload,
+                "download": download,
+                "list_objects": listing,
+            }
+            for name in args.scenarios or scenarios:
+                results.append(
+                    await run_scenario(
+                        name, scenarios[name], args.requests, args.concurrency
+                    )
+                )
+    await dispose_engines()
+    return {
+        "created_at": datetime.now(UTC).isoformat(),
+        "python": platform.python_version(),
+        "object_size": args.object_size,
+        "scenarios": results,
+    }
+
+
+def compare(current: dict, baseline: dict) -> list[str]:
+    """Разница с базовым прогоном по rps и p95 (в процентах)"""
+    before = {item["name"]: item for item in baseline["scenarios"]}
+    lines = []
+    for item in current["scenarios"]:
+        if (old := before.get(item["name"])) is None:
+            continue
+        rps = (item["rps"] - old["rps"]) / old["rps"] * 100 if old["rps"] else 0
+        p95 = (
+            (item["p95_ms"] - old["p95_ms"]) / old["p95_ms"] * 100
+            if old["p95_ms"]
+            else 0
+        )
+        lines.append(f"{item['name']:<14} rps {rps:+7.1f}%   p95 {p95:+7.1f}%")
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--object-size", type=int, default=64 * 1024)
+    parser.add_argument("--objects", type=int, default=50)
+    parser.add_argument("--s3-port", type=int, default=5055)
+    parser.add_argument("--scenarios", nargs="*", default=None)
+    parser.add_argument("--out", type=Path, default=None)
+    parser.add_argument("--baseline", type=Path, default=None)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        _configure_env(args.s3_port, f"{tmp}/bench.db")
+        server = _start_s3(args.s3_port)
+        try:
+            report = asyncio.run(bench(args))
+        finally:
+            server.stop()
+
+    print(
+        f"{'scenario':<14} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} "
+        f"{'p99 ms':>9} {'errors':>7}"
+    )
+    for item in report["scenarios"]:
+        print(
+            f"{item['name']:<14} {item['rps']:>9} {item['p50_ms']:>9} "
+            f"{item['p95_ms']:>9} {item['p99_ms']:>9} {item['errors']:>7}"
+        )
+    if args.out:
+        args.out.write_text(json.dumps(report, indent=2))
+    if args.baseline:
+        print("\nvs baseline:")
+        print("\n".join(compare(report, json.loads(args.baseline.read_text()))))
+
+
+if __name__ == "__main__":
+    main()
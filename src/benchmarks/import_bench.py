@@ -0,0 +1,133 @@
+"""
+Бенчмарк старта приложения: время импорта main по -X importtime
+
+- Каждый прогон - новый процесс python -X importtime -c "import main"
+- Результат: медиана и минимум по прогонам, самые тяжелые пакеты
+  (сумма self времени по пакету верхнего уровня), загружены ли boto3 / aiobotocore
+- JSON для сравнения с базовым прогоном, как в asgi_bench
+
+Запуск из каталога src:
+    python -m benchmarks.import_bench --runs 10 --out import.json \\
+        --baseline import-before.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+from datetime import UTC, datetime
+from pathlib import Path
+
+_SRC = Path(__file__).resolve().parent.parent
+# Загружаются только при первом обращении к S3 - при импорте их быть не должно
+_DEFERRED = ("boto3", "aiobotocore", "aiohttp", "aiosqlite", "asyncpg")
+
+
+def parse_importtime(stderr: str) -> dict[str, tuple[int, int]]:
+    """Модуль -> (self, cumulative) в микросекундах"""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        if not self_us.strip().isdigit():
+            continue
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+    return modules
+
+
+def run_once(src: Path, module: str) -> dict:
+    env = {**os.environ, "PYTHONPATH": str(src), "PYTHONDONTWRITEBYTECODE": "1"}
+    code = (
+        "import time; started = time.perf_counter(); "
+        f"import {module}; print(time.perf_counter() - started)"
+    )
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=src,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    modules = parse_importtime(result.stderr)
+    packages = defaultdict(int)
+    for name, (self_us, _) in modules.items():
+        packages[name.split(".")[0]] += self_us
+    return {
+        "wall_ms": float(result.stdout.strip().splitlines()[-1]) * 1000,
+        "modules": len(modules),
+        "packages": dict(packages),
+        "deferred_loaded": [name for name in _DEFERRED if name in modules],
+    }
+
+
+def bench(args) -> dict:
+    runs = [run_once(args.src, args.module) for _ in range(args.runs)]
+    wall = [run["wall_ms"] for run in runs]
+    packages = defaultdict(list)
+    for run in runs:
+        for name, self_us in run["packages"].items():
+            packages[name].append(self_us / 1000)
+    heaviest = sorted(
+        ((name, statistics.median(values)) for name, values in packages.items()),
+        key=lambda item: item[1],
+        reverse=True,
+    )[: args.top]
+    return {
+        "created_at": datetime.now(UTC).isoformat(),
+        "python": platform.python_version(),
+        "module": args.module,
+        "runs": args.runs,
+        "median_ms": round(statistics.median(wall), 1),
+        "min_ms": round(min(wall), 1),
+        "modules": runs[-1]["modules"],
+        "deferred_loaded": runs[-1]["deferred_loaded"],
+        "packages": [{"name": name, "self_ms": round(ms, 1)} for name, ms in heaviest],
+    }
+
+
+def compare(current: dict, baseline: dict) -> list[str]:
+    lines = []
+    for key in ("median_ms", "min_ms", "modules"):
+        old, new = baseline[key], current[key]
+        change = (new - old) / old * 100 if old else 0
+        lines.append(f"{key:<10} {old:>9} -> {new:>9}   {change:+7.1f}%")
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--src", type=Path, default=_SRC)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--out", type=Path, default=None)
+    parser.add_argument("--baseline", type=Path, default=None)
+    args = parser.parse_args()
+
+    # Прогрев: байткод и файловый кеш ОС не должны попасть в замер
+    run_once(args.src, args.module)
+    report = bench(args)
+
+    print(
+        f"import {report['module']}: median {report['median_ms']} ms, "
+        f"min {report['min_ms']} ms, {report['modules']} modules"
+    )
+    print(f"deferred modules loaded: {report['deferred_loaded'] or 'none'}")
+    print(f"\n{'package':<24} {'self ms':>9}")
+    for item in report["packages"]:
+        print(f"{item['name']:<24} {item['self_ms']:>9}")
+    if args.out:
+        args.out.write_text(json.dumps(report, indent=2))
+    if args.baseline:
+        print("\nvs baseline:")
+        print("\n".join(compare(report, json.loads(args.baseline.read_text()))))
+
+
+if __name__ == "__main__":
+    main()
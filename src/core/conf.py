@@ -1,7 +1,10 @@
 from pathlib import Path
+from typing import Literal
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
+from core.lazy import Lazy
+
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
 
 
@@ -12,26 +15,154 @@ class Settings(BaseSettings):
         env_file_encoding="utf-8",
     )
 
-    MINIO_ROOT_USER: str
-    MINIO_ROOT_PASSWORD: str
-    MINIO_DOMAIN: str
-    MINIO_CONSOLE_PORT: int
-    MINIO_API_PORT: int
+    # Без ключей boto использует свою цепочку (AWS_* переменные, профиль)
+    MINIO_ROOT_USER: str | None = None
+    MINIO_ROOT_PASSWORD: str | None = None
+    MINIO_DOMAIN: str = "localhost"
+    MINIO_CONSOLE_PORT: int = 9001
+    MINIO_API_PORT: int = 9000
+
+    # S3 клиент
+    s3_max_pool_connections: int = 50
+    s3_keepalive_timeout: float = 12
+    s3_tcp_keepalive: bool = True
+    s3_bucket_cache_ttl: float = 300
+    # Загрузка частями (multipart) для больших файлов
+    s3_multipart_threshold: int = 64 * 1024 * 1024
+    s3_multipart_part_size: int = 8 * 1024 * 1024
+    s3_multipart_concurrency: int = 4
+    s3_multipart_retries: int = 3
+    # Сколько файлов пакетной загрузки отправляется одновременно
+    s3_batch_concurrency: int = 16
+    # Распаковка архивов: лимиты распакованного размера (zip-бомбы) и числа файлов
+    s3_archive_max_member_size: int = 1024 * 1024 * 1024
+    s3_archive_max_total_size: int = 4 * 1024 * 1024 * 1024
+    s3_archive_max_members: int = 10_000
+    # Очистка бакетов: параллельные пачки delete_objects и бакеты
+    s3_purge_batch_concurrency: int = 4
+    s3_purge_bucket_concurrency: int = 4
+    # Дисковый LRU кеш объектов для /download/ (выключен, если каталог не задан)
+    s3_disk_cache_dir: str | None = None
+    s3_disk_cache_max_bytes: int = 1024 * 1024 * 1024
+    s3_disk_cache_max_object_bytes: int = 64 * 1024 * 1024
+    s3_disk_cache_fresh_for: float = 0
+    # Пул потоков для синхронного (boto3) сервиса
+    s3_sync_max_workers: int = 16
+    # Очередь ожидающих вызовов сверх пула (при переполнении - 503)
+    s3_sync_max_queue: int = 64
+    # Размер куска при отдаче объекта клиенту
+    s3_download_chunk_size: int = 64 * 1024
+    # Индекс объектов в БД (s3_objects): максимум страницы и пачка сверки с S3
+    s3_index_page_max_size: int = 1000
+    s3_index_reconcile_batch_size: int = 1000
+    # Cache-Control при отдаче объектов: бакет -> значение, "*" - остальные бакеты
+    s3_cache_control: dict[str, str] = {}
+    # Прозрачное сжатие объектов: бакеты целиком и/или Content-Type (шаблоны),
+    # zstd требует пакет zstandard. Пустые списки - сжатие выключено
+    s3_compress_buckets: list[str] = []
+    s3_compress_content_types: list[str] = []
+    s3_compress_encoding: Literal["gzip", "zstd"] = "gzip"
+    s3_compress_level: int = 6
+    s3_compress_min_size: int = 1024
+    # Дедупликация загрузок по SHA-256 (включается и параметром dedup запроса).
+    # copy: под запрошенным ключом делается CopyObject, иначе отдаем старый ключ
+    s3_dedup: bool = False
+    s3_dedup_copy: bool = False
+    # Presigned URL: срок жизни (по умолчанию / максимум), лимит размера
+    # и разрешенные Content-Type (шаблоны вида image/*, [] - любой)
+    s3_presign_expires: int = 900
+    s3_presign_max_expires: int = 3600
+    s3_presign_max_size: int = 5 * 1024 * 1024 * 1024
+    s3_presign_content_types: list[str] = []
 
     secret_key: str = "super-secret-key"
     algorithm: str = "HS256"
 
+    # Пароли: cost factor bcrypt и пул (thread / process) для хеширования
+    bcrypt_rounds: int = 12
+    password_hash_pool: Literal["thread", "process"] = "thread"
+    password_hash_workers: int = 4
+    password_hash_max_queue: int = 64
+    # Кеш пользователя для get_current_user (0 - выключен)
+    user_cache_ttl: float = 30
+    user_cache_max_size: int = 10_000
+    # Список пользователей: размер страницы, пачки выгрузки и импорта, лимит тела импорта
+    users_page_max_size: int = 1000
+    users_export_batch_size: int = 1000
+    users_import_batch_size: int = 1000
+    users_import_max_body_size: int = 16 * 1024 * 1024
+    # Доля воркеров bcrypt, которую может занять импорт (остальные - входам)
+    users_import_hash_share: float = 0.5
+
+    # База данных: sqlite (тесты, dev) или postgresql (asyncpg)
+    db_engine: Literal["sqlite", "postgresql"] = "sqlite"
+    postgres_host: str = "localhost"
+    postgres_port: int = 5432
+    postgres_user: str = "postgres"
+    postgres_password: str = "postgres"
+    postgres_db: str = "postgres"
+    # Пул соединений (postgresql)
+    db_pool_size: int = 10
+    db_max_overflow: int = 20
+    db_pool_pre_ping: bool = True
+    db_pool_recycle: int = 1800
+    db_prepared_statement_cache_size: int = 500
+    # Реплики только для чтения (URL в формате database_url)
+    db_replica_urls: list[str] = []
+    db_replica_health_interval: float = 10
+    sqlite_path: str = f"{BASE_DIR}/database.db"
+    # PRAGMA для sqlite
+    sqlite_busy_timeout_ms: int = 5000
+    sqlite_mmap_size: int = 256 * 1024 * 1024
+
+    # Сжатие ответов API (gzip, br - если установлен brotli) от min_size байт.
+    # Потоковые ответы сжимаются с flush после каждого куска; NDJSON листинги
+    # (куски по одной записи) по умолчанию не сжимаются
+    api_compress_min_size: int = 1024
+    api_compress_level: int = 6
+    api_compress_content_types: list[str] = [
+        "application/json",
+        "application/xml",
+        "text/*",
+    ]
+
+    # Метрики: /metrics и лог запросов дольше порога (None - лог выключен)
+    metrics_enabled: bool = True
+    slow_request_ms: float | None = None
+
     @property
     def s3_endpoint(self):
         return f"http://{self.MINIO_DOMAIN}:{self.MINIO_API_PORT}/"
 
     @property
     def sqlite_url(self):
-        return f"sqlite+aiosqlite:///{BASE_DIR}/database.db"
+        return f"sqlite+aiosqlite:///{self.sqlite_path}"
 
     @property
     def psql_url(self):
-        return ""
+        return (
+            f"postgresql+asyncpg://{self.postgres_user}:{self.postgres_password}"
+            f"@{self.postgres_host}:{self.postgres_port}/{self.postgres_db}"
+        )
+
+    @property
+    def database_url(self):
+        return self.psql_url if self.db_engine == "postgresql" else self.sqlite_url
+
+
+class _LazySettings:
+    """
+    settings.<имя> - атрибут Settings, созданного при первом обращении:
+    импорт модулей не читает .env и окружение. Значения по умолчанию
+    аргументов из settings не берем - они вычисляются при импорте
+    """
+
+    def __getattr__(self, name: str):
+        return getattr(get_settings(), name)
+
+    def __setattr__(self, name: str, value):
+        setattr(get_settings(), name, value)
 
 
-settings = Settings()
+get_settings = Lazy(Settings)
+settings = _LazySettings()
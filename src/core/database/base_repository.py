@@ -1,4 +1,17 @@
 from abc import ABC, abstractmethod
+from typing import TYPE_CHECKING
+
+from sqlalchemy import func, insert, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+
+def _dialect_insert(session: "AsyncSession"):
+    """INSERT с ON CONFLICT: у postgresql и sqlite свои конструкции"""
+    dialect = session.get_bind().dialect.name
+    return {"postgresql": postgresql.insert, "sqlite": sqlite.insert}[dialect]
 
 
 class BaseRepository(ABC):
@@ -15,3 +28,85 @@ class BaseRepository(ABC):
 
     @abstractmethod
     async def find_all(self, *args, **kwargs): ...
+
+    async def insert_one(self, session: "AsyncSession", commit: bool = True, **values):
+        """INSERT ... RETURNING: запись и готовый объект за один запрос"""
+        stmt = insert(self.model).values(**values).returning(self.model)
+        obj = await session.scalar(stmt)
+        if commit:
+            await session.commit()
+        return obj
+
+    async def update_one(
+        self, session: "AsyncSession", *where, commit: bool = True, **values
+    ):
+        """UPDATE ... WHERE ... RETURNING: None, если строка не найдена"""
+        stmt = (
+            update(self.model)
+            .where(*where)
+            .values(**values)
+            .returning(self.model)
+            # Объект из identity map сессии обновляется значениями из RETURNING
+            .execution_options(synchronize_session=False, populate_existing=True)
+        )
+        obj = await session.scalar(stmt)
+        if commit:
+            await session.commit()
+        return obj
+
+    async def insert_many(
+        self,
+        session: "AsyncSession",
+        rows: list[dict],
+        *returning,
+        conflict_columns: list[str] | None = None,
+        commit: bool = True,
+    ) -> list:
+        """
+        Многострочный INSERT одним запросом. conflict_columns - строки,
+        конфликтующие по этим колонкам, пропускаются (ON CONFLICT DO NOTHING)
+        и не попадают в RETURNING
+        """
+        if not rows:
+            return []
+        stmt = insert(self.model)
+        if conflict_columns:
+            stmt = _dialect_insert(session)(self.model).on_conflict_do_nothing(
+                index_elements=conflict_columns
+            )
+        stmt = stmt.values(rows)
+        if returning:
+            stmt = stmt.returning(*returning)
+        res = await session.execute(stmt)
+        inserted = res.all() if returning else []
+        if commit:
+            await session.commit()
+        return inserted
+
+    async def upsert_many(
+        self,
+        session: "AsyncSession",
+        rows: list[dict],
+        conflict_columns: list[str],
+        commit: bool = True,
+    ):
+        """
+        Многострочный INSERT ... ON CONFLICT DO UPDATE одним запросом:
+        у существующих строк перезаписываются переданные колонки.
+        Все строки - с одинаковым набором колонок
+        """
+        if not rows:
+            return
+        stmt = _dialect_insert(session)(self.model).values(rows)
+        columns = [column for column in rows[0] if column not in conflict_columns]
+        stmt = stmt.on_conflict_do_update(
+            index_elements=conflict_columns,
+            # onupdate колонок в ON CONFLICT не срабатывает
+            set_={
+                **{column: stmt.excluded[column] for column in columns},
+                "updated_at": func.now(),
+            },
+        )
+        await session.execute(stmt)
+        if commit:
+            await session.commit()
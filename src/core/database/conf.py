@@ -1,19 +1,118 @@
-from contextlib import asynccontextmanager
-
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+import time
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
 
+from core import metrics
 from core.conf import settings
+from core.database.routing import ReplicaPool, RoutingSession
+from core.lazy import Lazy
 
-async_engine = create_async_engine(url=settings.sqlite_url)
-Session = async_sessionmaker(
-    bind=async_engine,
-    expire_on_commit=False,
-    autocommit=False,
-    autoflush=False,
-    class_=AsyncSession,
-)
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """WAL: читатели не блокируют писателя, busy_timeout вместо 'database is locked'"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={settings.sqlite_busy_timeout_ms}")
+    cursor.execute(f"PRAGMA mmap_size={settings.sqlite_mmap_size}")
+    cursor.close()
+
+
+def _instrument(engine: AsyncEngine):
+    """Время каждого SQL запроса: гистограмма + статистика текущего HTTP запроса"""
+    database = engine.url.host or engine.url.get_backend_name()
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, many):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, many):
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+        metrics.db_query_duration.observe(elapsed, database=database)
+        metrics.track("db", elapsed)
+
+    @event.listens_for(engine.sync_engine, "handle_error")
+    def handle_error(exception_context):
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("query_started"):
+            conn.info["query_started"].pop()
+
+
+def build_engine(url: str | None = None, **kwargs) -> AsyncEngine:
+    """
+    Движок по настройкам: asyncpg с пулом и кешем prepared statements
+    или sqlite с PRAGMA на каждое соединение. kwargs переопределяют настройки
+    (например poolclass=NullPool для alembic)
+    """
+    url = url or settings.database_url
+    options = {}
+    if url.startswith("postgresql"):
+        options = {
+            "pool_size": settings.db_pool_size,
+            "max_overflow": settings.db_max_overflow,
+            "pool_pre_ping": settings.db_pool_pre_ping,
+            "pool_recycle": settings.db_pool_recycle,
+            "connect_args": {
+                "prepared_statement_cache_size": (
+                    settings.db_prepared_statement_cache_size
+                ),
+            },
+        }
+    if "poolclass" in kwargs:
+        for key in ("pool_size", "max_overflow", "pool_recycle"):
+            options.pop(key, None)
+    options.update(kwargs)
+    engine = create_async_engine(url=url, **options)
+    if engine.dialect.name == "sqlite":
+        event.listen(engine.sync_engine, "connect", _set_sqlite_pragmas)
+    if settings.metrics_enabled:
+        _instrument(engine)
+    return engine
+
+
+def _build_replicas() -> ReplicaPool:
+    return ReplicaPool(
+        engines=[build_engine(url) for url in settings.db_replica_urls],
+        health_interval=settings.db_replica_health_interval,
+    )
+
+
+def _build_sessionmaker() -> async_sessionmaker[AsyncSession]:
+    return async_sessionmaker(
+        bind=get_engine(),
+        expire_on_commit=False,
+        autocommit=False,
+        autoflush=False,
+        class_=AsyncSession,
+        sync_session_class=RoutingSession,
+        replicas=get_replicas(),
+    )
+
+
+# Движки создаются при первом обращении (или в lifespan), а не при импорте:
+# импорт моделей (alembic, скрипты) не тянет драйвер и пул соединений
+get_engine = Lazy(build_engine)
+get_replicas = Lazy(_build_replicas)
+get_sessionmaker = Lazy(_build_sessionmaker)
+
+
+def new_session() -> AsyncSession:
+    return get_sessionmaker()()
 
 
 async def get_session():
-    async with Session() as session:
+    async with new_session() as session:
         yield session
+
+
+async def dispose_engines():
+    if get_replicas.created:
+        await get_replicas().close()
+    if get_engine.created:
+        await get_engine().dispose()
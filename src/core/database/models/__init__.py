@@ -1,8 +1,12 @@
 __all__ = [
     "Base",
+    "ObjectDigest",
+    "S3Object",
     "User",
 ]
 
 
 from .base import Base
+from .object_digest import ObjectDigest
+from .s3_object import S3Object
 from .user import User
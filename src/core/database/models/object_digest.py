@@ -0,0 +1,23 @@
+from sqlalchemy import BigInteger, String, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+
+from core.database.models import Base
+
+
+class ObjectDigest(Base):
+    """Индекс дедупликации: SHA-256 содержимого -> ключ объекта в бакете"""
+
+    __tablename__ = "object_digests"
+    __table_args__ = (UniqueConstraint("bucket", "digest"),)
+
+    bucket: Mapped[str] = mapped_column(String(length=63), doc="Bucket name")
+    digest: Mapped[str] = mapped_column(String(length=64), doc="SHA-256 hex")
+    key: Mapped[str] = mapped_column(String(length=1024), doc="Object key")
+    size: Mapped[int] = mapped_column(BigInteger, doc="Size in bytes")
+    etag: Mapped[str] = mapped_column(String(length=255), doc="ETag on upload")
+
+    def __str__(self):
+        return f"ObjectDigest({self.bucket=}, {self.key=}, {self.digest=})"
+
+    def __repr__(self):
+        return self.__str__()
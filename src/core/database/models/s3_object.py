@@ -0,0 +1,36 @@
+from sqlalchemy import BigInteger, ForeignKey, Index, String, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+
+from core.database.models import Base
+
+
+class S3Object(Base):
+    """Индекс объектов S3: листинг и поиск без запросов в S3"""
+
+    __tablename__ = "s3_objects"
+    __table_args__ = (
+        # Листинг бакета по ключу (keyset) и upsert по (bucket, key)
+        UniqueConstraint("bucket", "key"),
+        # Файлы пользователя + keyset пагинация по id
+        Index("ix_s3_objects_uploader_id_id", "uploader_id", "id"),
+        Index("ix_s3_objects_bucket_size", "bucket", "size"),
+        # + индексы ключа в порядке байтов (ix_s3_objects_*_key_c): в postgresql
+        # с COLLATE "C", поэтому только в миграции c7ab4afc8e24
+    )
+
+    bucket: Mapped[str] = mapped_column(String(length=63), doc="Bucket name")
+    key: Mapped[str] = mapped_column(String(length=1024), doc="Object key")
+    size: Mapped[int] = mapped_column(BigInteger, doc="Size in bytes")
+    etag: Mapped[str] = mapped_column(String(length=255), doc="ETag")
+    content_type: Mapped[str | None] = mapped_column(
+        String(length=255), doc="Content-Type"
+    )
+    uploader_id: Mapped[int | None] = mapped_column(
+        ForeignKey("users.id", ondelete="SET NULL"), doc="Who uploaded"
+    )
+
+    def __str__(self):
+        return f"S3Object({self.bucket=}, {self.key=})"
+
+    def __repr__(self):
+        return self.__str__()
@@ -1,4 +1,4 @@
-from sqlalchemy import String
+from sqlalchemy import Index, String
 from sqlalchemy.orm import Mapped, mapped_column
 
 from core.database.models import Base
@@ -6,6 +6,11 @@ from core.database.models import Base
 
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        # Фильтры списка пользователей + keyset пагинация по id
+        Index("ix_users_is_active_id", "is_active", "id"),
+        Index("ix_users_is_admin_id", "is_admin", "id"),
+    )
 
     email: Mapped[str] = mapped_column(unique=True, doc="Email address")
     fullname: Mapped[str | None] = mapped_column(
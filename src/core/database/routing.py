@@ -0,0 +1,98 @@
+"""
+Маршрутизация запросов сессии между primary и репликами
+- SELECT без FOR UPDATE - на реплику (round-robin по здоровым)
+- INSERT / UPDATE / DELETE, flush и всё после первой записи в этой
+  сессии - на primary (читаем свои же изменения)
+- Реплики проверяются фоновым SELECT 1, недоступные пропускаются
+"""
+
+import asyncio
+import itertools
+
+from loguru import logger
+from sqlalchemy import Select, text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from sqlalchemy.orm import Session
+
+
+class ReplicaPool:
+
+    def __init__(self, engines: list[AsyncEngine], health_interval: float = 10):
+        self.engines = engines
+        self.health_interval = health_interval
+        self._healthy = {id(engine): True for engine in engines}
+        self._cycle = itertools.cycle(engines) if engines else None
+        self._task: asyncio.Task | None = None
+
+    def pick(self) -> AsyncEngine | None:
+        """Следующая здоровая реплика или None (тогда читаем с primary)"""
+        for _ in range(len(self.engines)):
+            engine = next(self._cycle)
+            if self._healthy[id(engine)]:
+                return engine
+        return None
+
+    async def check(self):
+        for engine in self.engines:
+            try:
+                async with engine.connect() as connection:
+                    await connection.execute(text("SELECT 1"))
+                healthy = True
+            except Exception as e:
+                healthy = False
+                if self._healthy[id(engine)]:
+                    logger.warning("Replica {} is down: {}", engine.url, e)
+            if healthy and not self._healthy[id(engine)]:
+                logger.info("Replica {} is back", engine.url)
+            self._healthy[id(engine)] = healthy
+
+    async def _health_loop(self):
+        while True:
+            await self.check()
+            await asyncio.sleep(self.health_interval)
+
+    def start(self):
+        if self.engines and self._task is None:
+            self._task = asyncio.create_task(self._health_loop())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        for engine in self.engines:
+            await engine.dispose()
+
+
+class RoutingSession(Session):
+    """
+    sync-сессия для AsyncSession(sync_session_class=RoutingSession, replicas=...),
+    primary - это bind сессии
+    """
+
+    def __init__(self, *args, replicas: ReplicaPool | None = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.replicas = replicas
+        self.use_primary = False
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if (
+            self.replicas is not None
+            and not self.use_primary
+            and not self._flushing
+            and isinstance(clause, Select)
+            and clause._for_update_arg is None
+            and (replica := self.replicas.pick()) is not None
+        ):
+            return replica.sync_engine
+        if self._flushing or (clause is not None and not isinstance(clause, Select)):
+            # Запись (или неизвестный запрос) - дальше в этой сессии только primary
+            self.use_primary = True
+        return super().get_bind(mapper=mapper, clause=clause, **kwargs)
+
+
+def use_primary(session: AsyncSession):
+    """
+    Дальше эта сессия читает только с primary: реплика может отставать,
+    а прочитанное будет закешировано или сразу использовано для записи
+    """
+    session.sync_session.use_primary = True
@@ -0,0 +1,180 @@
+"""
+Ограниченный пул потоков (или процессов) для блокирующих вызовов из async кода
+- Свой размер пула, не делит потоки с остальным приложением
+- Необязательный лимит очереди: при переполнении ExecutorBusy вместо ожидания
+- Метрики: глубина очереди, активные вызовы, время ожидания и выполнения
+  (гистограммы executor_*_seconds в /metrics)
+"""
+
+import asyncio
+import contextvars
+import functools
+import threading
+import time
+from collections.abc import Iterator
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+from core import metrics
+
+
+class ExecutorBusy(RuntimeError):
+    """Очередь пула заполнена"""
+
+
+class BlockingExecutor:
+
+    def __init__(
+        self,
+        max_workers: int,
+        name: str,
+        max_queue: int | None = None,
+        processes: bool = False,
+    ):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.processes = processes
+        self._pool: Executor | None = None
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.active = 0
+        self.calls = 0
+        self.errors = 0
+        self.wait_time = 0.0
+        self.run_time = 0.0
+        self.max_run_time = 0.0
+
+    def _call(self, ticket: dict, submitted_at: float, fn, args, kwargs):
+        started_at = time.perf_counter()
+        with self._lock:
+            if ticket["state"] == "abandoned":
+                # Вызывающая задача отменена, место в очереди уже освобождено
+                return None
+            ticket["state"] = "running"
+            self.queued -= 1
+            self.active += 1
+            self.wait_time += started_at - submitted_at
+        metrics.executor_wait_duration.observe(
+            started_at - submitted_at, pool=self.name
+        )
+        failed = False
+        try:
+            return fn(*args, **kwargs)
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            elapsed = time.perf_counter() - started_at
+            with self._lock:
+                self.active -= 1
+                self.calls += 1
+                self.errors += failed
+                self.run_time += elapsed
+                self.max_run_time = max(self.max_run_time, elapsed)
+            metrics.executor_run_duration.observe(elapsed, pool=self.name)
+
+    def _get_pool(self) -> Executor:
+        if self._pool is None:
+            # Пул создается при первом вызове и заново после shutdown
+            if self.processes:
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._pool = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix=self.name
+                )
+        return self._pool
+
+    def _reserve(self, limited: bool = True):
+        with self._lock:
+            in_flight = self.queued + self.active
+            if (
+                limited
+                and self.max_queue is not None
+                and in_flight >= self.max_workers + self.max_queue
+            ):
+                raise ExecutorBusy(f"{self.name}: queue is full")
+            self.queued += 1
+
+    async def _run_in_process(self, fn, args, kwargs):
+        # Счетчики живут в этом процессе, поэтому меряем вызов целиком
+        # (ожидание в очереди входит в run_time)
+        loop = asyncio.get_running_loop()
+        started_at = time.perf_counter()
+        failed = False
+        try:
+            return await loop.run_in_executor(
+                self._get_pool(), functools.partial(fn, *args, **kwargs)
+            )
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            elapsed = time.perf_counter() - started_at
+            with self._lock:
+                self.queued -= 1
+                self.calls += 1
+                self.errors += failed
+                self.run_time += elapsed
+                self.max_run_time = max(self.max_run_time, elapsed)
+            metrics.executor_run_duration.observe(elapsed, pool=self.name)
+
+    async def run(self, fn, /, *args, **kwargs):
+        """Выполнить fn(*args, **kwargs) в пуле и дождаться результата"""
+        return await self._submit(fn, args, kwargs)
+
+    async def _submit(self, fn, args, kwargs, limited: bool = True):
+        self._reserve(limited)
+        if self.processes:
+            return await self._run_in_process(fn, args, kwargs)
+        loop = asyncio.get_running_loop()
+        # Контекст вызывающей задачи (метрики текущего HTTP запроса) - в поток
+        context = contextvars.copy_context()
+        ticket = {"state": "queued"}
+        call = functools.partial(
+            context.run, self._call, ticket, time.perf_counter(), fn, args, kwargs
+        )
+        try:
+            return await loop.run_in_executor(self._get_pool(), call)
+        finally:
+            # Отмена до начала выполнения (клиент отключился): _call не запустится
+            # или ничего не сделает - резерв очереди освобождаем здесь
+            with self._lock:
+                if ticket["state"] == "queued":
+                    ticket["state"] = "abandoned"
+                    self.queued -= 1
+
+    async def iterate(self, iterator: Iterator, limited: bool = True):
+        """
+        Обходим блокирующий итератор, каждый next() - в пуле
+        Лимит очереди - только на первый шаг (limited=False - без лимита):
+        начатый поток (ответ уже отправляется) не обрываем из-за переполнения
+        """
+        iterator = iter(iterator)
+        sentinel = object()
+        while (
+            item := await self._submit(next, (iterator, sentinel), {}, limited)
+        ) is not sentinel:
+            limited = False
+            yield item
+
+    def stats(self) -> dict:
+        with self._lock:
+            calls = self.calls or 1
+            return {
+                "name": self.name,
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "queue_depth": self.queued,
+                "active": self.active,
+                "calls": self.calls,
+                "errors": self.errors,
+                "avg_wait_ms": round(self.wait_time / calls * 1000, 3),
+                "avg_run_ms": round(self.run_time / calls * 1000, 3),
+                "max_run_ms": round(self.max_run_time * 1000, 3),
+            }
+
+    def shutdown(self, wait: bool = True):
+        if self._pool is None:
+            return
+        pool, self._pool = self._pool, None
+        pool.shutdown(wait=wait, cancel_futures=True)
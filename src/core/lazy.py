@@ -0,0 +1,38 @@
+"""
+Ленивое создание тяжелых объектов (клиенты S3, движок БД)
+- Объект создается при первом вызове, один раз (потокобезопасно)
+- FastAPI зависимость: Depends(get_service.dependency)
+- Фабрика может вернуть None (например, выключенный кеш) - это тоже результат
+"""
+
+import threading
+from collections.abc import Callable
+from typing import Generic, TypeVar
+
+T = TypeVar("T")
+
+_UNSET = object()
+
+
+class Lazy(Generic[T]):
+
+    def __init__(self, factory: Callable[[], T]):
+        self.factory = factory
+        self._value = _UNSET
+        self._lock = threading.Lock()
+
+    def __call__(self) -> T:
+        if self._value is _UNSET:
+            with self._lock:
+                if self._value is _UNSET:
+                    self._value = self.factory()
+        return self._value
+
+    async def dependency(self) -> T:
+        """async, чтобы FastAPI не отправлял каждый вызов в пул потоков"""
+        return self()
+
+    @property
+    def created(self) -> bool:
+        """Создан ли объект (чтобы не создавать его ради закрытия или метрик)"""
+        return self._value is not _UNSET
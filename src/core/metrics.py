@@ -0,0 +1,223 @@
+"""
+Метрики в формате Prometheus (text exposition 0.0.4) без внешних зависимостей
+- Counter / Histogram с метками, Collector - значения, снимаемые при отдаче
+- request_stats: время SQL / S3 / bcrypt внутри текущего HTTP запроса
+  (для лога медленных запросов)
+"""
+
+import threading
+import time
+from collections import defaultdict
+from collections.abc import Callable, Iterable
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+_DEFAULT_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+
+def _labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Counter:
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: dict[tuple, float] = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(labels[name] for name in self.labelnames)
+        with self._lock:
+            self._values[key] += amount
+
+    def render(self) -> list[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} counter",
+        ]
+        with self._lock:
+            for key, value in self._values.items():
+                lines.append(f"{self.name}{_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Histogram:
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: tuple[float, ...] = _DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = buckets
+        # метки -> [счетчики по бакетам..., сумма, количество]
+        self._values: dict[tuple, list[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(labels[name] for name in self.labelnames)
+        with self._lock:
+            data = self._values.get(key)
+            if data is None:
+                data = self._values[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    data[i] += 1
+            data[-2] += value
+            data[-1] += 1
+
+    def render(self) -> list[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} histogram",
+        ]
+        with self._lock:
+            for key, data in self._values.items():
+                for bound, count in zip(self.buckets, data):
+                    le = _labels(self.labelnames, key, f'le="{bound}"')
+                    lines.append(f"{self.name}_bucket{le} {count}")
+                le = _labels(self.labelnames, key, 'le="+Inf"')
+                lines.append(f"{self.name}_bucket{le} {data[-1]}")
+                labels = _labels(self.labelnames, key)
+                lines.append(f"{self.name}_sum{labels} {data[-2]}")
+                lines.append(f"{self.name}_count{labels} {data[-1]}")
+        return lines
+
+
+class Collector:
+    """Снимаем значения в момент отдачи /metrics (статистика пулов, кешей)"""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        kind: str,
+        collect: Callable[[], Iterable[tuple[dict, float]]],
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.kind = kind
+        self.collect = collect
+
+    def render(self) -> list[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        for labels, value in self.collect():
+            names = tuple(labels)
+            lines.append(f"{self.name}{_labels(names, tuple(labels.values()))} {value}")
+        return lines
+
+
+class Registry:
+
+    def __init__(self):
+        self._metrics: dict[str, Counter | Histogram | Collector] = {}
+
+    def register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_request_duration = registry.register(
+    Histogram(
+        "http_request_duration_seconds",
+        "HTTP request latency by route and status",
+        ["method", "route", "status"],
+    )
+)
+db_query_duration = registry.register(
+    Histogram("db_query_duration_seconds", "SQL statement execution time", ["database"])
+)
+db_queries_per_request = registry.register(
+    Histogram(
+        "db_queries_per_request",
+        "SQL statements executed per HTTP request",
+        ["route"],
+        buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100),
+    )
+)
+s3_request_duration = registry.register(
+    Histogram("s3_request_duration_seconds", "S3 API call latency", ["operation"])
+)
+s3_bytes = registry.register(
+    Counter(
+        "s3_transferred_bytes_total",
+        "Bytes sent to / received from S3",
+        ["operation", "direction"],
+    )
+)
+s3_errors = registry.register(
+    Counter("s3_errors_total", "Failed S3 API calls", ["operation"])
+)
+executor_wait_duration = registry.register(
+    Histogram(
+        "executor_wait_seconds", "Time a blocking call waits for a worker", ["pool"]
+    )
+)
+executor_run_duration = registry.register(
+    Histogram("executor_run_seconds", "Blocking call execution time", ["pool"])
+)
+
+# ----------------------------- Текущий запрос ----------------------------- #
+_request_stats: ContextVar[dict | None] = ContextVar("request_stats", default=None)
+
+
+def start_request() -> dict:
+    stats = defaultdict(float)
+    _request_stats.set(stats)
+    return stats
+
+
+def track(kind: str, seconds: float):
+    """Добавить время (и +1 вызов) вида kind к статистике текущего запроса"""
+    stats = _request_stats.get()
+    if stats is not None:
+        stats[f"{kind}_seconds"] += seconds
+        stats[f"{kind}_count"] += 1
+
+
+@contextmanager
+def tracked(kind: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        track(kind, time.perf_counter() - started)
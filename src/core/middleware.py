@@ -0,0 +1,203 @@
+"""
+ASGI middleware замера времени запросов
+- Гистограмма по методу, шаблону маршрута и статусу
+- Сколько SQL запросов выполнил HTTP запрос
+- Лог медленных запросов с разбивкой на SQL / S3 / bcrypt
+
+Сжатие ответов API (br / gzip) по типу содержимого и размеру
+"""
+
+import time
+import zlib
+from fnmatch import fnmatch
+
+from loguru import logger
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from core import metrics
+
+
+class MetricsMiddleware:
+
+    def __init__(self, app: ASGIApp, slow_request_ms: float | None = None):
+        self.app = app
+        self.slow_request_ms = slow_request_ms
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = metrics.start_request()
+        status = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message: Message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # Шаблон пути (/download/{x}), а не сам путь - иначе метки без предела
+            route = getattr(scope.get("route"), "path", "unmatched")
+            elapsed = time.perf_counter() - started
+            metrics.http_request_duration.observe(
+                elapsed, method=scope["method"], route=route, status=status
+            )
+            metrics.db_queries_per_request.observe(stats["db_count"], route=route)
+            if self.slow_request_ms is not None and (
+                elapsed * 1000 >= self.slow_request_ms
+            ):
+                logger.warning(
+                    "Slow request {} {} -> {} in {:.1f} ms "
+                    "(db: {:.0f} queries / {:.1f} ms, s3: {:.0f} calls / {:.1f} ms, "
+                    "bcrypt: {:.0f} / {:.1f} ms)",
+                    scope["method"],
+                    route,
+                    status,
+                    elapsed * 1000,
+                    stats["db_count"],
+                    stats["db_seconds"] * 1000,
+                    stats["s3_count"],
+                    stats["s3_seconds"] * 1000,
+                    stats["bcrypt_count"],
+                    stats["bcrypt_seconds"] * 1000,
+                )
+
+
+def _accepts(accept_encoding: str, encoding: str) -> bool:
+    for item in accept_encoding.lower().split(","):
+        name, _, params = item.strip().partition(";")
+        if name.strip() == encoding:
+            return params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00")
+    return False
+
+
+class _GZip:
+    def __init__(self, level: int):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes, more_body: bool) -> bytes:
+        # SYNC_FLUSH: кусок потокового ответа уходит клиенту сразу, а не
+        # копится в буфере компрессора до конца потока (NDJSON, CSV выгрузки)
+        flush = zlib.Z_SYNC_FLUSH if more_body else zlib.Z_FINISH
+        return self._compressor.compress(data) + self._compressor.flush(flush)
+
+
+class _Brotli:
+    def __init__(self, level: int):
+        import brotli
+
+        # Качество brotli 0-11, уровень gzip 1-9 - шкалы близки
+        self._compressor = brotli.Compressor(quality=level)
+
+    def compress(self, data: bytes, more_body: bool) -> bytes:
+        data = self._compressor.process(data)
+        if more_body:
+            return data + self._compressor.flush()
+        return data + self._compressor.finish()
+
+
+class CompressionMiddleware:
+    """
+    Сжатие ответов: br (если установлен brotli) или gzip, только перечисленные
+    типы от minimum_size байт. Не трогаем ответы с готовым Content-Encoding
+    (сжатые объекты из S3), частичные (206) и без тела (204, 304)
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        level: int = 6,
+        content_types: list[str] | None = None,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.level = level
+        self.content_types = [t.lower() for t in content_types or ["*"]]
+        try:
+            import brotli  # noqa: F401
+
+            self.brotli = True
+        except ImportError:
+            self.brotli = False
+
+    def _encoding(self, scope: Scope) -> str | None:
+        accept_encoding = Headers(scope=scope).get("accept-encoding", "")
+        if self.brotli and _accepts(accept_encoding, "br"):
+            return "br"
+        if _accepts(accept_encoding, "gzip"):
+            return "gzip"
+        return None
+
+    def _compressible(self, message: Message) -> bool:
+        if message["status"] in (204, 206, 304):
+            return False
+        headers = Headers(raw=message["headers"])
+        if "content-encoding" in headers:
+            return False
+        content_type = headers.get("content-type", "").partition(";")[0]
+        content_type = content_type.strip().lower()
+        return any(fnmatch(content_type, pattern) for pattern in self.content_types)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = self._encoding(scope)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Message | None = None
+        compressor = None
+        passthrough = False
+
+        async def send_wrapper(message: Message):
+            nonlocal start, compressor, passthrough
+            if message["type"] == "http.response.start":
+                # Заголовки отправим, когда по первому куску тела станет ясно,
+                # сжимаем ли ответ
+                start = message
+                passthrough = not self._compressible(message)
+                return
+            if message["type"] != "http.response.body":
+                # pathsend, trailers и т.п.: тело мимо нас - ответ не сжимаем,
+                # но заголовки по протоколу ASGI уходят первыми
+                if start is not None:
+                    await send(start)
+                    start = None
+                    passthrough = True
+                await send(message)
+                return
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if start is not None:
+                headers = MutableHeaders(raw=start["headers"])
+                if not passthrough and (more_body or len(body) >= self.minimum_size):
+                    compressor = (_Brotli if encoding == "br" else _GZip)(self.level)
+                    headers["Content-Encoding"] = encoding
+                    headers.add_vary_header("Accept-Encoding")
+                    del headers["Content-Length"]
+                    if not more_body:
+                        body = compressor.compress(body, more_body=False)
+                        headers["Content-Length"] = str(len(body))
+                        message = {**message, "body": body}
+                        compressor = None
+                elif not passthrough:
+                    headers.add_vary_header("Accept-Encoding")
+                await send(start)
+                start = None
+                if compressor is None:
+                    await send(message)
+                    return
+            if compressor is not None:
+                message = {**message, "body": compressor.compress(body, more_body)}
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -1,19 +1,101 @@
+from contextlib import asynccontextmanager
+
 import uvicorn
 from fastapi import FastAPI
 from loguru import logger
 from starlette.middleware.cors import CORSMiddleware
-from starlette.responses import RedirectResponse
+from starlette.responses import PlainTextResponse, RedirectResponse
 
 from applications import router
+from applications.auth.user_cache import get_user_cache
+from applications.auth.utils import get_password_executor
+from applications.aws.services import get_async_aws_service, get_sync_aws_service
+from applications.aws.services.disk_cache import get_object_cache
+from core import metrics
+from core.conf import settings
+from core.database.conf import dispose_engines, get_engine, get_replicas
+from core.middleware import CompressionMiddleware, MetricsMiddleware
 
 
 def add_router(main_app: FastAPI):
     main_app.include_router(router)
 
 
+def _executor_stats():
+    executors = []
+    if get_password_executor.created:
+        executors.append(get_password_executor())
+    if get_sync_aws_service.created:
+        executors.append(get_sync_aws_service().executor)
+    for executor in executors:
+        stats = executor.stats()
+        for key in ("queue_depth", "active", "calls", "errors"):
+            yield {"pool": executor.name, "stat": key}, stats[key]
+
+
+def _cache_stats():
+    caches = {}
+    if get_user_cache.created:
+        caches["user"] = get_user_cache()
+    if get_object_cache.created:
+        caches["s3_disk"] = get_object_cache()
+    for name, cache in caches.items():
+        if cache is None:
+            continue
+        stats = cache.stats()
+        yield {"cache": name, "result": "hit"}, stats["hits"]
+        yield {"cache": name, "result": "miss"}, stats["misses"]
+
+
+def add_metrics(main_app: FastAPI):
+    metrics.registry.register(
+        metrics.Collector(
+            "executor_pool", "Blocking call pools state", "gauge", _executor_stats
+        )
+    )
+    metrics.registry.register(
+        metrics.Collector(
+            "cache_requests_total", "Cache lookups by result", "counter", _cache_stats
+        )
+    )
+    main_app.add_middleware(MetricsMiddleware, slow_request_ms=settings.slow_request_ms)
+
+    @main_app.get("/metrics", include_in_schema=False)
+    async def get_metrics():
+        return PlainTextResponse(
+            metrics.registry.render(), media_type="text/plain; version=0.0.4"
+        )
+
+
+@asynccontextmanager
+async def lifespan(main_app: FastAPI):
+    # Движок и общий S3 клиент создаются здесь, а не при импорте;
+    # boto3 (синхронный сервис) - при первом запросе к его маршрутам
+    get_engine()
+    get_replicas().start()
+    await get_async_aws_service().start()
+    try:
+        yield
+    finally:
+        await get_async_aws_service().close()
+        if get_sync_aws_service.created:
+            get_sync_aws_service().close()
+        if get_password_executor.created:
+            get_password_executor().shutdown(wait=False)
+        if get_object_cache.created and get_object_cache() is not None:
+            get_object_cache().close()
+        await dispose_engines()
+
+
 def create_app():
-    main_app = FastAPI()
+    main_app = FastAPI(lifespan=lifespan)
 
+    main_app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.api_compress_min_size,
+        level=settings.api_compress_level,
+        content_types=settings.api_compress_content_types,
+    )
     main_app.add_middleware(
         CORSMiddleware,
         allow_origins=["https://frontend.example"],
@@ -28,6 +110,8 @@ def create_app():
         return RedirectResponse(url="/docs")
 
     add_router(main_app)
+    if settings.metrics_enabled:
+        add_metrics(main_app)
     return main_app
 
 
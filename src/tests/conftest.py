@@ -0,0 +1,118 @@
+"""
+Тесты приложения внутри процесса: httpx.ASGITransport + moto server вместо S3
+и временная SQLite (как в benchmarks.asgi_bench)
+
+Нужны moto[server], httpx и pytest. Запуск из корня репозитория или из src:
+    python -m pytest -q
+"""
+
+import socket
+import tempfile
+import uuid
+
+import pytest
+
+from benchmarks.asgi_bench import _configure_env, _start_s3
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+# Настройки читаются при первом обращении - окружение до импорта приложения
+_tmp = tempfile.TemporaryDirectory()
+_s3_port = _free_port()
+_configure_env(_s3_port, f"{_tmp.name}/test.db")
+
+PASSWORD = "test-password"
+
+
+@pytest.fixture(scope="session")
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture(scope="session")
+def s3_server():
+    server = _start_s3(_s3_port)
+    yield server
+    server.stop()
+
+
+@pytest.fixture(scope="session", autouse=True)
+def fast_bcrypt():
+    from core.conf import settings
+
+    settings.bcrypt_rounds = 4
+
+
+@pytest.fixture(scope="session")
+async def app(s3_server):
+    from core.database.conf import get_engine
+    from core.database.models import Base
+    from main import create_app
+
+    async with get_engine().begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+    app = create_app()
+    async with app.router.lifespan_context(app):
+        yield app
+
+
+@pytest.fixture
+async def client(app):
+    import httpx
+
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="https://test", timeout=30
+    ) as client:
+        yield client
+
+
+@pytest.fixture
+def bucket(s3_server) -> str:
+    """Уникальное имя бакета на тест (бакет не создается)"""
+    return f"test-{uuid.uuid4().hex[:12]}"
+
+
+async def create_user(client, is_admin: bool = False) -> dict:
+    """Регистрация и вход, заголовки с access токеном"""
+    from sqlalchemy import update
+
+    from core.database.conf import get_engine
+    from core.database.models import User
+
+    email = f"{uuid.uuid4().hex[:12]}@example.com"
+    res = await client.post(
+        "/auth/sign-up",
+        json={
+            "fullname": "Test",
+            "phone": None,
+            "email": email,
+            "password1": PASSWORD,
+            "password2": PASSWORD,
+        },
+    )
+    assert res.status_code == 200, res.text
+    if is_admin:
+        async with get_engine().begin() as connection:
+            await connection.execute(
+                update(User).where(User.email == email).values(is_admin=True)
+            )
+    res = await client.post(
+        "/auth/sign-in", data={"username": email, "password": PASSWORD}
+    )
+    assert res.status_code == 200, res.text
+    return {"Authorization": f"Bearer {res.json()['access_token']}"}
+
+
+@pytest.fixture
+async def admin_headers(client) -> dict:
+    return await create_user(client, is_admin=True)
+
+
+@pytest.fixture
+async def user_headers(client) -> dict:
+    return await create_user(client)
@@ -0,0 +1,120 @@
+import asyncio
+import threading
+
+import pytest
+from fastapi import HTTPException
+
+from core.executor import BlockingExecutor, ExecutorBusy
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def executor():
+    executor = BlockingExecutor(max_workers=1, name="test", max_queue=1)
+    yield executor
+    executor.shutdown(wait=True)
+
+
+async def _occupy(executor: BlockingExecutor) -> tuple[asyncio.Task, threading.Event]:
+    """Единственный воркер занят, пока не выставлен release"""
+    started, release = threading.Event(), threading.Event()
+
+    def block():
+        started.set()
+        release.wait(5)
+
+    task = asyncio.create_task(executor.run(block))
+    await asyncio.to_thread(started.wait, 5)
+    return task, release
+
+
+async def test_run_returns_result(executor):
+    assert await executor.run(lambda x, y=0: x + y, 1, y=2) == 3
+    stats = executor.stats()
+    assert stats["calls"] == 1
+    assert stats["queue_depth"] == stats["active"] == 0
+
+
+async def test_run_error_is_counted(executor):
+    with pytest.raises(ZeroDivisionError):
+        await executor.run(lambda: 1 / 0)
+    assert executor.stats()["errors"] == 1
+
+
+async def test_queue_full_raises_busy(executor):
+    task, release = await _occupy(executor)
+    queued = asyncio.create_task(executor.run(lambda: "queued"))
+    await asyncio.sleep(0.05)
+    with pytest.raises(ExecutorBusy):
+        await executor.run(lambda: "rejected")
+    release.set()
+    await task
+    assert await queued == "queued"
+    assert await executor.run(lambda: "ok") == "ok"
+
+
+async def test_cancel_queued_call_frees_slot(executor):
+    task, release = await _occupy(executor)
+    ran = threading.Event()
+    queued = asyncio.create_task(executor.run(ran.set))
+    await asyncio.sleep(0.05)
+    assert executor.stats()["queue_depth"] == 1
+    queued.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await queued
+    # Место в очереди освобождено сразу, а не после запуска отмененного вызова
+    assert executor.stats()["queue_depth"] == 0
+    second = asyncio.create_task(executor.run(lambda: "second"))
+    await asyncio.sleep(0.05)
+    release.set()
+    await task
+    assert await second == "second"
+    assert not ran.is_set()
+    stats = executor.stats()
+    assert stats["queue_depth"] == stats["active"] == 0
+
+
+async def test_iterate_limits_only_first_step(executor):
+    task, release = await _occupy(executor)
+    queued = asyncio.create_task(executor.run(lambda: None))
+    await asyncio.sleep(0.05)
+    with pytest.raises(ExecutorBusy):
+        [item async for item in executor.iterate(iter([1, 2]))]
+    # Без лимита (поток уже отдается клиенту) - ждем в очереди
+    unlimited = asyncio.create_task(
+        anext(aiter(executor.iterate(iter([1, 2]), limited=False)))
+    )
+    await asyncio.sleep(0.05)
+    release.set()
+    await task
+    await queued
+    assert await unlimited == 1
+    assert [item async for item in executor.iterate(iter([1, 2, 3]))] == [1, 2, 3]
+
+
+async def test_sync_s3_service_busy_is_503(s3_server):
+    from applications.aws.services.sync_aws import S3Service
+    from core.conf import settings
+
+    service = S3Service(
+        aws_access_key_id=settings.MINIO_ROOT_USER,
+        aws_secret_access_key=settings.MINIO_ROOT_PASSWORD,
+        endpoint_url=settings.s3_endpoint,
+        max_workers=1,
+        max_queue=0,
+    )
+    try:
+        task, release = await _occupy(service.executor)
+        with pytest.raises(HTTPException) as e:
+            await service.run(service.list_buckets)
+        assert e.value.status_code == 503
+        assert e.value.headers == {"Retry-After": "1"}
+        with pytest.raises(HTTPException) as e:
+            [item async for item in service.iterate(iter([1]))]
+        assert e.value.status_code == 503
+        release.set()
+        await task
+        assert isinstance(await service.run(service.list_buckets), list)
+    finally:
+        service.close()
@@ -0,0 +1,136 @@
+import json
+import uuid
+
+import pytest
+
+from tests.conftest import PASSWORD
+
+pytestmark = pytest.mark.anyio
+
+
+def _row(email: str, password2: str = PASSWORD, **fields) -> dict:
+    return {
+        "fullname": "Imported",
+        "phone": None,
+        "email": email,
+        "password1": PASSWORD,
+        "password2": password2,
+        **fields,
+    }
+
+
+def _email() -> str:
+    return f"import-{uuid.uuid4().hex[:12]}@example.com"
+
+
+async def test_import_error_rows(client, admin_headers):
+    existing, new = _email(), _email()
+    res = await client.post(
+        "/auth/users/import", json=[_row(existing)], headers=admin_headers
+    )
+    assert res.status_code == 200, res.text
+    assert res.json()[0]["status"] == "created"
+
+    rows = [
+        _row(new),
+        _row("not-an-email"),
+        _row(_email(), password2="other"),
+        _row(new),
+        _row(existing),
+        {"email": _email()},
+        "not an object",
+    ]
+    res = await client.post("/auth/users/import", json=rows, headers=admin_headers)
+    assert res.status_code == 200, res.text
+    results = res.json()
+    assert [item["row"] for item in results] == list(range(1, len(rows) + 1))
+    assert [item["status"] for item in results] == [
+        "created",
+        "error",
+        "error",
+        "duplicate",
+        "duplicate",
+        "error",
+        "error",
+    ]
+    assert results[0]["id"] is not None
+    assert results[1]["email"] is None
+    assert "email" in results[1]["error"]
+    assert results[2]["error"] == "Passwords don't match"
+    assert results[3]["id"] is None
+    assert "password1" in results[5]["error"]
+
+    # Созданный пользователь может войти
+    res = await client.post(
+        "/auth/sign-in", data={"username": new, "password": PASSWORD}
+    )
+    assert res.status_code == 200
+
+
+async def test_import_csv_and_ndjson(client, admin_headers):
+    first, second = _email(), _email()
+    body = f"fullname,phone,email,password\nCsv,,{first},{PASSWORD}\n"
+    res = await client.post(
+        "/auth/users/import",
+        content=body.encode(),
+        headers={**admin_headers, "Content-Type": "text/csv; charset=utf-8"},
+    )
+    assert res.status_code == 200, res.text
+    assert [item["status"] for item in res.json()] == ["created"]
+
+    body = "\n".join(json.dumps(_row(email)) for email in (second, first)) + "\n"
+    res = await client.post(
+        "/auth/users/import",
+        content=body.encode(),
+        headers={**admin_headers, "Content-Type": "application/x-ndjson"},
+    )
+    assert res.status_code == 200, res.text
+    assert [item["status"] for item in res.json()] == ["created", "duplicate"]
+
+
+async def test_import_requires_admin(client, user_headers):
+    # Права проверяются до формата и тела
+    res = await client.post(
+        "/auth/users/import",
+        content=b"data",
+        headers={**user_headers, "Content-Type": "application/xml"},
+    )
+    assert res.status_code == 403
+
+
+@pytest.mark.parametrize(
+    "content_type, body, expected",
+    [
+        ("application/xml", b"<users/>", 415),
+        ("application/json", b"{not json", 400),
+        ("application/json", b'{"email": "a@example.com"}', 400),
+        ("text/csv", b"\xff\xfe", 400),
+    ],
+)
+async def test_import_bad_body(client, admin_headers, content_type, body, expected):
+    res = await client.post(
+        "/auth/users/import",
+        content=body,
+        headers={**admin_headers, "Content-Type": content_type},
+    )
+    assert res.status_code == expected, res.text
+
+
+async def test_import_body_too_large(client, admin_headers, monkeypatch):
+    from core.conf import settings
+
+    monkeypatch.setattr(settings, "users_import_max_body_size", 64)
+    body = json.dumps([_row(_email()) for _ in range(3)]).encode()
+
+    async def chunks():
+        # Без Content-Length - лимит проверяется при чтении
+        for start in range(0, len(body), 16):
+            yield body[start : start + 16]
+
+    for content in (body, chunks()):
+        res = await client.post(
+            "/auth/users/import",
+            content=content,
+            headers={**admin_headers, "Content-Type": "application/json"},
+        )
+        assert res.status_code == 413
@@ -0,0 +1,31 @@
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_list_missing_bucket_is_404(client, bucket):
+    res = await client.get(f"/list/objects/{bucket}")
+    assert res.status_code == 404
+    assert res.json()["detail"] == "Bucket not found"
+
+
+async def test_sync_list_missing_bucket_is_404(client, bucket):
+    res = await client.get("/objects", params={"bucket_name": bucket})
+    assert res.status_code == 404
+    assert res.json()["detail"] == "Bucket not found"
+
+
+async def test_list_objects_ndjson(client, bucket):
+    for name in ("a.txt", "b.txt"):
+        res = await client.post(f"/upload/{bucket}", files={"file": (name, b"data")})
+        assert res.status_code == 200, res.text
+
+    res = await client.get(f"/list/objects/{bucket}")
+    assert res.status_code == 200
+    assert res.headers["content-type"] == "application/x-ndjson"
+    keys = [line for line in res.text.splitlines() if line]
+    assert len(keys) == 2
+
+    res = await client.get("/objects", params={"bucket_name": bucket})
+    assert res.status_code == 200
+    assert len([line for line in res.text.splitlines() if line]) == 2
@@ -0,0 +1,97 @@
+import pytest
+
+from tests.conftest import create_user
+
+pytestmark = pytest.mark.anyio
+
+# Порядок байтов, как в листинге S3: "B" < "a" < "a.txt" < "a/b" < "a0" < "a_"
+KEYS = ["B.txt", "a.txt", "a/b.txt", "a0.txt", "a_.txt"]
+
+
+async def _pages(client, url: str, params: dict, cursor: str, next_field: str):
+    """Все страницы по курсору: список страниц (списков элементов)"""
+    pages = []
+    params = dict(params)
+    while True:
+        res = await client.get(url, params=params)
+        assert res.status_code == 200, res.text
+        page = res.json()
+        pages.append(page["items"])
+        if page[next_field] is None:
+            return pages
+        params[cursor] = page[next_field]
+
+
+@pytest.fixture
+async def indexed(client, bucket) -> str:
+    for key in reversed(KEYS):
+        res = await client.put(
+            f"/upload/{bucket}/stream/{key}",
+            content=key.encode(),
+            headers={"Content-Type": "text/plain"},
+        )
+        assert res.status_code == 200, res.text
+    return bucket
+
+
+async def test_index_key_paging(client, indexed):
+    url = f"/index/buckets/{indexed}/objects"
+    pages = await _pages(client, url, {"limit": 2}, "after_key", "next_key")
+    assert [len(page) for page in pages] == [2, 2, 1]
+    assert [item["key"] for page in pages for item in page] == KEYS
+
+    # Ровно limit объектов - следующей страницы нет
+    res = await client.get(url, params={"limit": len(KEYS)})
+    assert res.json()["next_key"] is None
+
+
+@pytest.mark.parametrize(
+    "prefix, expected",
+    [
+        ("a/", ["a/b.txt"]),
+        ("a", KEYS[1:]),
+        ("a_", ["a_.txt"]),
+        ("b", []),
+    ],
+)
+async def test_index_prefix(client, indexed, prefix, expected):
+    url = f"/index/buckets/{indexed}/objects"
+    pages = await _pages(
+        client, url, {"prefix": prefix, "limit": 1}, "after_key", "next_key"
+    )
+    assert [item["key"] for page in pages for item in page] == expected
+
+
+async def test_index_search_paging(client, indexed):
+    params = {"bucket_name": indexed, "name": "a", "limit": 2}
+    pages = await _pages(client, "/index/search", params, "after_id", "next_cursor")
+    ids = [item["id"] for page in pages for item in page]
+    assert ids == sorted(ids)
+    assert sorted(item["key"] for page in pages for item in page) == KEYS[1:]
+
+
+async def test_users_paging(client, admin_headers):
+    users = [await create_user(client) for _ in range(3)]
+    user_ids = {
+        (await client.get("/auth/auth/me", headers=headers)).json()["id"]
+        for headers in users
+    }
+    client.headers.update(admin_headers)
+    admin_id = (await client.get("/auth/auth/me")).json()["id"]
+    pages = await _pages(client, "/auth/users", {"limit": 2}, "after_id", "next_cursor")
+    ids = [item["id"] for page in pages for item in page]
+    assert len(ids) >= 4
+    assert ids == sorted(set(ids))
+    assert all(len(page) == 2 for page in pages[:-1])
+
+    pages = await _pages(
+        client, "/auth/users", {"limit": 1, "is_admin": True}, "after_id", "next_cursor"
+    )
+    admin_ids = {item["id"] for page in pages for item in page}
+    assert admin_id in admin_ids
+    assert not admin_ids & user_ids
+
+
+async def test_users_paging_requires_admin(client, user_headers):
+    res = await client.get("/auth/users", headers=user_headers)
+    assert res.status_code == 403
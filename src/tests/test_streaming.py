@@ -0,0 +1,138 @@
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import HTTPException
+
+from applications.aws.streaming import is_not_modified, parse_range, request_conditions
+
+
+@pytest.mark.parametrize(
+    "header, expected",
+    [
+        (None, None),
+        ("", None),
+        ("bytes=0-9", "bytes=0-9"),
+        ("bytes=10-", "bytes=10-"),
+        ("bytes=-5", "bytes=-5"),
+        (" bytes = 0 - 9 ", "bytes=0-9"),
+        ("bytes=5-5", "bytes=5-5"),
+        # Несколько диапазонов и чужие единицы - отдаем целиком
+        ("bytes=0-1,3-4", None),
+        ("items=0-9", None),
+        ("bytes=-", None),
+        ("bytes=a-b", None),
+    ],
+)
+def test_parse_range(header, expected):
+    assert parse_range(header) == expected
+
+
+def test_parse_range_reversed_is_416():
+    with pytest.raises(HTTPException) as e:
+        parse_range("bytes=9-0")
+    assert e.value.status_code == 416
+
+
+def test_request_conditions():
+    assert request_conditions(None, None) == {}
+    assert request_conditions('W/"abc"', None) == {"IfNoneMatch": '"abc"'}
+    # If-None-Match важнее If-Modified-Since
+    assert request_conditions('"abc"', "Mon, 01 Jan 2001 00:00:00 GMT") == {
+        "IfNoneMatch": '"abc"'
+    }
+    assert request_conditions(None, "garbage") == {}
+    since = request_conditions(None, "Mon, 01 Jan 2001 00:00:00 GMT")
+    assert since == {"IfModifiedSince": datetime(2001, 1, 1, tzinfo=timezone.utc)}
+
+
+def test_is_not_modified():
+    modified = datetime(2001, 1, 1, 12, 0, 0, 500_000, tzinfo=timezone.utc)
+    assert is_not_modified({"IfNoneMatch": '"a", "b"'}, '"b"', None)
+    assert is_not_modified({"IfNoneMatch": "*"}, '"b"', None)
+    assert not is_not_modified({"IfNoneMatch": '"a"'}, '"b"', None)
+    # Доли секунды Last-Modified не учитываются
+    since = {"IfModifiedSince": modified.replace(microsecond=0)}
+    assert is_not_modified(since, '"b"', modified)
+    assert not is_not_modified(since, '"b"', None)
+    assert not is_not_modified({}, '"b"', modified)
+
+
+@pytest.fixture
+async def stored(client, bucket) -> dict:
+    """Объект в бакете: параметры /download/ и ответ полной загрузки"""
+    data = bytes(range(256)) * 4
+    res = await client.post(
+        f"/upload/{bucket}", files={"file": ("data.bin", data, "image/png")}
+    )
+    assert res.status_code == 200, res.text
+    params = {"filename": "data.bin", "bucket_name": bucket}
+    res = await client.get("/download/", params=params)
+    assert res.status_code == 200
+    assert res.content == data
+    return {"params": params, "data": data, "headers": res.headers}
+
+
+@pytest.mark.anyio
+async def test_download_range(client, stored):
+    res = await client.get(
+        "/download/", params=stored["params"], headers={"Range": "bytes=10-19"}
+    )
+    assert res.status_code == 206
+    assert res.content == stored["data"][10:20]
+    assert res.headers["content-range"] == f"bytes 10-19/{len(stored['data'])}"
+
+    res = await client.get(
+        "/download/", params=stored["params"], headers={"Range": "bytes=-4"}
+    )
+    assert res.status_code == 206
+    assert res.content == stored["data"][-4:]
+
+
+@pytest.mark.anyio
+async def test_download_range_not_satisfiable(client, stored):
+    size = len(stored["data"])
+    for header in (f"bytes={size}-", "bytes=9-0"):
+        res = await client.get(
+            "/download/", params=stored["params"], headers={"Range": header}
+        )
+        assert res.status_code == 416, header
+
+
+@pytest.mark.anyio
+async def test_download_unsupported_range_is_full(client, stored):
+    res = await client.get(
+        "/download/", params=stored["params"], headers={"Range": "bytes=0-1,5-6"}
+    )
+    assert res.status_code == 200
+    assert res.content == stored["data"]
+
+
+@pytest.mark.anyio
+async def test_download_not_modified(client, stored):
+    etag = stored["headers"]["etag"]
+    last_modified = stored["headers"]["last-modified"]
+    cases = [
+        ({"If-None-Match": etag}, 304),
+        ({"If-None-Match": f"W/{etag}"}, 304),
+        ({"If-None-Match": '"other"'}, 200),
+        # If-None-Match совпал - Range не применяется
+        ({"If-None-Match": etag, "Range": "bytes=0-5"}, 304),
+        ({"If-Modified-Since": last_modified}, 304),
+        ({"If-Modified-Since": "Mon, 01 Jan 2001 00:00:00 GMT"}, 200),
+        ({"If-Modified-Since": "garbage"}, 200),
+        # If-Modified-Since без учета при If-None-Match
+        ({"If-None-Match": '"other"', "If-Modified-Since": last_modified}, 200),
+    ]
+    for headers, expected in cases:
+        res = await client.get("/download/", params=stored["params"], headers=headers)
+        assert res.status_code == expected, headers
+        if expected == 304:
+            assert res.content == b""
+            assert res.headers["etag"] == etag
+
+
+@pytest.mark.anyio
+async def test_download_missing_object_is_404(client, stored):
+    params = {**stored["params"], "filename": "missing.bin"}
+    res = await client.get("/download/", params=params)
+    assert res.status_code == 404